@@ -8,11 +8,71 @@ except ImportError:  # Python 2
     from urlparse import parse_qsl
 
 from resources.lib.kodihelper import KodiHelper
+from resources.lib.jsonapi import Resolver
+from resources.lib.availability import AvailabilityEvaluator
+from resources.lib.metadata import MetadataMapper
 
 base_url = sys.argv[0]
 handle = int(sys.argv[1])
 helper = KodiHelper(base_url, handle)
 
+def get_plot(video, availability):
+    """Return video description with playable time of upcoming video and subscription note."""
+    plot = video['attributes'].get('description')
+    if availability.playable:
+        return plot
+    if availability.upcoming:
+        playable = availability.playable_from.strftime('%d.%m.%Y %H:%M')
+        if plot:
+            plot = helper.language(30002) + playable + ' ' + plot
+        else:
+            plot = helper.language(30002) + playable
+    if availability.subscription_needed:
+        if plot:
+            plot = helper.language(30034) + ' ' + plot
+        else:
+            plot = helper.language(30034)
+    return plot
+
+def get_metadata(included):
+    return MetadataMapper(included, helper.d.locale_suffix, helper.d.contentRatingSystem)
+
+def get_channel_art(included, channel):
+    images = included.images_by_kind(channel)
+    return {
+        'fanart': images.get('default'),
+        'thumb': images.get('logo') or images.get('default')
+    }
+
+def add_live_channel(included, channel, folder_name=None):
+    params = {
+        'action': 'play',
+        'video_id': channel['id'],
+        'video_type': 'channel'
+    }
+
+    channel_info = {
+        'mediatype': 'video',
+        'title': channel['attributes'].get('name'),
+        'plot': channel['attributes'].get('description'),
+        'playcount': '0'
+    }
+
+    helper.add_item(helper.language(30014) + ' ' + channel['attributes'].get('name'), params=params,
+                    info=channel_info, content='videos', art=get_channel_art(included, channel), playable=True,
+                    folder_name=folder_name)
+
+def favorite_menu(show):
+    # Add or delete favorite context menu
+    if show['attributes']['isFavorite']:
+        return [(helper.language(30010),
+                 'RunPlugin(plugin://' + helper.addon_name + '/?action=delete_favorite&show_id=' + str(
+                     show['id']) + ')',)]
+    else:
+        return [(helper.language(30009),
+                 'RunPlugin(plugin://' + helper.addon_name + '/?action=add_favorite&show_id=' + str(
+                     show['id']) + ')',)]
+
 def list_pages():
     # List menu items (Shows, Categories)
     if helper.d.locale_suffix == 'in':
@@ -23,109 +83,61 @@ def list_pages():
     else:
         page_data = helper.d.get_menu('/web-menubar-v2')
 
-    collections = list(filter(lambda x: x['type'] == 'collection', page_data['included']))
-    collectionItems = list(filter(lambda x: x['type'] == 'collectionItem', page_data['included']))
-    images = list(filter(lambda x: x['type'] == 'image', page_data['included']))
-    links = list(filter(lambda x: x['type'] == 'link', page_data['included']))
-    routes = list(filter(lambda x: x['type'] == 'route', page_data['included']))
-
-    for data_collection in page_data['data']['relationships']['items']['data']:
-        for collectionItem in collectionItems:
-            if data_collection['id'] == collectionItem['id']:
-                # discoveryplus.com (EU and US) uses links after collectionItems
-                # Get only links
-                if collectionItem['relationships'].get('link'):
-                    for link in links:
-                        # Hide unwanted menu links
-                        if collectionItem['relationships']['link']['data']['id'] == link['id'] and \
-                                link['attributes'][
-                                    'kind'] == 'Internal Link' and link['attributes']['name'] not in helper.d.unwanted_menu_items:
-
-                            # Find page path from routes
-                            for route in routes:
-                                if route['id'] == \
-                                        link['relationships']['linkedContentRoutes']['data'][0][
-                                            'id']:
-                                    next_page_path = route['attributes']['url']
-
-                            # Replace search button params
-                            if link['attributes']['name'].startswith('search'):
-                                params= {
-                                    'action': 'search'
-                                }
-                            else:
-                                params = {
-                                    'action': 'list_page',
-                                    'page_path': next_page_path
-                                }
+    included = Resolver(page_data)
 
-                            link_info = {
-                                'plot': link['attributes'].get('description')
-                            }
+    for collectionItem in included.resolve_many(page_data['data']['relationships']['items']):
+        # discoveryplus.com (EU and US) uses links after collectionItems
+        # Get only links
+        link = included.related(collectionItem, 'link')
+        # Hide unwanted menu links
+        if link and link['attributes']['kind'] == 'Internal Link' and \
+                link['attributes']['name'] not in helper.d.unwanted_menu_items:
 
-                            if link['relationships'].get('images'):
-                                for image in images:
-                                    if image['id'] == link['relationships']['images']['data'][0]['id']:
-                                        thumb_image = image['attributes']['src']
-                            else:
-                                thumb_image = None
+            # Replace search button params
+            if link['attributes']['name'].startswith('search'):
+                params = {
+                    'action': 'search'
+                }
+            else:
+                params = {
+                    'action': 'list_page',
+                    'page_path': included.route_url(link, 'linkedContentRoutes')
+                }
 
-                            link_art = {
-                                'icon': thumb_image
-                            }
-                            # Have to use collection title instead link title because some links doesn't have title
-                            helper.add_item(link['attributes']['title'], params, info=link_info, art=link_art)
-
-                # discovery+ India uses collections after collectionItems
-                if collectionItem['relationships'].get('collection'):
-                    for collection in collections:
-                        if collectionItem['relationships']['collection']['data']['id'] == collection['id']:
-
-                            if collection['attributes']['component']['id'] == 'menu-item':
-                                for collectionItem2 in collectionItems:
-                                    if collection['relationships']['items']['data'][0]['id'] == collectionItem2['id']:
-                                        # Get only links
-                                        if collectionItem2['relationships'].get('link'):
-                                            for link in links:
-                                                # Hide unwanted menu links
-                                                if collectionItem2['relationships']['link']['data']['id'] == link[
-                                                    'id'] and \
-                                                        link['attributes'][
-                                                            'kind'] == 'Internal Link' and collection['attributes'][
-                                                    'title'] not in helper.d.unwanted_menu_items:
-
-                                                    # Find page path from routes
-                                                    for route in routes:
-                                                        if route['id'] == \
-                                                                link['relationships']['linkedContentRoutes']['data'][0][
-                                                                    'id']:
-                                                            next_page_path = route['attributes']['url']
-
-                                                    params = {
-                                                        'action': 'list_page',
-                                                        'page_path': next_page_path
-                                                    }
-
-                                                    link_info = {
-                                                        'plot': link['attributes'].get('description')
-                                                    }
-
-                                                    if link['relationships'].get('images'):
-                                                        for image in images:
-                                                            if image['id'] == \
-                                                                    link['relationships']['images']['data'][0][
-                                                                        'id']:
-                                                                thumb_image = image['attributes']['src']
-                                                    else:
-                                                        thumb_image = None
-
-                                                    link_art = {
-                                                        'icon': thumb_image
-                                                    }
-                                                    # Have to use collection title instead link title because some links doesn't have title
-                                                    helper.add_item(collection['attributes']['title'], params,
-                                                                    info=link_info,
-                                                                    art=link_art)
+            link_info = {
+                'plot': link['attributes'].get('description')
+            }
+
+            link_art = {
+                'icon': included.first_image(link)
+            }
+            # Have to use collection title instead link title because some links doesn't have title
+            helper.add_item(link['attributes']['title'], params, info=link_info, art=link_art)
+
+        # discovery+ India uses collections after collectionItems
+        collection = included.related(collectionItem, 'collection')
+        if collection and collection['attributes']['component']['id'] == 'menu-item':
+            collectionItem2 = included.resolve(collection['relationships']['items']['data'][0])
+            # Get only links
+            link = included.related(collectionItem2, 'link') if collectionItem2 else None
+            # Hide unwanted menu links
+            if link and link['attributes']['kind'] == 'Internal Link' and \
+                    collection['attributes']['title'] not in helper.d.unwanted_menu_items:
+
+                params = {
+                    'action': 'list_page',
+                    'page_path': included.route_url(link, 'linkedContentRoutes')
+                }
+
+                link_info = {
+                    'plot': link['attributes'].get('description')
+                }
+
+                link_art = {
+                    'icon': included.first_image(link)
+                }
+                # Have to use collection title instead link title because some links doesn't have title
+                helper.add_item(collection['attributes']['title'], params, info=link_info, art=link_art)
 
     # Search discoveryplus.in
     if helper.d.locale_suffix == 'in':
@@ -144,429 +156,214 @@ def list_page_us(page_path, search_query=None):
     else:
         page_data = helper.d.get_page(page_path)
 
-    pages = list(filter(lambda x: x['type'] == 'page', page_data['included']))
-    pageItems = list(filter(lambda x: x['type'] == 'pageItem', page_data['included']))
-    collections = list(filter(lambda x: x['type'] == 'collection', page_data['included']))
-    collectionItems = list(filter(lambda x: x['type'] == 'collectionItem', page_data['included']))
-    images = list(filter(lambda x: x['type'] == 'image', page_data['included']))
-    channels = list(filter(lambda x: x['type'] == 'channel', page_data['included']))
-    links = list(filter(lambda x: x['type'] == 'link', page_data['included']))
-    routes = list(filter(lambda x: x['type'] == 'route', page_data['included']))
-    taxonomyNodes = list(filter(lambda x: x['type'] == 'taxonomyNode', page_data['included']))
+    included = Resolver(page_data)
 
     if page_data['data']['type'] == 'route':
-        for page in pages:
+        for page in included.of_type('page'):
             # If only one pageItem in page -> relationships -> items -> data, list content page (categories)
             if len(page['relationships']['items']['data']) == 1:
-                for pageItem in pageItems:
-                    if page['relationships']['items']['data'][0]['id'] == pageItem['id']:
+                pageItem = included.resolve(page['relationships']['items']['data'][0])
+                if not pageItem:
+                    continue
 
-                        # Browse -> All (EU)
-                        if pageItem['relationships'].get('link'):
-                            for link in links:
-                                if pageItem['relationships']['link']['data']['id'] == link['id']:
-                                    list_collection(collection_id=link['relationships']['linkedContent']['data']['id'], page=1)
+                # Browse -> All (EU)
+                link = included.related(pageItem, 'link')
+                if link:
+                    list_collection(collection_id=link['relationships']['linkedContent']['data']['id'], page=1)
+
+                collection = included.related(pageItem, 'collection')
+                # Some collections doesn't have component
+                if collection and collection['attributes'].get('component'):
+
+                    # if content-grid after pageItem -> list content (My List)
+                    if collection['attributes']['component']['id'] == 'content-grid':
+                        list_collection(collection_id=collection['id'], page=1)
+
+                    # discoveryplus.com (US and EU) search result categories (Shows, Episodes, Specials, Collections, Extras)
+                    if collection['attributes']['component']['id'] == 'tabbed-component':
+                        for collectionItem in included.related_many(collection, 'items'):
+                            c2 = included.related(collectionItem, 'collection')
+                            if c2 and c2['attributes']['component']['id'] == 'content-grid':
+                                # Hide empty collections
+                                if c2.get('relationships'):
+                                    params = {
+                                        'action': 'list_collection',
+                                        'collection_id': c2['id'],
+                                        # 57814496346899699666089560202324254373
+                                        'mandatoryParams': c2['attributes']['component'].get('mandatoryParams')
+                                        # pf[query]=mythbusters
+                                    }
 
-                        if pageItem['relationships'].get('collection'):
-                            for collection in collections:
-                                if pageItem['relationships']['collection']['data']['id'] == collection['id']:
-                                    # Some collections doesn't have component
-                                    if collection['attributes'].get('component'):
-
-                                        # if content-grid after pageItem -> list content (My List)
-                                        if collection['attributes']['component']['id'] == 'content-grid':
-                                            list_collection(collection_id=collection['id'], page=1)
-
-                                        # discoveryplus.com (US and EU) search result categories (Shows, Episodes, Specials, Collections, Extras)
-                                        if collection['attributes']['component']['id'] == 'tabbed-component':
-                                            for c in collection['relationships']['items']['data']:
-                                                for collectionItem in collectionItems:
-                                                    if c['id'] == collectionItem['id']:
-                                                        for c2 in collections:
-                                                            if collectionItem['relationships']['collection']['data'][
-                                                                'id'] == c2['id']:
-                                                                if c2['attributes']['component'][
-                                                                    'id'] == 'content-grid':
-                                                                    # Hide empty collections
-                                                                    if c2.get('relationships'):
-                                                                        params = {
-                                                                            'action': 'list_collection',
-                                                                            'collection_id': c2['id'],
-                                                                            # 57814496346899699666089560202324254373
-                                                                            'mandatoryParams':
-                                                                                c2['attributes'][
-                                                                                    'component'].get(
-                                                                                    'mandatoryParams')
-                                                                            # pf[query]=mythbusters
-                                                                        }
-
-                                                                        folder_name = helper.language(
-                                                                            30007) + ' / ' + search_query
-
-                                                                        helper.add_item(c2['attributes']['title'],
-                                                                                        params,
-                                                                                        content='videos',
-                                                                                        folder_name=folder_name)
-
-                                        # Channel livestream when it is only item in page
-                                        # discoveryplus.com (US) -> Introducing discovery+ Channels -> channel page live stream
-                                        # discoveryplus.com (EU) Network Rail -> Channel -> livestream
-                                        if collection['attributes']['component']['id'] == 'player':
-                                            if collection.get('relationships'):
-                                                for c in collection['relationships']['items']['data']:
-                                                    for collectionItem in collectionItems:
-                                                        if c['id'] == collectionItem['id']:
-                                                            if collectionItem['relationships'].get('channel'):
-                                                                for channel in channels:
-                                                                    if collectionItem['relationships']['channel'][
-                                                                        'data']['id'] == channel['id']:
-
-                                                                        if channel['attributes'].get(
-                                                                                'hasLiveStream'):
-                                                                            params = {
-                                                                                'action': 'play',
-                                                                                'video_id': channel['id'],
-                                                                                'video_type': 'channel'
-                                                                            }
-
-                                                                            channel_info = {
-                                                                                'mediatype': 'video',
-                                                                                'title': channel['attributes'].get(
-                                                                                    'name'),
-                                                                                'plot': channel['attributes'].get(
-                                                                                    'description'),
-                                                                                'playcount': '0'
-                                                                            }
-
-                                                                            channel_logo = None
-                                                                            fanart_image = None
-                                                                            if channel['relationships'].get(
-                                                                                    'images'):
-                                                                                for image in images:
-                                                                                    for channel_images in \
-                                                                                            channel[
-                                                                                                'relationships'][
-                                                                                                'images']['data']:
-                                                                                        if image['id'] == \
-                                                                                                channel_images[
-                                                                                                    'id']:
-                                                                                            if image['attributes'][
-                                                                                                'kind'] == 'logo':
-                                                                                                channel_logo = \
-                                                                                                    image[
-                                                                                                        'attributes'][
-                                                                                                        'src']
-                                                                                            if image['attributes'][
-                                                                                                'kind'] == 'default':
-                                                                                                fanart_image = \
-                                                                                                    image[
-                                                                                                        'attributes'][
-                                                                                                        'src']
-
-                                                                            if channel_logo:
-                                                                                thumb_image = channel_logo
-                                                                            else:
-                                                                                thumb_image = fanart_image
-
-                                                                            channel_art = {
-                                                                                'fanart': fanart_image,
-                                                                                'thumb': thumb_image
-                                                                            }
-
-                                                                            helper.add_item(
-                                                                                helper.language(30014) + ' ' +
-                                                                                channel['attributes'].get('name'),
-                                                                                params=params,
-                                                                                info=channel_info, content='videos',
-                                                                                art=channel_art,
-                                                                                playable=True,
-                                                                                folder_name=collection[
-                                                                                    'attributes'].get('title'))
+                                    folder_name = helper.language(30007) + ' / ' + search_query
+
+                                    helper.add_item(c2['attributes']['title'], params, content='videos',
+                                                    folder_name=folder_name)
+
+                    # Channel livestream when it is only item in page
+                    # discoveryplus.com (US) -> Introducing discovery+ Channels -> channel page live stream
+                    # discoveryplus.com (EU) Network Rail -> Channel -> livestream
+                    if collection['attributes']['component']['id'] == 'player':
+                        for collectionItem in included.related_many(collection, 'items'):
+                            channel = included.related(collectionItem, 'channel')
+                            if channel and channel['attributes'].get('hasLiveStream'):
+                                add_live_channel(included, channel, folder_name=collection['attributes'].get('title'))
 
             # More than one pageItem (homepage, browse, channels...)
             else:
-                for page_relationship in page['relationships']['items']['data']:
+                for pageItem in included.related_many(page, 'items'):
                     # Used in discoveryplus.com Home and Browse
                     if page['attributes'].get('component') and page['attributes']['component']['id'] == 'tabbed-page':
-                        for pageItem in pageItems:
-                            if page_relationship['id'] == pageItem['id']:
-                                if pageItem['relationships'].get('link'):
-                                    for link in links:
-                                        if pageItem['relationships']['link']['data']['id'] == link['id']:
-                                            # For You -link
-                                            if link['relationships'].get('linkedContentRoutes'):
-                                                # Find page path from routes
-                                                for route in routes:
-                                                    if route['id'] == \
-                                                            link['relationships']['linkedContentRoutes'][
-                                                                'data'][0]['id']:
-                                                        next_page_path = route['attributes']['url']
+                        link = included.related(pageItem, 'link')
+                        if link:
+                            # For You -link
+                            if link['relationships'].get('linkedContentRoutes'):
+                                params = {
+                                    'action': 'list_page',
+                                    'page_path': included.route_url(link, 'linkedContentRoutes')
+                                }
+
+                                link_art = {}
+
+                            # All, Channel pages listing (discovery+ Originals, HGTV...)
+                            else:
+                                params = {
+                                    'action': 'list_collection',
+                                    'collection_id': link['relationships']['linkedContent']['data']['id']
+                                }
+
+                                thumb_image = included.first_image(link)
+                                link_art = {
+                                    'fanart': thumb_image,
+                                    'thumb': thumb_image
+                                }
+
+                            # Hide sports -> Schedule link
+                            if link['attributes']['alias'] != 'sports-schedule-link':
+
+                                if link['attributes'].get('title'):
+                                    link_title = link['attributes']['title']
+                                elif link['attributes'].get('name'):
+                                    link_title = link['attributes']['name']
+                                else:
+                                    link_title = None
+
+                                helper.add_item(link_title, params, content='videos', art=link_art,
+                                                folder_name=page['attributes'].get('title'))
+
+                        if pageItem['relationships'].get('collection'):
+                            for collection in included.of_type('collection'):
+                                # Genres in US version
+                                if collection['attributes']['component']['id'] == 'taxonomy-container':
+                                    for collectionItem in included.related_many(collection, 'items'):
+                                        taxonomyNode = included.related(collectionItem, 'taxonomyNode')
+                                        if taxonomyNode:
+                                            params = {
+                                                'action': 'list_page',
+                                                'page_path': included.route_url(taxonomyNode)
+                                            }
+
+                                            helper.add_item(taxonomyNode['attributes']['name'], params,
+                                                            content='videos',
+                                                            folder_name=page['attributes'].get('pageMetadataTitle'))
+
+                    # Some pages doesn't have component
+                    # So we use this method to all non tabbed-page
+                    else:
+                        # PageItems have only one collection
+                        collection = included.related(pageItem, 'collection')
+                        # Some collections doesn't have component
+                        if not collection or not collection['attributes'].get('component'):
+                            continue
+
+                        # Home -> For You -> categories
+                        # TV Channel -> categories
+                        if collection['attributes']['component']['id'] == 'content-grid':
+                            # Hide empty grids
+                            if collection.get('relationships'):
+                                if collection['attributes'].get('title') or \
+                                        collection['attributes']['alias'] == 'networks' or \
+                                        collection['attributes']['alias'] == 'network-logo-rail':
+                                    params = {
+                                        'action': 'list_collection',
+                                        'collection_id': collection['id'],
+                                        'mandatoryParams': collection['attributes']['component'].get('mandatoryParams')
+                                        # pf[channel.id]=292&pf[recs.id]=292&pf[recs.type]=channel
+                                    }
+
+                                    if collection['attributes'].get('title'):
+                                        title = collection['attributes']['title']
+                                    else:
+                                        title = collection['attributes']['name']
+
+                                    helper.add_item(title, params, content='videos',
+                                                    folder_name=page['attributes'].get('pageMetadataTitle'))
+
+                        # Episodes, Extras, About the Show, You May Also Like
+                        if collection['attributes']['component']['id'] == 'tabbed-component':
+                            for collectionItem in included.related_many(collection, 'items'):
+                                c2 = included.related(collectionItem, 'collection')
+                                if not c2:
+                                    continue
 
+                                # User setting for listing only seasons in shows page
+                                if helper.get_setting('seasonsonly'):
+                                    list_collection_items(collection_id=c2['id'], page_path=page_path)
+                                else:
+                                    # Episodes and Extras
+                                    if c2['attributes']['component']['id'] == 'tabbed-content':
+                                        # Hide empty Episodes and Extras folders
+                                        if c2.get('relationships'):
+                                            # Check if component is season list and check if there's season listing
+                                            if c2['attributes']['component'].get('filters') and \
+                                                    c2['attributes']['component']['filters'][0].get('options'):
+
+                                                # Have to use list_collection_items because collection comes empty
                                                 params = {
-                                                    'action': 'list_page',
-                                                    'page_path': next_page_path
+                                                    'action': 'list_collection_items',
+                                                    'page_path': page_path,
+                                                    'collection_id': c2['id']
                                                 }
 
-                                                link_art = {}
-
-                                            # All, Channel pages listing (discovery+ Originals, HGTV...)
+                                            # Extras and Episodes list when there's no season listing (movies)
                                             else:
                                                 params = {
                                                     'action': 'list_collection',
-                                                    'collection_id': link['relationships']['linkedContent']['data'][
-                                                        'id']
+                                                    'collection_id': c2['id'],
+                                                    # 66290614510668341673562607828298581172
+                                                    'mandatoryParams': c2['attributes']['component'].get(
+                                                        'mandatoryParams')
+                                                    # pf[show.id]=12423
                                                 }
 
-                                                if link['relationships'].get('images'):
-                                                    for image in images:
-                                                        if image['id'] == link['relationships']['images']['data'][0][
-                                                            'id']:
-                                                            thumb_image = image['attributes']['src']
-                                                else:
-                                                    thumb_image = None
-
-                                                link_art = {
-                                                    'fanart': thumb_image,
-                                                    'thumb': thumb_image
-                                                }
+                                            helper.add_item(c2['attributes']['title'], params, content='videos',
+                                                            folder_name=page['attributes'].get('pageMetadataTitle'))
 
-                                            # Hide sports -> Schedule link
-                                            if link['attributes']['alias'] != 'sports-schedule-link':
-
-                                                if link['attributes'].get('title'):
-                                                    link_title = link['attributes']['title']
-                                                elif link['attributes'].get('name'):
-                                                    link_title = link['attributes']['name']
-                                                else:
-                                                    link_title = None
-
-                                                helper.add_item(link_title, params,
-                                                                content='videos', art=link_art,
-                                                                folder_name=page['attributes'].get('title'))
-
-                                if pageItem['relationships'].get('collection'):
-                                    for collection in collections:
-                                        # Genres in US version
-                                        if collection['attributes']['component']['id'] == 'taxonomy-container':
-                                            for c in collection['relationships']['items']['data']:
-                                                for collectionItem in collectionItems:
-                                                    if c['id'] == collectionItem['id']:
-                                                        if collectionItem['relationships'].get('taxonomyNode'):
-
-                                                            for taxonomyNode in taxonomyNodes:
-                                                                if taxonomyNode['id'] == \
-                                                                        collectionItem['relationships']['taxonomyNode'][
-                                                                            'data']['id']:
-                                                                    # Find page path from routes
-                                                                    for route in routes:
-                                                                        if route['id'] == \
-                                                                                taxonomyNode['relationships'][
-                                                                                    'routes'][
-                                                                                    'data'][0]['id']:
-                                                                            next_page_path = route['attributes']['url']
-
-                                                                    params = {
-                                                                        'action': 'list_page',
-                                                                        'page_path': next_page_path
-                                                                    }
-
-                                                                    helper.add_item(taxonomyNode['attributes']['name'],
-                                                                                    params,
-                                                                                    content='videos',
-                                                                                    folder_name=page['attributes'].get(
-                                                                                        'pageMetadataTitle'))
+                                    # You May Also Like
+                                    # Channel category and Extras on shows that doesn't have episodes
+                                    # Have to use list_collection_items instead list_collection
+                                    # because of generic collection_id
+                                    if c2['attributes']['component']['id'] == 'content-grid':
+                                        params = {
+                                            'action': 'list_collection_items',
+                                            'page_path': page_path,
+                                            'collection_id': c2['id']
+                                        }
 
-                    # Some pages doesn't have component
-                    # So we use this method to all non tabbed-page
-                    else:
-                        for pageItem in pageItems:
-                            if page_relationship['id'] == pageItem['id']:
-                                for collection in collections:
-                                    # Some collections doesn't have component
-                                    if collection['attributes'].get('component'):
-
-                                        # PageItems have only one collection
-                                        if pageItem['relationships']['collection']['data']['id'] == collection['id']:
-
-                                            # Home -> For You -> categories
-                                            # TV Channel -> categories
-                                            if collection['attributes']['component']['id'] == 'content-grid':
-                                                # Hide empty grids
-                                                if collection.get('relationships'):
-                                                    if collection['attributes'].get('title') or \
-                                                            collection['attributes']['alias'] == 'networks' or \
-                                                            collection['attributes']['alias'] == 'network-logo-rail':
-                                                        params = {
-                                                            'action': 'list_collection',
-                                                            'collection_id': collection['id'],
-                                                            'mandatoryParams':
-                                                                collection['attributes'][
-                                                                    'component'].get(
-                                                                    'mandatoryParams')
-                                                            # pf[channel.id]=292&pf[recs.id]=292&pf[recs.type]=channel
-                                                        }
-
-                                                        if collection['attributes'].get('title'):
-                                                            title = collection['attributes']['title']
-                                                        else:
-                                                            title = collection['attributes']['name']
-
-                                                        helper.add_item(title, params,
-                                                                        content='videos',
-                                                                        folder_name=page['attributes'].get(
-                                                                            'pageMetadataTitle'))
-
-                                            # Episodes, Extras, About the Show, You May Also Like
-                                            if collection['attributes']['component']['id'] == 'tabbed-component':
-                                                for c in collection['relationships']['items']['data']:
-                                                    for collectionItem in collectionItems:
-                                                        if c['id'] == collectionItem['id']:
-                                                            for c2 in collections:
-                                                                if \
-                                                                        collectionItem['relationships']['collection'][
-                                                                            'data'][
-                                                                            'id'] == c2['id']:
-
-                                                                    # User setting for listing only seasons in shows page
-                                                                    if helper.get_setting('seasonsonly'):
-                                                                        list_collection_items(collection_id=c2['id'], page_path=page_path)
-                                                                    else:
-                                                                        # Episodes and Extras
-                                                                        if c2['attributes']['component'][
-                                                                            'id'] == 'tabbed-content':
-                                                                            # Hide empty Episodes and Extras folders
-                                                                            if c2.get('relationships'):
-                                                                                # Check if component is season list and check if there's season listing
-                                                                                if c2['attributes']['component'].get(
-                                                                                        'filters') and \
-                                                                                        c2['attributes']['component'][
-                                                                                            'filters'][0].get(
-                                                                                            'options'):
-
-                                                                                    # Have to use list_collection_items because collection comes empty
-                                                                                    params = {
-                                                                                        'action': 'list_collection_items',
-                                                                                        'page_path': page_path,
-                                                                                        'collection_id': c2['id']
-                                                                                    }
-
-                                                                                # Extras and Episodes list when there's no season listing (movies)
-                                                                                else:
-                                                                                    params = {
-                                                                                        'action': 'list_collection',
-                                                                                        'collection_id': c2['id'],
-                                                                                        # 66290614510668341673562607828298581172
-                                                                                        'mandatoryParams':
-                                                                                            c2['attributes'][
-                                                                                                'component'].get(
-                                                                                                'mandatoryParams')
-                                                                                        # pf[show.id]=12423
-                                                                                    }
-
-                                                                                helper.add_item(
-                                                                                    c2['attributes']['title'],
-                                                                                    params,
-                                                                                    content='videos',
-                                                                                    folder_name=page[
-                                                                                        'attributes'].get(
-                                                                                        'pageMetadataTitle'))
-
-                                                                        # You May Also Like
-                                                                        # Channel category and Extras on shows that doesn't have episodes
-                                                                        # Have to use list_collection_items instead list_collection
-                                                                        # because of generic collection_id
-                                                                        if c2['attributes']['component'][
-                                                                            'id'] == 'content-grid':
-                                                                            params = {
-                                                                                'action': 'list_collection_items',
-                                                                                'page_path': page_path,
-                                                                                'collection_id': c2['id']
-                                                                            }
-
-                                                                            helper.add_item(c2['attributes']['title'],
-                                                                                            params,
-                                                                                            content='videos',
-                                                                                            folder_name=page[
-                                                                                                'attributes'].get(
-                                                                                                'pageMetadataTitle'))
-
-                                            # discoveryplus.com (US) -> search -> collections -> list content of collection
-                                            if collection['attributes']['component']['id'] == 'playlist':
-                                                list_collection(collection_id=collection['id'], page=1)
-
-                                            # discoveryplus.com (US) -> Introducing discovery+ Channels -> channel page live stream
-                                            # discoveryplus.com (EU) Network Rail -> Channel -> livestream
-                                            if collection['attributes']['component']['id'] == 'player':
-                                                if collection.get('relationships'):
-                                                    for c in collection['relationships']['items']['data']:
-                                                        for collectionItem in collectionItems:
-                                                            if c['id'] == collectionItem['id']:
-                                                                if collectionItem['relationships'].get('channel'):
-                                                                    for channel in channels:
-                                                                        if collectionItem['relationships']['channel'][
-                                                                            'data']['id'] == channel['id']:
-
-                                                                            if channel['attributes'].get(
-                                                                                    'hasLiveStream'):
-                                                                                params = {
-                                                                                    'action': 'play',
-                                                                                    'video_id': channel['id'],
-                                                                                    'video_type': 'channel'
-                                                                                }
-
-                                                                                channel_info = {
-                                                                                    'mediatype': 'video',
-                                                                                    'title': channel['attributes'].get(
-                                                                                        'name'),
-                                                                                    'plot': channel['attributes'].get(
-                                                                                        'description'),
-                                                                                    'playcount': '0'
-                                                                                }
-
-                                                                                channel_logo = None
-                                                                                fanart_image = None
-                                                                                if channel['relationships'].get(
-                                                                                        'images'):
-                                                                                    for image in images:
-                                                                                        for channel_images in \
-                                                                                                channel[
-                                                                                                    'relationships'][
-                                                                                                    'images']['data']:
-                                                                                            if image['id'] == \
-                                                                                                    channel_images[
-                                                                                                        'id']:
-                                                                                                if image['attributes'][
-                                                                                                    'kind'] == 'logo':
-                                                                                                    channel_logo = \
-                                                                                                        image[
-                                                                                                            'attributes'][
-                                                                                                            'src']
-                                                                                                if image['attributes'][
-                                                                                                    'kind'] == 'default':
-                                                                                                    fanart_image = \
-                                                                                                        image[
-                                                                                                            'attributes'][
-                                                                                                            'src']
-
-                                                                                if channel_logo:
-                                                                                    thumb_image = channel_logo
-                                                                                else:
-                                                                                    thumb_image = fanart_image
-
-                                                                                channel_art = {
-                                                                                    'fanart': fanart_image,
-                                                                                    'thumb': thumb_image
-                                                                                }
-
-                                                                                helper.add_item(
-                                                                                    helper.language(30014) + ' ' +
-                                                                                    channel['attributes'].get('name'),
-                                                                                    params=params,
-                                                                                    info=channel_info, content='videos',
-                                                                                    art=channel_art,
-                                                                                    playable=True,
-                                                                                    folder_name=collection[
-                                                                                        'attributes'].get('title'))
+                                        helper.add_item(c2['attributes']['title'], params, content='videos',
+                                                        folder_name=page['attributes'].get('pageMetadataTitle'))
+
+                        # discoveryplus.com (US) -> search -> collections -> list content of collection
+                        if collection['attributes']['component']['id'] == 'playlist':
+                            list_collection(collection_id=collection['id'], page=1)
+
+                        # discoveryplus.com (US) -> Introducing discovery+ Channels -> channel page live stream
+                        # discoveryplus.com (EU) Network Rail -> Channel -> livestream
+                        if collection['attributes']['component']['id'] == 'player':
+                            for collectionItem in included.related_many(collection, 'items'):
+                                channel = included.related(collectionItem, 'channel')
+                                if channel and channel['attributes'].get('hasLiveStream'):
+                                    add_live_channel(included, channel,
+                                                     folder_name=collection['attributes'].get('title'))
 
     helper.eod()
 
@@ -574,15 +371,7 @@ def list_page_us(page_path, search_query=None):
 def list_page_in(page_path):
     page_data = helper.d.get_page(page_path)
 
-    pages = list(filter(lambda x: x['type'] == 'page', page_data['included']))
-    pageItems = list(filter(lambda x: x['type'] == 'pageItem', page_data['included']))
-    collections = list(filter(lambda x: x['type'] == 'collection', page_data['included']))
-    collectionItems = list(filter(lambda x: x['type'] == 'collectionItem', page_data['included']))
-    images = list(filter(lambda x: x['type'] == 'image', page_data['included']))
-    channels = list(filter(lambda x: x['type'] == 'channel', page_data['included']))
-    links = list(filter(lambda x: x['type'] == 'link', page_data['included']))
-    routes = list(filter(lambda x: x['type'] == 'route', page_data['included']))
-    taxonomyNodes = list(filter(lambda x: x['type'] == 'taxonomyNode', page_data['included']))
+    included = Resolver(page_data)
 
     if page_data['data']['type'] == 'route':
         if page_path == '/home':
@@ -606,856 +395,406 @@ def list_page_in(page_path):
 
                     helper.add_item(title, params, content='videos')
 
-        for page in pages:
+        for page in included.of_type('page'):
             # If only one pageItem in page -> relationships -> items -> data, list content page
             if len(page['relationships']['items']['data']) == 1:
-                for pageItem in pageItems:
-                    if page['relationships']['items']['data'][0]['id'] == pageItem['id']:
-                        for collection in collections:
-                            if pageItem['relationships']['collection']['data']['id'] == collection['id']:
-                                # Some collections doesn't have component
-                                if collection['attributes'].get('component'):
-
-                                    # if content-grid after pageItem -> list content
-                                    if collection['attributes']['component']['id'] == 'content-grid':
-                                        list_collection(collection_id=collection['id'], page=1)
-
-                                    if collection['attributes']['component']['id'] == 'mindblown-composite' or \
-                                            collection['attributes']['component']['id'] == 'tab-bar':
-                                        for collection_relationship in collection['relationships']['items']['data']:
-                                            for collectionItem in collectionItems:
-                                                if collection_relationship['id'] == collectionItem['id']:
-                                                    for c2 in collections:
-                                                        if c2['id'] == \
-                                                                collectionItem['relationships']['collection']['data'][
-                                                                    'id']:
-
-                                                            if c2['attributes']['component'][
-                                                                'id'] == 'mindblown-videos-list':
-                                                                list_collection(collection_id=c2['id'], page=1)
-
-                                                            # Favorites (Episodes, Shorts, Shows) and Watchlist (Episodes, Shorts)
-                                                            if c2['attributes']['component']['id'] == 'tab-bar-item':
-                                                                if c2['attributes']['component'].get(
-                                                                        'customAttributes'):
-                                                                    contentType = \
-                                                                        c2['attributes']['component'][
-                                                                            'customAttributes'][
-                                                                            'contentType']
-                                                                    if contentType == 'watchlistVideos':
-                                                                        params = {
-                                                                            'action': 'list_favorite_watchlist_videos',
-                                                                            'playlist': 'dplus-watchlist-videos'
-                                                                        }
-                                                                    elif contentType == 'watchlistShorts':
-                                                                        params = {
-                                                                            'action': 'list_favorite_watchlist_videos',
-                                                                            'playlist': 'dplus-watchlist-shorts'
-                                                                        }
-                                                                    elif contentType == 'favoriteEpisodes':
-                                                                        params = {
-                                                                            'action': 'list_favorite_watchlist_videos',
-                                                                            'videoType': 'EPISODE'
-                                                                        }
-                                                                    elif contentType == 'favoriteShorts':
-                                                                        params = {
-                                                                            'action': 'list_favorite_watchlist_videos',
-                                                                            'videoType': 'CLIP'
-                                                                        }
-                                                                    elif contentType == 'favoriteShows':
-                                                                        params = {
-                                                                            'action': 'list_favorites'
-                                                                        }
-                                                                    else:
-                                                                        params = {}
-
-                                                                if c2['attributes'].get('title'):
-                                                                    title = c2['attributes']['title']
-                                                                else:
-                                                                    title = c2['attributes']['name']
-
-                                                                helper.add_item(title, params,
-                                                                                content='videos',
-                                                                                folder_name=collection[
-                                                                                    'attributes'].get('title'))
+                pageItem = included.resolve(page['relationships']['items']['data'][0])
+                collection = included.related(pageItem, 'collection') if pageItem else None
+                # Some collections doesn't have component
+                if not collection or not collection['attributes'].get('component'):
+                    continue
+
+                # if content-grid after pageItem -> list content
+                if collection['attributes']['component']['id'] == 'content-grid':
+                    list_collection(collection_id=collection['id'], page=1)
+
+                if collection['attributes']['component']['id'] == 'mindblown-composite' or \
+                        collection['attributes']['component']['id'] == 'tab-bar':
+                    for collectionItem in included.related_many(collection, 'items'):
+                        c2 = included.related(collectionItem, 'collection')
+                        if not c2:
+                            continue
+
+                        if c2['attributes']['component']['id'] == 'mindblown-videos-list':
+                            list_collection(collection_id=c2['id'], page=1)
+
+                        # Favorites (Episodes, Shorts, Shows) and Watchlist (Episodes, Shorts)
+                        if c2['attributes']['component']['id'] == 'tab-bar-item':
+                            params = {}
+                            if c2['attributes']['component'].get('customAttributes'):
+                                contentType = c2['attributes']['component']['customAttributes']['contentType']
+                                if contentType == 'watchlistVideos':
+                                    params = {
+                                        'action': 'list_favorite_watchlist_videos',
+                                        'playlist': 'dplus-watchlist-videos'
+                                    }
+                                elif contentType == 'watchlistShorts':
+                                    params = {
+                                        'action': 'list_favorite_watchlist_videos',
+                                        'playlist': 'dplus-watchlist-shorts'
+                                    }
+                                elif contentType == 'favoriteEpisodes':
+                                    params = {
+                                        'action': 'list_favorite_watchlist_videos',
+                                        'videoType': 'EPISODE'
+                                    }
+                                elif contentType == 'favoriteShorts':
+                                    params = {
+                                        'action': 'list_favorite_watchlist_videos',
+                                        'videoType': 'CLIP'
+                                    }
+                                elif contentType == 'favoriteShows':
+                                    params = {
+                                        'action': 'list_favorites'
+                                    }
+
+                            if c2['attributes'].get('title'):
+                                title = c2['attributes']['title']
+                            else:
+                                title = c2['attributes']['name']
+
+                            helper.add_item(title, params, content='videos',
+                                            folder_name=collection['attributes'].get('title'))
 
             # More than one pageItem (explore, mindblown...)
             else:
-                for page_relationship in page['relationships']['items']['data']:
-                    for pageItem in pageItems:
-                        if page_relationship['id'] == pageItem['id']:
-                            for collection in collections:
-                                # Some collections doesn't have component
-                                if collection['attributes'].get('component'):
-
-                                    # PageItems have only one collection
-                                    if pageItem['relationships']['collection']['data']['id'] == collection['id']:
-
-                                        if collection['attributes']['component']['id'] == 'promoted-shorts-list':
-                                            if collection.get('relationships'):
-                                                if collection['attributes'].get('title') or \
-                                                        collection['attributes'].get('name'):
-
-                                                    params = {
-                                                        'action': 'list_collection',
-                                                        'collection_id': collection['attributes']['alias']
-                                                    }
-
-                                                    if collection['attributes'].get('title'):
-                                                        title = collection['attributes']['title']
-                                                    else:
-                                                        title = collection['attributes']['name']
-
-                                                    helper.add_item(title, params,
-                                                                    content='videos',
-                                                                    folder_name=page['attributes'].get(
-                                                                        'pageMetadataTitle'))
-
-                                        if collection['attributes']['component']['id'] == 'mindblown-listing':
-                                            for c in collection['relationships']['items']['data']:
-                                                for collectionItem in collectionItems:
-                                                    if c['id'] == collectionItem['id']:
-                                                        for c2 in collections:
-                                                            if c2['id'] == \
-                                                                    collectionItem['relationships']['collection'][
-                                                                        'data']['id']:
-                                                                for collectionItem2 in collectionItems:
-                                                                    if collectionItem2['id'] == \
-                                                                            c2['relationships']['items']['data'][0][
-                                                                                'id']:
-
-                                                                        thumb_image = None
-                                                                        for link in links:
-                                                                            if link['id'] == \
-                                                                                    collectionItem2['relationships'][
-                                                                                        'link']['data']['id']:
-
-                                                                                # Find page path from routes
-                                                                                for route in routes:
-                                                                                    if route['id'] == \
-                                                                                            link['relationships'][
-                                                                                                'linkedContentRoutes'][
-                                                                                                'data'][0]['id']:
-                                                                                        next_page_path = \
-                                                                                            route['attributes']['url']
-
-                                                                                if link['relationships'].get('images'):
-                                                                                    for image in images:
-                                                                                        if image['id'] == \
-                                                                                                link['relationships'][
-                                                                                                    'images'][
-                                                                                                    'data'][0][
-                                                                                                    'id']:
-                                                                                            thumb_image = \
-                                                                                                image['attributes'][
-                                                                                                    'src']
-
-                                                                        params = {
-                                                                            'action': 'list_page',
-                                                                            'page_path': next_page_path
-                                                                        }
-
-                                                                        info = {
-                                                                            'title': c2['attributes'].get(
-                                                                                'title'),
-                                                                            'plot': c2['attributes'].get(
-                                                                                'description')
-                                                                        }
-
-                                                                        category_art = {
-                                                                            'fanart': thumb_image,
-                                                                            'thumb': thumb_image
-                                                                        }
-
-                                                                        helper.add_item(c2['attributes']['title'],
-                                                                                        params,
-                                                                                        info=info,
-                                                                                        content='videos',
-                                                                                        art=category_art,
-                                                                                        folder_name=page[
-                                                                                            'attributes'].get(
-                                                                                            'pageMetadataTitle'))
-
-                                        # Shows page in discoveryplus.in (Episodes, Shorts)
-                                        if collection['attributes']['component']['id'] == 'show-container':
-                                            list_collection_items(collection_id=collection['id'], page_path=page_path)
-
-                                        # Channels page category links (example Discovery -> Discovery Shows) and 'Explore Shows and Full Episodes' -> BBC
-                                        if collection['attributes']['component']['id'] == 'content-grid':
-                                            # Hide empty grids (example upcoming events when there is no upcoming events).
-                                            if collection.get('relationships'):
-                                                if collection['attributes'].get('title'):
-                                                    params = {
-                                                        'action': 'list_collection',
-                                                        'collection_id': collection['id']
-                                                    }
-
-                                                    helper.add_item(collection['attributes']['title'], params,
-                                                                    content='videos',
-                                                                    folder_name=page['attributes'].get(
-                                                                        'pageMetadataTitle'))
-                                                # Explore Shows and Full Episodes -> BBC
-                                                else:
-                                                    list_collection(collection_id=collection['id'],
-                                                                    mandatoryParams=collection['attributes'][
-                                                                        'component'].get('mandatoryParams'), page=1)
-
-                                        # Channel livestream
-                                        if collection['attributes']['component']['id'] == 'channel-hero-player':
-                                            for collectionItem in collectionItems:
-                                                if collection['relationships']['items']['data'][0]['id'] == \
-                                                        collectionItem['id']:
-                                                    if collectionItem['relationships'].get('channel'):
-
-                                                        # Channel livestream
-                                                        for channel in channels:
-                                                            if \
-                                                                    collectionItem['relationships']['channel'][
-                                                                        'data'][
-                                                                        'id'] == channel['id']:
-                                                                params = {
-                                                                    'action': 'play',
-                                                                    'video_id': channel['id'],
-                                                                    'video_type': 'channel'
-                                                                }
-
-                                                                channel_info = {
-                                                                    'mediatype': 'video',
-                                                                    'title': channel['attributes'].get('name'),
-                                                                    'plot': channel['attributes'].get(
-                                                                        'description'),
-                                                                    'playcount': '0'
-                                                                }
-
-                                                                channel_logo = None
-                                                                fanart_image = None
-                                                                if channel['relationships'].get('images'):
-                                                                    for image in images:
-                                                                        for channel_images in \
-                                                                                channel['relationships']['images'][
-                                                                                    'data']:
-                                                                            if image['id'] == channel_images[
-                                                                                'id']:
-                                                                                if image['attributes'][
-                                                                                    'kind'] == 'logo':
-                                                                                    channel_logo = \
-                                                                                        image['attributes']['src']
-                                                                                if image['attributes'][
-                                                                                    'kind'] == 'default':
-                                                                                    fanart_image = \
-                                                                                        image['attributes']['src']
-
-                                                                if channel_logo:
-                                                                    thumb_image = channel_logo
-                                                                else:
-                                                                    thumb_image = fanart_image
-
-                                                                channel_art = {
-                                                                    'fanart': fanart_image,
-                                                                    'thumb': thumb_image
-                                                                }
-
-                                                                helper.add_item(
-                                                                    helper.language(30014) + ' ' + channel[
-                                                                        'attributes'].get('name'),
-                                                                    params=params,
-                                                                    art=channel_art, info=channel_info,
-                                                                    content='videos',
-                                                                    playable=True)
-
-                                        # Used in Premium page, Home (Category and OMG Moments!) and Shorts genres content
-                                        if collection['attributes']['component']['id'] == 'carousel':
-                                            params = {
-                                                'action': 'list_collection',
-                                                'collection_id': collection['id']
-                                            }
+                for pageItem in included.related_many(page, 'items'):
+                    # PageItems have only one collection
+                    collection = included.related(pageItem, 'collection')
+                    # Some collections doesn't have component
+                    if not collection or not collection['attributes'].get('component'):
+                        continue
 
-                                            if collection['attributes'].get('title'):
-                                                title = collection['attributes']['title']
-                                            else:
-                                                title = collection['attributes']['name']
+                    if collection['attributes']['component']['id'] == 'promoted-shorts-list':
+                        if collection.get('relationships'):
+                            if collection['attributes'].get('title') or collection['attributes'].get('name'):
 
-                                            helper.add_item(title, params,
-                                                            content='videos',
-                                                            folder_name=page['attributes'].get('pageMetadataTitle'))
+                                params = {
+                                    'action': 'list_collection',
+                                    'collection_id': collection['attributes']['alias']
+                                }
 
-                                        # Shorts page categories
-                                        if collection['attributes']['component']['id'] == 'all-taxonomies':
-                                            for collectionItem in collectionItems:
-                                                for collection_relationship in collection['relationships']['items'][
-                                                    'data']:
-                                                    if collectionItem['id'] == collection_relationship['id']:
-                                                        if collectionItem['relationships'].get('collection'):
-                                                            for c2 in collections:
-                                                                if c2['id'] == \
-                                                                        collectionItem['relationships']['collection'][
-                                                                            'data']['id']:
-                                                                    if c2.get('relationships'):
-                                                                        for c2_relationship in \
-                                                                                c2['relationships']['items']['data']:
-                                                                            for collectionItem2 in collectionItems:
-                                                                                if collectionItem2['id'] == \
-                                                                                        c2_relationship['id']:
-                                                                                    if collectionItem2[
-                                                                                        'relationships'].get(
-                                                                                        'taxonomyNode'):
-
-                                                                                        for taxonomyNode in taxonomyNodes:
-                                                                                            if taxonomyNode['id'] == \
-                                                                                                    collectionItem2[
-                                                                                                        'relationships'][
-                                                                                                        'taxonomyNode'][
-                                                                                                        'data']['id']:
-
-                                                                                                # Find page path from routes
-                                                                                                for route in routes:
-                                                                                                    if route['id'] == \
-                                                                                                            taxonomyNode[
-                                                                                                                'relationships'][
-                                                                                                                'routes'][
-                                                                                                                'data'][
-                                                                                                                0][
-                                                                                                                'id']:
-                                                                                                        next_page_path = \
-                                                                                                            route[
-                                                                                                                'attributes'][
-                                                                                                                'url']
-
-                                                                                                params = {
-                                                                                                    'action': 'list_page',
-                                                                                                    'page_path': next_page_path
-                                                                                                }
-
-                                                                                                helper.add_item(
-                                                                                                    taxonomyNode[
-                                                                                                        'attributes'][
-                                                                                                        'name'], params,
-                                                                                                    content='videos')
+                                if collection['attributes'].get('title'):
+                                    title = collection['attributes']['title']
+                                else:
+                                    title = collection['attributes']['name']
 
-    helper.eod()
+                                helper.add_item(title, params, content='videos',
+                                                folder_name=page['attributes'].get('pageMetadataTitle'))
 
-def list_collection_items(collection_id, page_path=None):
-    page_data = helper.d.get_page(page_path)
+                    if collection['attributes']['component']['id'] == 'mindblown-listing':
+                        for collectionItem in included.related_many(collection, 'items'):
+                            c2 = included.related(collectionItem, 'collection')
+                            if not c2:
+                                continue
+                            collectionItem2 = included.resolve(c2['relationships']['items']['data'][0])
+                            link = included.related(collectionItem2, 'link') if collectionItem2 else None
+                            if not link:
+                                continue
+
+                            thumb_image = included.first_image(link)
 
-    pages = list(filter(lambda x: x['type'] == 'page', page_data['included']))
-    collections = list(filter(lambda x: x['type'] == 'collection', page_data['included']))
-    collectionItems = list(filter(lambda x: x['type'] == 'collectionItem', page_data['included']))
-    images = list(filter(lambda x: x['type'] == 'image', page_data['included']))
-    shows = list(filter(lambda x: x['type'] == 'show', page_data['included']))
-    videos = list(filter(lambda x: x['type'] == 'video', page_data['included']))
-    channels = list(filter(lambda x: x['type'] == 'channel', page_data['included']))
-    routes = list(filter(lambda x: x['type'] == 'route', page_data['included']))
-    taxonomyNodes = list(filter(lambda x: x['type'] == 'taxonomyNode', page_data['included']))
-
-    for collection in collections:
-        if collection['id'] == collection_id:
-            # dicoveryplus.com (US and EU) and discoveryplus.in list series season grid
-            if collection['attributes'].get('component') and collection['attributes']['component'][
-                'id'] == 'tabbed-content':
-                # Check if there's any seasons of show or sport event
-                if collection['attributes']['component'].get('filters'):
-
-                    # If there's only one season and setting flattentvshows is true -> list videos
-                    if helper.get_setting('flattentvshows') and \
-                            len(collection['attributes']['component']['filters'][0]['options']) == 1:
-                        list_collection(collection_id=collection['id'],
-                                        page=1,
-                                        mandatoryParams=collection['attributes']['component'].get('mandatoryParams'),
-                                        parameter=collection['attributes']['component']['filters'][0]['options'][0][
-                                            'id'])
-                    else:
-                        for option in collection['attributes']['component']['filters'][0][
-                            'options']:
-                            title = helper.language(30011) + ' ' + str(option['id'])
                             params = {
-                                'action': 'list_collection',
-                                'collection_id': collection['id'],
-                                # 66290614510668341673562607828298581172
-                                'mandatoryParams': collection['attributes'][
-                                    'component'].get(
-                                    'mandatoryParams'),  # pf[show.id]=12423
-                                'parameter': option['parameter']  # pf[seasonNumber]=1
+                                'action': 'list_page',
+                                'page_path': included.route_url(link, 'linkedContentRoutes')
                             }
 
                             info = {
-                                'mediatype': 'season'
+                                'title': c2['attributes'].get('title'),
+                                'plot': c2['attributes'].get('description')
                             }
 
-                            # Show metadata
-                            # Some show pages doesn't have primaryContent = show id and also doesn't have metadata of show
-                            if pages[0]['relationships'].get('primaryContent'):
-                                for show in shows:
-                                    if show['id'] == pages[0]['relationships']['primaryContent']['data']['id']:
-
-                                        info['tvshowtitle'] = show['attributes'].get('name')
-                                        info['plotoutline'] = show['attributes'].get('description')
-                                        info['plot'] = show['attributes'].get('longDescription')
-                                        info['season'] = len(show['attributes']['seasonNumbers'])
-                                        info['episode'] = show['attributes']['episodeCount']
-
-                                        g = []
-                                        # Show genres
-                                        if show['relationships'].get('txGenres'):
-                                            for taxonomyNode in taxonomyNodes:
-                                                for show_genre in show['relationships']['txGenres']['data']:
-                                                    if taxonomyNode['id'] == show_genre['id']:
-                                                        g.append(taxonomyNode['attributes']['name'])
-
-                                        mpaa = None
-                                        if show['attributes'].get('contentRatings'):
-                                            for contentRating in show['attributes']['contentRatings']:
-                                                if contentRating['system'] == helper.d.contentRatingSystem:
-                                                    mpaa = contentRating['code']
-
-                                        if show['relationships'].get('primaryChannel'):
-                                            for channel in channels:
-                                                if channel['id'] == \
-                                                        show['relationships']['primaryChannel']['data'][
-                                                            'id']:
-                                                    primaryChannel = channel['attributes']['name']
-                                        else:
-                                            primaryChannel = None
-
-                                        info['genre'] = g
-                                        info['studio'] = primaryChannel
-                                        info['mpaa'] = mpaa
-
-                                        fanart_image = None
-                                        thumb_image = None
-                                        logo_image = None
-                                        poster_image = None
-                                        if show['relationships'].get('images'):
-                                            for image in images:
-                                                for show_images in show['relationships']['images']['data']:
-                                                    if image['id'] == show_images['id']:
-                                                        if image['attributes']['kind'] == 'default':
-                                                            fanart_image = image['attributes']['src']
-                                                            thumb_image = image['attributes']['src']
-                                                        if image['attributes']['kind'] == 'logo':
-                                                            logo_image = image['attributes']['src']
-                                                        # discoveryplus.in has logos in poster
-                                                        if helper.d.locale_suffix == 'in':
-                                                            if image['attributes']['kind'] == 'poster':
-                                                                poster_image = image['attributes']['src']
-                                                        else:
-                                                            if image['attributes'][
-                                                                'kind'] == 'poster_with_logo':
-                                                                poster_image = image['attributes']['src']
-
-                                        show_art = {
-                                            'fanart': fanart_image,
-                                            'thumb': thumb_image,
-                                            'clearlogo': logo_image,
-                                            'poster': poster_image
-                                        }
+                            category_art = {
+                                'fanart': thumb_image,
+                                'thumb': thumb_image
+                            }
 
-                                        if collection['attributes'].get('title'):
-                                            folder_name = show['attributes'].get('name') + ' / ' + collection[
-                                                'attributes'].get(
-                                                'title')
-                                        else:
-                                            folder_name = show['attributes'].get('name')
+                            helper.add_item(c2['attributes']['title'], params, info=info, content='videos',
+                                            art=category_art,
+                                            folder_name=page['attributes'].get('pageMetadataTitle'))
+
+                    # Shows page in discoveryplus.in (Episodes, Shorts)
+                    if collection['attributes']['component']['id'] == 'show-container':
+                        list_collection_items(collection_id=collection['id'], page_path=page_path)
+
+                    # Channels page category links (example Discovery -> Discovery Shows) and 'Explore Shows and Full Episodes' -> BBC
+                    if collection['attributes']['component']['id'] == 'content-grid':
+                        # Hide empty grids (example upcoming events when there is no upcoming events).
+                        if collection.get('relationships'):
+                            if collection['attributes'].get('title'):
+                                params = {
+                                    'action': 'list_collection',
+                                    'collection_id': collection['id']
+                                }
+
+                                helper.add_item(collection['attributes']['title'], params, content='videos',
+                                                folder_name=page['attributes'].get('pageMetadataTitle'))
+                            # Explore Shows and Full Episodes -> BBC
                             else:
-                                info = {}
-                                show_art = {}
-                                folder_name = pages[0]['attributes'].get('title') + ' / ' + collection['attributes'].get(
-                                    'title')
+                                list_collection(collection_id=collection['id'],
+                                                mandatoryParams=collection['attributes']['component'].get(
+                                                    'mandatoryParams'), page=1)
+
+                    # Channel livestream
+                    if collection['attributes']['component']['id'] == 'channel-hero-player':
+                        collectionItem = included.resolve(collection['relationships']['items']['data'][0])
+                        channel = included.related(collectionItem, 'channel') if collectionItem else None
+                        if channel:
+                            add_live_channel(included, channel)
+
+                    # Used in Premium page, Home (Category and OMG Moments!) and Shorts genres content
+                    if collection['attributes']['component']['id'] == 'carousel':
+                        params = {
+                            'action': 'list_collection',
+                            'collection_id': collection['id']
+                        }
+
+                        if collection['attributes'].get('title'):
+                            title = collection['attributes']['title']
+                        else:
+                            title = collection['attributes']['name']
+
+                        helper.add_item(title, params, content='videos',
+                                        folder_name=page['attributes'].get('pageMetadataTitle'))
+
+                    # Shorts page categories
+                    if collection['attributes']['component']['id'] == 'all-taxonomies':
+                        for collectionItem in included.related_many(collection, 'items'):
+                            c2 = included.related(collectionItem, 'collection')
+                            if c2 and c2.get('relationships'):
+                                for collectionItem2 in included.related_many(c2, 'items'):
+                                    taxonomyNode = included.related(collectionItem2, 'taxonomyNode')
+                                    if taxonomyNode:
+                                        params = {
+                                            'action': 'list_page',
+                                            'page_path': included.route_url(taxonomyNode)
+                                        }
 
-                            helper.add_item(title, params, info=info, art=show_art,
-                                            content='seasons', folder_name=folder_name,
-                                            sort_method='sort_label')
+                                        helper.add_item(taxonomyNode['attributes']['name'], params,
+                                                        content='videos')
 
-            # content-grid, content-hero etc
-            else:
-                for collection_relationship in collection['relationships']['items']['data']:
-                    for collectionItem in collectionItems:
-                        if collection_relationship['id'] == collectionItem['id']:
-
-                            # discoveryplus.in (Episodes, Shorts)
-                            if collectionItem['relationships'].get('collection'):
-                                for c2 in collections:
-                                    if collectionItem['relationships']['collection']['data']['id'] == c2['id']:
-                                        # Don't list empty category
-                                        if c2.get('relationships'):
-                                            params = {
-                                                'action': 'list_collection_items',
-                                                'page_path': page_path,
-                                                'collection_id': c2['id']
-                                            }
+    helper.eod()
 
-                                            if c2['attributes'].get('name'):
-                                                if c2['attributes']['name'] == 'blueprint-show-seasons-grid':
-                                                    title = 'Episodes'
-                                                elif c2['attributes']['name'] == 'blueprint-show-shorts':
-                                                    title = 'Shorts'
-                                                else:
-                                                    title = c2['attributes']['name']
-                                            else:
-                                                title = ''
+def list_collection_items(collection_id, page_path=None):
+    page_data = helper.d.get_page(page_path)
+
+    included = Resolver(page_data)
+    metadata = get_metadata(included)
+    availability = AvailabilityEvaluator(helper.d.entitlements).evaluate(included.of_type('video'))
+    pages = included.of_type('page')
+
+    collection = included.get('collection', collection_id)
+    if collection:
+        # dicoveryplus.com (US and EU) and discoveryplus.in list series season grid
+        if collection['attributes'].get('component') and collection['attributes']['component']['id'] == 'tabbed-content':
+            # Check if there's any seasons of show or sport event
+            if collection['attributes']['component'].get('filters'):
+
+                # If there's only one season and setting flattentvshows is true -> list videos
+                if helper.get_setting('flattentvshows') and \
+                        len(collection['attributes']['component']['filters'][0]['options']) == 1:
+                    list_collection(collection_id=collection['id'],
+                                    page=1,
+                                    mandatoryParams=collection['attributes']['component'].get('mandatoryParams'),
+                                    parameter=collection['attributes']['component']['filters'][0]['options'][0]['id'])
+                else:
+                    # Show metadata
+                    # Some show pages doesn't have primaryContent = show id and also doesn't have metadata of show
+                    show = None
+                    if pages[0]['relationships'].get('primaryContent'):
+                        show = included.get('show', pages[0]['relationships']['primaryContent']['data']['id'])
+
+                    if show:
+                        show_info = {
+                            'tvshowtitle': show['attributes'].get('name'),
+                            'plotoutline': show['attributes'].get('description'),
+                            'plot': show['attributes'].get('longDescription'),
+                            'season': len(show['attributes']['seasonNumbers']),
+                            'episode': show['attributes']['episodeCount'],
+                            'genre': metadata.genres(show),
+                            'studio': metadata.studio(show),
+                            'mpaa': metadata.mpaa(show)
+                        }
+
+                        show_art = metadata.show_art(show)
+
+                        if collection['attributes'].get('title'):
+                            folder_name = show['attributes'].get('name') + ' / ' + collection['attributes'].get(
+                                'title')
+                        else:
+                            folder_name = show['attributes'].get('name')
+                    else:
+                        show_info = {}
+                        show_art = {}
+                        folder_name = pages[0]['attributes'].get('title') + ' / ' + collection['attributes'].get(
+                            'title')
+
+                    for option in collection['attributes']['component']['filters'][0]['options']:
+                        title = helper.language(30011) + ' ' + str(option['id'])
+                        params = {
+                            'action': 'list_collection',
+                            'collection_id': collection['id'],
+                            # 66290614510668341673562607828298581172
+                            'mandatoryParams': collection['attributes']['component'].get(
+                                'mandatoryParams'),  # pf[show.id]=12423
+                            'parameter': option['parameter']  # pf[seasonNumber]=1
+                        }
+
+                        info = {
+                            'mediatype': 'season'
+                        }
+                        info.update(show_info)
+
+                        helper.add_item(title, params, info=info, art=show_art,
+                                        content='seasons', folder_name=folder_name,
+                                        sort_method='sort_label')
+
+        # content-grid, content-hero etc
+        else:
+            for collectionItem in included.related_many(collection, 'items'):
 
-                                            helper.add_item(title, params, content='videos',
-                                                            folder_name=pages[0]['attributes'].get('title'))
+                # discoveryplus.in (Episodes, Shorts)
+                c2 = included.related(collectionItem, 'collection')
+                # Don't list empty category
+                if c2 and c2.get('relationships'):
+                    params = {
+                        'action': 'list_collection_items',
+                        'page_path': page_path,
+                        'collection_id': c2['id']
+                    }
 
-                            # List shows
-                            if collectionItem['relationships'].get('show'):
-                                for show in shows:
-                                    if collectionItem['relationships']['show']['data']['id'] == show['id']:
+                    if c2['attributes'].get('name'):
+                        if c2['attributes']['name'] == 'blueprint-show-seasons-grid':
+                            title = 'Episodes'
+                        elif c2['attributes']['name'] == 'blueprint-show-shorts':
+                            title = 'Shorts'
+                        else:
+                            title = c2['attributes']['name']
+                    else:
+                        title = ''
 
-                                        title = show['attributes']['name'].encode('utf-8')
+                    helper.add_item(title, params, content='videos',
+                                    folder_name=pages[0]['attributes'].get('title'))
 
-                                        # Find page path from routes
-                                        for route in routes:
-                                            if route['id'] == show['relationships']['routes']['data'][0]['id']:
-                                                next_page_path = route['attributes']['url']
+                # List shows
+                show = included.related(collectionItem, 'show')
+                if show:
+                    title = show['attributes']['name'].encode('utf-8')
 
-                                        params = {
-                                            'action': 'list_page',
-                                            'page_path': next_page_path
-                                        }
+                    params = {
+                        'action': 'list_page',
+                        'page_path': included.route_url(show)
+                    }
 
-                                        g = []
-                                        # Show genres
-                                        if show['relationships'].get('txGenres'):
-                                            for taxonomyNode in taxonomyNodes:
-                                                for show_genre in show['relationships']['txGenres']['data']:
-                                                    if taxonomyNode['id'] == show_genre['id']:
-                                                        g.append(taxonomyNode['attributes']['name'])
-
-                                        mpaa = None
-                                        if show['attributes'].get('contentRatings'):
-                                            for contentRating in show['attributes']['contentRatings']:
-                                                if contentRating['system'] == helper.d.contentRatingSystem:
-                                                    mpaa = contentRating['code']
-
-                                        if show['relationships'].get('primaryChannel'):
-                                            for channel in channels:
-                                                if channel['id'] == show['relationships']['primaryChannel']['data'][
-                                                    'id']:
-                                                    primaryChannel = channel['attributes']['name']
-                                        else:
-                                            primaryChannel = None
-
-                                        info = {
-                                            'mediatype': 'tvshow',
-                                            'plotoutline': show['attributes'].get('description'),
-                                            'plot': show['attributes'].get('longDescription'),
-                                            'genre': g,
-                                            'studio': primaryChannel,
-                                            'season': len(show['attributes'].get('seasonNumbers')),
-                                            'episode': show['attributes'].get('episodeCount'),
-                                            'mpaa': mpaa
-                                        }
+                    info = {
+                        'mediatype': 'tvshow',
+                        'plotoutline': show['attributes'].get('description'),
+                        'plot': show['attributes'].get('longDescription'),
+                        'genre': metadata.genres(show),
+                        'studio': metadata.studio(show),
+                        'season': len(show['attributes'].get('seasonNumbers')),
+                        'episode': show['attributes'].get('episodeCount'),
+                        'mpaa': metadata.mpaa(show)
+                    }
 
-                                        # Add or delete favorite context menu
-                                        if show['attributes']['isFavorite']:
-                                            menu = []
-                                            menu.append((helper.language(30010),
-                                                         'RunPlugin(plugin://' + helper.addon_name + '/?action=delete_favorite&show_id=' + str(
-                                                             show['id']) + ')',))
-                                        else:
-                                            menu = []
-                                            menu.append((helper.language(30009),
-                                                         'RunPlugin(plugin://' + helper.addon_name + '/?action=add_favorite&show_id=' + str(
-                                                             show['id']) + ')',))
-
-                                        fanart_image = None
-                                        thumb_image = None
-                                        logo_image = None
-                                        poster_image = None
-                                        if show['relationships'].get('images'):
-                                            for image in images:
-                                                for show_images in show['relationships']['images']['data']:
-                                                    if image['id'] == show_images['id']:
-                                                        if image['attributes']['kind'] == 'default':
-                                                            fanart_image = image['attributes']['src']
-                                                            thumb_image = image['attributes']['src']
-                                                        if image['attributes']['kind'] == 'logo':
-                                                            logo_image = image['attributes']['src']
-                                                        # discoveryplus.in has logos in poster
-                                                        if helper.d.locale_suffix == 'in':
-                                                            if image['attributes']['kind'] == 'poster':
-                                                                poster_image = image['attributes']['src']
-                                                        else:
-                                                            if image['attributes'][
-                                                                'kind'] == 'poster_with_logo':
-                                                                poster_image = image['attributes']['src']
-
-                                        show_art = {
-                                            'fanart': fanart_image,
-                                            'thumb': thumb_image,
-                                            'clearlogo': logo_image,
-                                            'poster': poster_image
-                                        }
+                    helper.add_item(title, params, info=info, art=metadata.show_art(show), content='tvshows',
+                                    menu=favorite_menu(show), folder_name=collection['attributes'].get('title'),
+                                    sort_method='unsorted')
 
-                                        helper.add_item(title, params, info=info, art=show_art, content='tvshows',
-                                                        menu=menu, folder_name=collection['attributes'].get('title'),
-                                                        sort_method='unsorted')
+                # List videos (Show -> Shorts in d+ India) can't use list_collection because of
+                # missing mandatoryParams
+                video = included.related(collectionItem, 'video')
+                if video:
+                    params = {
+                        'action': 'play',
+                        'video_id': video['id'],
+                        'video_type': video['attributes']['videoType']
+                    }
 
-                            # List videos (Show -> Shorts in d+ India) can't use list_collection because of
-                            # missing mandatoryParams
-                            if collectionItem['relationships'].get('video'):
-                                for video in videos:
-                                    if collectionItem['relationships']['video']['data']['id'] == video['id']:
+                    show = included.related(video, 'show')
+                    show_title = show['attributes']['name'] if show else None
 
-                                        params = {
-                                            'action': 'play',
-                                            'video_id': video['id'],
-                                            'video_type': video['attributes']['videoType']
-                                        }
+                    duration = video['attributes']['videoDuration'] / 1000.0 if video['attributes'].get(
+                        'videoDuration') else None
 
-                                        show_fanart_image = None
-                                        show_logo_image = None
-                                        show_poster_image = None
-                                        for show in shows:
-                                            if show['id'] == video['relationships']['show']['data']['id']:
-                                                show_title = show['attributes']['name']
-
-                                                if show['relationships'].get('images'):
-                                                    for image in images:
-                                                        for show_images in show['relationships']['images']['data']:
-                                                            if image['id'] == show_images['id']:
-                                                                if image['attributes']['kind'] == 'default':
-                                                                    show_fanart_image = image['attributes']['src']
-                                                                if image['attributes']['kind'] == 'logo':
-                                                                    show_logo_image = image['attributes']['src']
-                                                                # discoveryplus.in has logos in poster
-                                                                if helper.d.locale_suffix == 'in':
-                                                                    if image['attributes']['kind'] == 'poster':
-                                                                        show_poster_image = image['attributes']['src']
-                                                                else:
-                                                                    if image['attributes'][
-                                                                        'kind'] == 'poster_with_logo':
-                                                                        show_poster_image = image['attributes']['src']
-
-                                        g = []
-                                        if video['relationships'].get('txGenres'):
-                                            for taxonomyNode in taxonomyNodes:
-                                                for video_genre in video['relationships']['txGenres']['data']:
-                                                    if taxonomyNode['id'] == video_genre['id']:
-                                                        g.append(taxonomyNode['attributes']['name'])
-
-                                        mpaa = None
-                                        if video['attributes'].get('contentRatings'):
-                                            for contentRating in video['attributes']['contentRatings']:
-                                                if contentRating['system'] == helper.d.contentRatingSystem:
-                                                    mpaa = contentRating['code']
-
-                                        if video['relationships'].get('primaryChannel'):
-                                            for channel in channels:
-                                                if channel['id'] == video['relationships']['primaryChannel']['data'][
-                                                    'id']:
-                                                    primaryChannel = channel['attributes']['name']
-                                        else:
-                                            primaryChannel = None
-
-                                        if video['relationships'].get('images'):
-                                            for image in images:
-                                                if image['id'] == video['relationships']['images']['data'][0]['id']:
-                                                    video_thumb_image = image['attributes']['src']
-                                        else:
-                                            video_thumb_image = None
-
-                                        duration = video['attributes']['videoDuration'] / 1000.0 if video[
-                                            'attributes'].get(
-                                            'videoDuration') else None
-
-                                        # If episode is not yet playable, show playable time in plot
-                                        if video['attributes'].get('earliestPlayableStart'):
-                                            if helper.d.parse_datetime(
-                                                    video['attributes'][
-                                                        'earliestPlayableStart']) > helper.d.get_current_time():
-                                                playable = str(
-                                                    helper.d.parse_datetime(
-                                                        video['attributes']['earliestPlayableStart']).strftime(
-                                                        '%d.%m.%Y %H:%M'))
-                                                if video['attributes'].get('description'):
-                                                    plot = helper.language(30002) + playable + ' ' + video[
-                                                        'attributes'].get(
-                                                        'description')
-                                                else:
-                                                    plot = helper.language(30002) + playable
-                                            else:
-                                                plot = video['attributes'].get('description')
-                                        else:
-                                            plot = video['attributes'].get('description')
-
-                                        # discovery+ subscription check
-                                        # First check if video is available for free
-                                        if len(video['attributes']['packages']) > 1:
-                                            # Get all available packages in availabilityWindows
-                                            for availabilityWindow in video['attributes']['availabilityWindows']:
-                                                if availabilityWindow['package'] == 'Free' or availabilityWindow[
-                                                    'package'] == 'Registered':
-                                                    # Check if there is ending time for free availability
-                                                    if availabilityWindow.get('playableEnd'):
-                                                        # Check if video is still available for free
-                                                        if helper.d.parse_datetime(availabilityWindow[
-                                                                                       'playableStart']) < helper.d.get_current_time() < helper.d.parse_datetime(
-                                                            availabilityWindow['playableEnd']):
-                                                            subscription_needed = False
-
-                                                        else:  # Video is not anymore available for free
-                                                            subscription_needed = True
-                                        else:  # Only one package in packages = Subscription needed
-                                            subscription_needed = True
-
-                                        # Check if user has needed subscription
-                                        check = any(x in video['attributes']['packages'] for x in
-                                                    helper.d.get_user_data()['attributes']['packages'])
-                                        if check is True:
-                                            subscription_needed = False
-                                        else:
-                                            subscription_needed = True
-
-                                        if subscription_needed is True:
-                                            if plot:
-                                                plot = helper.language(30034) + ' ' + plot
-                                            else:
-                                                plot = helper.language(30034)
-
-                                        # secondaryTitle used in sport events
-                                        if video['attributes'].get('secondaryTitle'):
-                                            video_title = video['attributes'].get('name').lstrip() + ' - ' + \
-                                                          video['attributes']['secondaryTitle'].lstrip()
-                                        else:
-                                            video_title = video['attributes'].get('name').lstrip()
-
-                                        episode_info = {
-                                            'mediatype': 'episode',
-                                            'title': video_title,
-                                            'tvshowtitle': show_title,
-                                            'season': video['attributes'].get('seasonNumber'),
-                                            'episode': video['attributes'].get('episodeNumber'),
-                                            'plot': plot,
-                                            'genre': g,
-                                            'studio': primaryChannel,
-                                            'duration': duration,
-                                            'aired': video['attributes'].get('airDate'),
-                                            'mpaa': mpaa
-                                        }
+                    plot = get_plot(video, availability[video['id']])
 
-                                        # Watched status from Discovery+
-                                        if helper.get_setting('sync_playback'):
-                                            if video['attributes']['viewingHistory']['viewed']:
-                                                if video['attributes']['viewingHistory'].get(
-                                                        'completed'):  # Watched video
-                                                    episode_info['playcount'] = '1'
-                                                    resume = 0
-                                                    total = duration
-                                                else:  # Partly watched video
-                                                    episode_info['playcount'] = '0'
-                                                    resume = video['attributes']['viewingHistory']['position'] / 1000.0
-                                                    total = duration
-                                            else:  # Unwatched video
-                                                episode_info['playcount'] = '0'
-                                                resume = 0
-                                                total = 1
-                                        else:  # Kodis resume data used
-                                            resume = None
-                                            total = None
-
-                                        episode_art = {
-                                            'fanart': show_fanart_image,
-                                            'thumb': video_thumb_image,
-                                            'clearlogo': show_logo_image,
-                                            'poster': show_poster_image
-                                        }
+                    # secondaryTitle used in sport events
+                    if video['attributes'].get('secondaryTitle'):
+                        video_title = video['attributes'].get('name').lstrip() + ' - ' + \
+                                      video['attributes']['secondaryTitle'].lstrip()
+                    else:
+                        video_title = video['attributes'].get('name').lstrip()
+
+                    episode_info = {
+                        'mediatype': 'episode',
+                        'title': video_title,
+                        'tvshowtitle': show_title,
+                        'season': video['attributes'].get('seasonNumber'),
+                        'episode': video['attributes'].get('episodeNumber'),
+                        'plot': plot,
+                        'genre': metadata.genres(video),
+                        'studio': metadata.studio(video),
+                        'duration': duration,
+                        'aired': video['attributes'].get('airDate'),
+                        'mpaa': metadata.mpaa(video)
+                    }
 
-                                        helper.add_item(video_title, params=params,
-                                                        info=episode_info, art=episode_art,
-                                                        content='episodes', playable=True, resume=resume, total=total,
-                                                        folder_name=collection['attributes'].get('title'),
-                                                        sort_method='sort_episodes')
+                    # Watched status from Discovery+
+                    if helper.get_setting('sync_playback'):
+                        if video['attributes']['viewingHistory']['viewed']:
+                            if video['attributes']['viewingHistory'].get('completed'):  # Watched video
+                                episode_info['playcount'] = '1'
+                                resume = 0
+                                total = duration
+                            else:  # Partly watched video
+                                episode_info['playcount'] = '0'
+                                resume = video['attributes']['viewingHistory']['position'] / 1000.0
+                                total = duration
+                        else:  # Unwatched video
+                            episode_info['playcount'] = '0'
+                            resume = 0
+                            total = 1
+                    else:  # Kodis resume data used
+                        resume = None
+                        total = None
+
+                    episode_art = metadata.episode_art(video, show)
+
+                    helper.add_item(video_title, params=params, info=episode_info, art=episode_art,
+                                    content='episodes', playable=True, resume=resume, total=total,
+                                    folder_name=collection['attributes'].get('title'),
+                                    sort_method='sort_episodes')
 
     helper.eod()
 
 def list_search_shows_in(search_query):
     page_data = helper.d.get_search_shows_in(search_query=search_query)
 
-    images = list(filter(lambda x: x['type'] == 'image', page_data['included']))
-    routes = list(filter(lambda x: x['type'] == 'route', page_data['included']))
-    taxonomyNodes = list(filter(lambda x: x['type'] == 'taxonomyNode', page_data['included']))
+    included = Resolver(page_data)
+    metadata = get_metadata(included)
 
     for show in page_data['data']:
         title = show['attributes']['name'].encode('utf-8')
 
-        # Find page path from routes
-        for route in routes:
-            if route['id'] == show['relationships']['routes']['data'][0]['id']:
-                next_page_path = route['attributes']['url']
-
         params = {
             'action': 'list_page',
-            'page_path': next_page_path
+            'page_path': included.route_url(show)
         }
 
-        g = []
-        if show['relationships'].get('txGenres'):
-            for taxonomyNode in taxonomyNodes:
-                for show_genre in show['relationships']['txGenres']['data']:
-                    if taxonomyNode['id'] == show_genre['id']:
-                        g.append(taxonomyNode['attributes']['name'])
-
-        mpaa = None
-        if show['attributes'].get('contentRatings'):
-            for contentRating in show['attributes']['contentRatings']:
-                if contentRating['system'] == helper.d.contentRatingSystem:
-                    mpaa = contentRating['code']
-
         info = {
             'mediatype': 'tvshow',
             'plot': show['attributes'].get('description'),
-            'genre': g,
+            'genre': metadata.genres(show),
             'season': len(show['attributes'].get('seasonNumbers')),
             'episode': show['attributes'].get('episodeCount'),
-            'mpaa': mpaa
-        }
-
-        # Add or delete favorite context menu
-        if show['attributes']['isFavorite']:
-            menu = []
-            menu.append((helper.language(30010),
-                         'RunPlugin(plugin://' + helper.addon_name + '/?action=delete_favorite&show_id=' + str(
-                             show['id']) + ')',))
-        else:
-            menu = []
-            menu.append((helper.language(30009),
-                         'RunPlugin(plugin://' + helper.addon_name + '/?action=add_favorite&show_id=' + str(
-                             show['id']) + ')',))
-
-        fanart_image = None
-        thumb_image = None
-        logo_image = None
-        poster_image = None
-        if show['relationships'].get('images'):
-            for image in images:
-                for show_images in show['relationships']['images']['data']:
-                    if image['id'] == show_images['id']:
-                        if image['attributes']['kind'] == 'default':
-                            fanart_image = image['attributes']['src']
-                            thumb_image = image['attributes']['src']
-                        if image['attributes']['kind'] == 'logo':
-                            logo_image = image['attributes']['src']
-                        # discoveryplus.in has logos in poster
-                        if helper.d.locale_suffix == 'in':
-                            if image['attributes']['kind'] == 'poster':
-                                poster_image = image['attributes']['src']
-                        else:
-                            if image['attributes'][
-                                'kind'] == 'poster_with_logo':
-                                poster_image = image['attributes']['src']
-
-        show_art = {
-            'fanart': fanart_image,
-            'thumb': thumb_image,
-            'clearlogo': logo_image,
-            'poster': poster_image
+            'mpaa': metadata.mpaa(show)
         }
 
         folder_name = helper.language(30007) + ' / ' + search_query
 
-        helper.add_item(title, params, info=info, art=show_art, content='tvshows', menu=menu, folder_name=folder_name,
-                        sort_method='unsorted')
+        helper.add_item(title, params, info=info, art=metadata.show_art(show), content='tvshows',
+                        menu=favorite_menu(show), folder_name=folder_name, sort_method='unsorted')
 
     helper.eod()
 
@@ -1463,43 +802,24 @@ def list_search_shows_in(search_query):
 def list_favorites_in():
     page_data = helper.d.get_favorites_in()
 
-    images = list(filter(lambda x: x['type'] == 'image', page_data['included']))
-    routes = list(filter(lambda x: x['type'] == 'route', page_data['included']))
-    taxonomyNodes = list(filter(lambda x: x['type'] == 'taxonomyNode', page_data['included']))
+    included = Resolver(page_data)
+    metadata = get_metadata(included)
 
     for show in page_data['data']:
-        title = data['attributes']['name'].encode('utf-8')
-
-        # Find page path from routes
-        for route in routes:
-            if route['id'] == show['relationships']['routes']['data'][0]['id']:
-                next_page_path = route['attributes']['url']
+        title = show['attributes']['name'].encode('utf-8')
 
         params = {
             'action': 'list_page',
-            'page_path': next_page_path
+            'page_path': included.route_url(show)
         }
 
-        g = []
-        if show['relationships'].get('txGenres'):
-            for taxonomyNode in taxonomyNodes:
-                for show_genre in show['relationships']['txGenres']['data']:
-                    if taxonomyNode['id'] == show_genre['id']:
-                        g.append(taxonomyNode['attributes']['name'])
-
-        mpaa = None
-        if show['attributes'].get('contentRatings'):
-            for contentRating in show['attributes']['contentRatings']:
-                if contentRating['system'] == helper.d.contentRatingSystem:
-                    mpaa = contentRating['code']
-
         info = {
             'mediatype': 'tvshow',
             'plot': show['attributes'].get('description'),
-            'genre': g,
+            'genre': metadata.genres(show),
             'season': len(show['attributes'].get('seasonNumbers')),
             'episode': show['attributes'].get('episodeCount'),
-            'mpaa': mpaa
+            'mpaa': metadata.mpaa(show)
         }
 
         menu = []
@@ -1507,38 +827,9 @@ def list_favorites_in():
                      'RunPlugin(plugin://' + helper.addon_name + '/?action=delete_favorite&show_id=' + str(
                          show['id']) + ')',))
 
-        fanart_image = None
-        thumb_image = None
-        logo_image = None
-        poster_image = None
-        if show['relationships'].get('images'):
-            for image in images:
-                for show_images in show['relationships']['images']['data']:
-                    if image['id'] == show_images['id']:
-                        if image['attributes']['kind'] == 'default':
-                            fanart_image = image['attributes']['src']
-                            thumb_image = image['attributes']['src']
-                        if image['attributes']['kind'] == 'logo':
-                            logo_image = image['attributes']['src']
-                        # discoveryplus.in has logos in poster
-                        if helper.d.locale_suffix == 'in':
-                            if image['attributes']['kind'] == 'poster':
-                                poster_image = image['attributes']['src']
-                        else:
-                            if image['attributes'][
-                                'kind'] == 'poster_with_logo':
-                                poster_image = image['attributes']['src']
-
-        show_art = {
-            'fanart': fanart_image,
-            'thumb': thumb_image,
-            'clearlogo': logo_image,
-            'poster': poster_image
-        }
-
         folder_name = helper.language(30017) + ' / Shows'
 
-        helper.add_item(title, params, info=info, art=show_art, content='tvshows', menu=menu,
+        helper.add_item(title, params, info=info, art=metadata.show_art(show), content='tvshows', menu=menu,
                         folder_name=folder_name,
                         sort_method='unsorted')
 
@@ -1552,10 +843,9 @@ def list_favorite_watchlist_videos_in(videoType=None, playlist=None):
     else:
         page_data = helper.d.get_watchlist_in(playlist)
 
-    images = list(filter(lambda x: x['type'] == 'image', page_data['included']))
-    shows = list(filter(lambda x: x['type'] == 'show', page_data['included']))
-    channels = list(filter(lambda x: x['type'] == 'channel', page_data['included']))
-    taxonomyNodes = list(filter(lambda x: x['type'] == 'taxonomyNode', page_data['included']))
+    included = Resolver(page_data)
+    metadata = get_metadata(included)
+    availability = AvailabilityEvaluator(helper.d.entitlements).evaluate(page_data['data'])
 
     for video in page_data['data']:
         params = {
@@ -1564,109 +854,13 @@ def list_favorite_watchlist_videos_in(videoType=None, playlist=None):
             'video_type': video['attributes']['videoType']
         }
 
-        show_fanart_image = None
-        show_logo_image = None
-        show_poster_image = None
-        for show in shows:
-            if show['id'] == video['relationships']['show']['data']['id']:
-                show_title = show['attributes']['name']
-
-            if show['relationships'].get('images'):
-                for image in images:
-                    for show_images in show['relationships']['images']['data']:
-                        if image['id'] == show_images['id']:
-                            if image['attributes']['kind'] == 'default':
-                                show_fanart_image = image['attributes']['src']
-                            if image['attributes']['kind'] == 'logo':
-                                show_logo_image = image['attributes']['src']
-                            # discoveryplus.in has logos in poster
-                            if helper.d.locale_suffix == 'in':
-                                if image['attributes']['kind'] == 'poster':
-                                    show_poster_image = image['attributes']['src']
-                            else:
-                                if image['attributes'][
-                                    'kind'] == 'poster_with_logo':
-                                    show_poster_image = image['attributes']['src']
-
-        g = []
-        if video['relationships'].get('txGenres'):
-            for taxonomyNode in taxonomyNodes:
-                for video_genre in video['relationships']['txGenres']['data']:
-                    if taxonomyNode['id'] == video_genre['id']:
-                        g.append(taxonomyNode['attributes']['name'])
-
-        mpaa = None
-        if video['attributes'].get('contentRatings'):
-            for contentRating in video['attributes']['contentRatings']:
-                if contentRating['system'] == helper.d.contentRatingSystem:
-                    mpaa = contentRating['code']
-
-        if video['relationships'].get('primaryChannel'):
-            for channel in channels:
-                if channel['id'] == video['relationships']['primaryChannel']['data']['id']:
-                    primaryChannel = channel['attributes']['name']
-        else:
-            primaryChannel = None
-
-        if video['relationships'].get('images'):
-            for image in images:
-                if image['id'] == video['relationships']['images']['data'][0]['id']:
-                    video_thumb_image = image['attributes']['src']
-        else:
-            video_thumb_image = None
+        show = included.related(video, 'show')
+        show_title = show['attributes']['name'] if show else None
 
         duration = video['attributes']['videoDuration'] / 1000.0 if video['attributes'].get(
             'videoDuration') else None
 
-        # If episode is not yet playable, show playable time in plot
-        if video['attributes'].get('earliestPlayableStart'):
-            if helper.d.parse_datetime(
-                    video['attributes']['earliestPlayableStart']) > helper.d.get_current_time():
-                playable = str(
-                    helper.d.parse_datetime(
-                        video['attributes']['earliestPlayableStart']).strftime(
-                        '%d.%m.%Y %H:%M'))
-                if video['attributes'].get('description'):
-                    plot = helper.language(30002) + playable + ' ' + video['attributes'].get(
-                        'description')
-                else:
-                    plot = helper.language(30002) + playable
-            else:
-                plot = video['attributes'].get('description')
-        else:
-            plot = video['attributes'].get('description')
-
-        # discovery+ subscription check
-        # First check if video is available for free
-        if len(video['attributes']['packages']) > 1:
-            # Get all available packages in availabilityWindows
-            for availabilityWindow in video['attributes']['availabilityWindows']:
-                if availabilityWindow['package'] == 'Free' or availabilityWindow['package'] == 'Registered':
-                    # Check if there is ending time for free availability
-                    if availabilityWindow.get('playableEnd'):
-                        # Check if video is still available for free
-                        if helper.d.parse_datetime(availabilityWindow[
-                                                       'playableStart']) < helper.d.get_current_time() < helper.d.parse_datetime(
-                            availabilityWindow['playableEnd']):
-                            subscription_needed = False
-
-                        else:  # Video is not anymore available for free
-                            subscription_needed = True
-        else:  # Only one package in packages = Subscription needed
-            subscription_needed = True
-
-        # Check if user has needed subscription
-        check = any(x in video['attributes']['packages'] for x in helper.d.get_user_data()['attributes']['packages'])
-        if check is True:
-            subscription_needed = False
-        else:
-            subscription_needed = True
-
-        if subscription_needed is True:
-            if plot:
-                plot = helper.language(30034) + ' ' + plot
-            else:
-                plot = helper.language(30034)
+        plot = get_plot(video, availability[video['id']])
 
         episode_info = {
             'mediatype': 'episode',
@@ -1675,11 +869,11 @@ def list_favorite_watchlist_videos_in(videoType=None, playlist=None):
             'season': video['attributes'].get('seasonNumber'),
             'episode': video['attributes'].get('episodeNumber'),
             'plot': plot,
-            'genre': g,
-            'studio': primaryChannel,
+            'genre': metadata.genres(video),
+            'studio': metadata.studio(video),
             'duration': duration,
             'aired': video['attributes'].get('airDate'),
-            'mpaa': mpaa
+            'mpaa': metadata.mpaa(video)
         }
 
         # Watched status from discovery+
@@ -1701,12 +895,7 @@ def list_favorite_watchlist_videos_in(videoType=None, playlist=None):
             resume = None
             total = None
 
-        episode_art = {
-            'fanart': show_fanart_image,
-            'thumb': video_thumb_image,
-            'clearlogo': show_logo_image,
-            'poster': show_poster_image
-        }
+        episode_art = metadata.episode_art(video, show)
 
         if videoType:
             folder_name = helper.language(30017)
@@ -1729,576 +918,246 @@ def list_collection(collection_id, page, mandatoryParams=None, parameter=None):
     # Don't try to list empty collection
     if page_data['data'].get('relationships'):
 
-        collections = list(filter(lambda x: x['type'] == 'collection', page_data['included']))
-        collectionItems = list(filter(lambda x: x['type'] == 'collectionItem', page_data['included']))
-        images = list(filter(lambda x: x['type'] == 'image', page_data['included']))
-        shows = list(filter(lambda x: x['type'] == 'show', page_data['included']))
-        videos = list(filter(lambda x: x['type'] == 'video', page_data['included']))
-        channels = list(filter(lambda x: x['type'] == 'channel', page_data['included']))
-        links = list(filter(lambda x: x['type'] == 'link', page_data['included']))
-        routes = list(filter(lambda x: x['type'] == 'route', page_data['included']))
-        taxonomyNodes = list(filter(lambda x: x['type'] == 'taxonomyNode', page_data['included']))
+        included = Resolver(page_data)
+        metadata = get_metadata(included)
+        availability = AvailabilityEvaluator(helper.d.entitlements).evaluate(included.of_type('video'))
 
         # Get order of content from page_data['data']
-        for collection_relationship in page_data['data']['relationships']['items']['data']:
-            for collectionItem in collectionItems:
-                # Match collectionItem id's from collection listing to all collectionItems in data
-                if collection_relationship['id'] == collectionItem['id']:
-                    # List shows
-                    if collectionItem['relationships'].get('show'):
-                        for show in shows:
-                            if collectionItem['relationships']['show']['data']['id'] == show['id']:
-
-                                title = show['attributes']['name'].encode('utf-8')
-
-                                # Find page path from routes
-                                for route in routes:
-                                    if route['id'] == show['relationships']['routes']['data'][0]['id']:
-                                        next_page_path = route['attributes']['url']
-
-                                params = {
-                                    'action': 'list_page',
-                                    'page_path': next_page_path
-                                }
-
-                                g = []
-                                # Show genres
-                                if show['relationships'].get('txGenres'):
-                                    for taxonomyNode in taxonomyNodes:
-                                        for show_genre in show['relationships']['txGenres']['data']:
-                                            if taxonomyNode['id'] == show_genre['id']:
-                                                g.append(taxonomyNode['attributes']['name'])
-
-                                mpaa = None
-                                if show['attributes'].get('contentRatings'):
-                                    for contentRating in show['attributes']['contentRatings']:
-                                        if contentRating['system'] == helper.d.contentRatingSystem:
-                                            mpaa = contentRating['code']
-
-                                if show['relationships'].get('primaryChannel'):
-                                    for channel in channels:
-                                        if channel['id'] == show['relationships']['primaryChannel']['data'][
-                                            'id']:
-                                            primaryChannel = channel['attributes']['name']
-                                else:
-                                    primaryChannel = None
-
-                                info = {
-                                    'mediatype': 'tvshow',
-                                    'plotoutline': show['attributes'].get('description'),
-                                    'plot': show['attributes'].get('longDescription'),
-                                    'genre': g,
-                                    'studio': primaryChannel,
-                                    'season': len(show['attributes'].get('seasonNumbers')),
-                                    'episode': show['attributes'].get('episodeCount'),
-                                    'mpaa': mpaa
-                                }
-
-                                # Add or delete favorite context menu
-                                if show['attributes']['isFavorite']:
-                                    menu = []
-                                    menu.append((helper.language(30010),
-                                                 'RunPlugin(plugin://' + helper.addon_name + '/?action=delete_favorite&show_id=' + str(
-                                                     show['id']) + ')',))
-                                else:
-                                    menu = []
-                                    menu.append((helper.language(30009),
-                                                 'RunPlugin(plugin://' + helper.addon_name + '/?action=add_favorite&show_id=' + str(
-                                                     show['id']) + ')',))
-
-                                fanart_image = None
-                                thumb_image = None
-                                logo_image = None
-                                poster_image = None
-                                if show['relationships'].get('images'):
-                                    for image in images:
-                                        for show_images in show['relationships']['images']['data']:
-                                            if image['id'] == show_images['id']:
-                                                if image['attributes']['kind'] == 'default':
-                                                    fanart_image = image['attributes']['src']
-                                                    thumb_image = image['attributes']['src']
-                                                if image['attributes']['kind'] == 'logo':
-                                                    logo_image = image['attributes']['src']
-                                                # discoveryplus.in has logos in poster
-                                                if helper.d.locale_suffix == 'in':
-                                                    if image['attributes']['kind'] == 'poster':
-                                                        poster_image = image['attributes']['src']
-                                                else:
-                                                    if image['attributes'][
-                                                        'kind'] == 'poster_with_logo':
-                                                        poster_image = image['attributes']['src']
-
-                                show_art = {
-                                    'fanart': fanart_image,
-                                    'thumb': thumb_image,
-                                    'clearlogo': logo_image,
-                                    'poster': poster_image
-                                }
+        for collectionItem in included.related_many(page_data['data'], 'items'):
+            # List shows
+            show = included.related(collectionItem, 'show')
+            if show:
+                title = show['attributes']['name'].encode('utf-8')
 
-                                helper.add_item(title, params, info=info, art=show_art, content='tvshows',
-                                                menu=menu, folder_name=page_data['data']['attributes'].get('title'),
-                                                sort_method='unsorted')
-
-                    # List videos
-                    if collectionItem['relationships'].get('video'):
-                        for video in videos:
-                            # Match collectionItem's video id to all video id's in data
-                            if collectionItem['relationships']['video']['data']['id'] == video['id']:
-
-                                params = {
-                                    'action': 'play',
-                                    'video_id': video['id'],
-                                    'video_type': video['attributes']['videoType']
-                                }
-
-                                show_fanart_image = None
-                                show_logo_image = None
-                                show_poster_image = None
-                                for show in shows:
-                                    if show['id'] == video['relationships']['show']['data']['id']:
-                                        show_title = show['attributes']['name']
-
-                                        if show['relationships'].get('images'):
-                                            for image in images:
-                                                for show_images in show['relationships']['images']['data']:
-                                                    if image['id'] == show_images['id']:
-                                                        if image['attributes']['kind'] == 'default':
-                                                            show_fanart_image = image['attributes']['src']
-                                                        if image['attributes']['kind'] == 'logo':
-                                                            show_logo_image = image['attributes']['src']
-                                                        # discoveryplus.in has logos in poster
-                                                        if helper.d.locale_suffix == 'in':
-                                                            if image['attributes']['kind'] == 'poster':
-                                                                show_poster_image = image['attributes']['src']
-                                                        else:
-                                                            if image['attributes'][
-                                                                'kind'] == 'poster_with_logo':
-                                                                show_poster_image = image['attributes']['src']
-
-                                g = []
-                                if video['relationships'].get('txGenres'):
-                                    for taxonomyNode in taxonomyNodes:
-                                        for video_genre in video['relationships']['txGenres']['data']:
-                                            if taxonomyNode['id'] == video_genre['id']:
-                                                g.append(taxonomyNode['attributes']['name'])
-
-                                mpaa = None
-                                if video['attributes'].get('contentRatings'):
-                                    for contentRating in video['attributes']['contentRatings']:
-                                        if contentRating['system'] == helper.d.contentRatingSystem:
-                                            mpaa = contentRating['code']
-
-                                # Sport example Tennis
-                                if video['relationships'].get('txSports'):
-                                    for taxonomyNode in taxonomyNodes:
-                                        if taxonomyNode['id'] == video['relationships']['txSports']['data'][0]['id']:
-                                            sport = taxonomyNode['attributes']['name']
-                                # Olympics sport
-                                elif video['relationships'].get('txOlympicssport'):
-                                    for taxonomyNode in taxonomyNodes:
-                                        if taxonomyNode['id'] == video['relationships']['txOlympicssport']['data'][0]['id']:
-                                            sport = taxonomyNode['attributes']['name']
-                                else:
-                                    sport = None
-
-                                if video['relationships'].get('primaryChannel'):
-                                    for channel in channels:
-                                        if channel['id'] == video['relationships']['primaryChannel']['data']['id']:
-                                            primaryChannel = channel['attributes']['name']
-                                else:
-                                    primaryChannel = None
-
-                                if video['relationships'].get('images'):
-                                    for image in images:
-                                        if image['id'] == video['relationships']['images']['data'][0]['id']:
-                                            video_thumb_image = image['attributes']['src']
-                                else:
-                                    video_thumb_image = None
-
-                                duration = video['attributes']['videoDuration'] / 1000.0 if video['attributes'].get(
-                                    'videoDuration') else None
-
-                                # If episode is not yet playable, show playable time in plot
-                                if video['attributes'].get('earliestPlayableStart'):
-                                    if helper.d.parse_datetime(
-                                            video['attributes']['earliestPlayableStart']) > helper.d.get_current_time():
-                                        playable = str(
-                                            helper.d.parse_datetime(
-                                                video['attributes']['earliestPlayableStart']).strftime(
-                                                '%d.%m.%Y %H:%M'))
-                                        if video['attributes'].get('description'):
-                                            plot = helper.language(30002) + playable + ' ' + video['attributes'].get(
-                                                'description')
-                                        else:
-                                            plot = helper.language(30002) + playable
-                                    else:
-                                        plot = video['attributes'].get('description')
-                                else:
-                                    plot = video['attributes'].get('description')
-
-                                # discovery+ subscription check
-                                # First check if video is available for free
-                                if len(video['attributes']['packages']) > 1:
-                                    # Get all available packages in availabilityWindows
-                                    for availabilityWindow in video['attributes']['availabilityWindows']:
-                                        if availabilityWindow['package'] == 'Free' or availabilityWindow['package'] == 'Registered':
-                                            # Check if there is ending time for free availability
-                                            if availabilityWindow.get('playableEnd'):
-                                                # Check if video is still available for free
-                                                if helper.d.parse_datetime(availabilityWindow[
-                                                                                'playableStart']) < helper.d.get_current_time() < helper.d.parse_datetime(
-                                                    availabilityWindow['playableEnd']):
-                                                    subscription_needed = False
-
-                                                else:  # Video is not anymore available for free
-                                                    subscription_needed = True
-                                else:  # Only one package in packages = Subscription needed
-                                    subscription_needed = True
-
-                                # Check if user has needed subscription
-                                check = any(x in video['attributes']['packages'] for x in
-                                            helper.d.get_user_data()['attributes']['packages'])
-                                if check is True:
-                                    subscription_needed = False
-                                else:
-                                    subscription_needed = True
-
-                                if subscription_needed is True:
-                                    if plot:
-                                        plot = helper.language(30034) + ' ' + plot
-                                    else:
-                                        plot = helper.language(30034)
-
-                                video_title = video['attributes'].get('name').lstrip()
-                                # Sport
-                                if sport:
-                                    video_title = sport + ': ' + video_title
-                                # secondaryTitle used in sport events
-                                if video['attributes'].get('secondaryTitle'):
-                                    video_title = video_title + ' - ' + \
-                                                  video['attributes']['secondaryTitle'].lstrip()
-
-                                episode_info = {
-                                    'mediatype': 'episode',
-                                    'title': video_title,
-                                    'tvshowtitle': show_title,
-                                    'season': video['attributes'].get('seasonNumber'),
-                                    'episode': video['attributes'].get('episodeNumber'),
-                                    'plot': plot,
-                                    'genre': g,
-                                    'studio': primaryChannel,
-                                    'duration': duration,
-                                    'aired': video['attributes'].get('airDate'),
-                                    'mpaa': mpaa
-                                }
-
-                                # Watched status from discovery+
-                                if helper.get_setting('sync_playback'):
-                                    if video['attributes']['viewingHistory']['viewed']:
-                                        if video['attributes']['viewingHistory']['completed']:  # Watched video
-                                            episode_info['playcount'] = '1'
-                                            resume = 0
-                                            total = duration
-                                        else:  # Partly watched video
-                                            episode_info['playcount'] = '0'
-                                            resume = video['attributes']['viewingHistory']['position'] / 1000.0
-                                            total = duration
-                                    else:  # Unwatched video
-                                        episode_info['playcount'] = '0'
-                                        resume = 0
-                                        total = 1
-                                else:  # Kodis resume data used
-                                    resume = None
-                                    total = None
-
-                                episode_art = {
-                                    'fanart': show_fanart_image,
-                                    'thumb': video_thumb_image,
-                                    'clearlogo': show_logo_image,
-                                    'poster': show_poster_image
-                                }
-
-                                # mandatoryParams and no parameter = list search result videos (Episodes, Specials, Extras)
-                                if mandatoryParams and parameter is None:
-                                    folder_name = page_data['data']['attributes'].get('title')
-                                # parameter = list season
-                                elif parameter:
-                                    folder_name = show_title + ' / ' + helper.language(30011) + ' ' + str(
-                                        video['attributes'].get('seasonNumber'))
-                                else:
-                                    folder_name = show_title
-
-                                helper.add_item(video_title, params=params,
-                                                info=episode_info,
-                                                art=episode_art,
-                                                content='episodes', playable=True, resume=resume, total=total,
-                                                folder_name=folder_name, sort_method='sort_episodes')
-
-                    # Explore -> Live Channels & On Demand Shows, Explore Shows and Full Episodes content in d+ India
-                    if collectionItem['relationships'].get('channel'):
-                        for channel in channels:
-                            if collectionItem['relationships']['channel']['data']['id'] == channel['id']:
-                                # List channel pages
-                                if channel['relationships'].get('routes'):
-                                    # Find page path from routes
-                                    for route in routes:
-                                        if route['id'] == channel['relationships']['routes']['data'][0]['id']:
-                                            next_page_path = route['attributes']['url']
-
-                                    params = {
-                                        'action': 'list_page',
-                                        'page_path': next_page_path
-                                    }
-
-                                    channel_info = {
-                                        'title': channel['attributes'].get('name'),
-                                        'plot': channel['attributes'].get('description')
-                                    }
-
-                                    channel_logo = None
-                                    fanart_image = None
-                                    if channel['relationships'].get('images'):
-                                        for image in images:
-                                            for channel_images in channel['relationships']['images']['data']:
-                                                if image['id'] == channel_images['id']:
-                                                    if image['attributes']['kind'] == 'logo':
-                                                        channel_logo = image['attributes']['src']
-                                                    if image['attributes']['kind'] == 'default':
-                                                        fanart_image = image['attributes']['src']
-
-                                    if channel_logo:
-                                        thumb_image = channel_logo
-                                    else:
-                                        thumb_image = fanart_image
+                params = {
+                    'action': 'list_page',
+                    'page_path': included.route_url(show)
+                }
 
-                                    channel_art = {
-                                        'fanart': fanart_image,
-                                        'thumb': thumb_image
-                                    }
+                info = {
+                    'mediatype': 'tvshow',
+                    'plotoutline': show['attributes'].get('description'),
+                    'plot': show['attributes'].get('longDescription'),
+                    'genre': metadata.genres(show),
+                    'studio': metadata.studio(show),
+                    'season': len(show['attributes'].get('seasonNumbers')),
+                    'episode': show['attributes'].get('episodeCount'),
+                    'mpaa': metadata.mpaa(show)
+                }
 
-                                    helper.add_item(channel['attributes'].get('name'), params,
-                                                    info=channel_info,
-                                                    content='videos', art=channel_art,
-                                                    folder_name=page_data['data']['attributes'].get('title'),
-                                                    sort_method='unsorted')
+                helper.add_item(title, params, info=info, art=metadata.show_art(show), content='tvshows',
+                                menu=favorite_menu(show), folder_name=page_data['data']['attributes'].get('title'),
+                                sort_method='unsorted')
 
-                                # List channel livestreams only if there's no route to channel page
-                                elif channel['attributes'].get('hasLiveStream'):
-                                    params = {
-                                        'action': 'play',
-                                        'video_id': channel['id'],
-                                        'video_type': 'channel'
-                                    }
+            # List videos
+            video = included.related(collectionItem, 'video')
+            if video:
+                params = {
+                    'action': 'play',
+                    'video_id': video['id'],
+                    'video_type': video['attributes']['videoType']
+                }
 
-                                    channel_info = {
-                                        'mediatype': 'video',
-                                        'title': channel['attributes'].get('name'),
-                                        'plot': channel['attributes'].get('description'),
-                                        'playcount': '0'
-                                    }
+                show = included.related(video, 'show')
+                show_title = show['attributes']['name'] if show else None
 
-                                    channel_logo = None
-                                    fanart_image = None
-                                    if channel['relationships'].get('images'):
-                                        for image in images:
-                                            for channel_images in channel['relationships']['images']['data']:
-                                                if image['id'] == channel_images['id']:
-                                                    if image['attributes']['kind'] == 'logo':
-                                                        channel_logo = image['attributes']['src']
-                                                    if image['attributes']['kind'] == 'default':
-                                                        fanart_image = image['attributes']['src']
-
-                                    if channel_logo:
-                                        thumb_image = channel_logo
-                                    else:
-                                        thumb_image = fanart_image
+                # Sport example Tennis
+                if video['relationships'].get('txSports'):
+                    sport_node = included.related(video, 'txSports')
+                # Olympics sport
+                elif video['relationships'].get('txOlympicssport'):
+                    sport_node = included.related(video, 'txOlympicssport')
+                else:
+                    sport_node = None
+                sport = sport_node['attributes']['name'] if sport_node else None
+
+                duration = video['attributes']['videoDuration'] / 1000.0 if video['attributes'].get(
+                    'videoDuration') else None
+
+                plot = get_plot(video, availability[video['id']])
+
+                video_title = video['attributes'].get('name').lstrip()
+                # Sport
+                if sport:
+                    video_title = sport + ': ' + video_title
+                # secondaryTitle used in sport events
+                if video['attributes'].get('secondaryTitle'):
+                    video_title = video_title + ' - ' + video['attributes']['secondaryTitle'].lstrip()
+
+                episode_info = {
+                    'mediatype': 'episode',
+                    'title': video_title,
+                    'tvshowtitle': show_title,
+                    'season': video['attributes'].get('seasonNumber'),
+                    'episode': video['attributes'].get('episodeNumber'),
+                    'plot': plot,
+                    'genre': metadata.genres(video),
+                    'studio': metadata.studio(video),
+                    'duration': duration,
+                    'aired': video['attributes'].get('airDate'),
+                    'mpaa': metadata.mpaa(video)
+                }
 
-                                    channel_art = {
-                                        'fanart': fanart_image,
-                                        'thumb': thumb_image
-                                    }
+                # Watched status from discovery+
+                if helper.get_setting('sync_playback'):
+                    if video['attributes']['viewingHistory']['viewed']:
+                        if video['attributes']['viewingHistory']['completed']:  # Watched video
+                            episode_info['playcount'] = '1'
+                            resume = 0
+                            total = duration
+                        else:  # Partly watched video
+                            episode_info['playcount'] = '0'
+                            resume = video['attributes']['viewingHistory']['position'] / 1000.0
+                            total = duration
+                    else:  # Unwatched video
+                        episode_info['playcount'] = '0'
+                        resume = 0
+                        total = 1
+                else:  # Kodis resume data used
+                    resume = None
+                    total = None
+
+                episode_art = metadata.episode_art(video, show)
+
+                # mandatoryParams and no parameter = list search result videos (Episodes, Specials, Extras)
+                if mandatoryParams and parameter is None:
+                    folder_name = page_data['data']['attributes'].get('title')
+                # parameter = list season
+                elif parameter:
+                    folder_name = show_title + ' / ' + helper.language(30011) + ' ' + str(
+                        video['attributes'].get('seasonNumber'))
+                else:
+                    folder_name = show_title
+
+                helper.add_item(video_title, params=params,
+                                info=episode_info,
+                                art=episode_art,
+                                content='episodes', playable=True, resume=resume, total=total,
+                                folder_name=folder_name, sort_method='sort_episodes')
+
+            # Explore -> Live Channels & On Demand Shows, Explore Shows and Full Episodes content in d+ India
+            channel = included.related(collectionItem, 'channel')
+            if channel:
+                # List channel pages
+                if channel['relationships'].get('routes'):
+                    params = {
+                        'action': 'list_page',
+                        'page_path': included.route_url(channel)
+                    }
 
-                                    helper.add_item(
-                                        helper.language(30014) + ' ' + channel['attributes'].get('name'),
-                                        params=params,
-                                        info=channel_info, content='videos', art=channel_art,
-                                        playable=True, folder_name=collection['attributes'].get('title'))
+                    channel_info = {
+                        'title': channel['attributes'].get('name'),
+                        'plot': channel['attributes'].get('description')
+                    }
 
-                    # List collections in discoveryplus.com (US and EU) and discoveryplus.in
+                    helper.add_item(channel['attributes'].get('name'), params, info=channel_info, content='videos',
+                                    art=get_channel_art(included, channel),
+                                    folder_name=page_data['data']['attributes'].get('title'),
+                                    sort_method='unsorted')
 
-                    # Browse -> Channel or genre -> Category listing (A-Z, Trending...)
-                    if collectionItem['relationships'].get('collection'):
-                        for collection in collections:
-                            if collection['id'] == collectionItem['relationships']['collection']['data']['id']:
-                                if collection['attributes']['component']['id'] == 'content-grid':
-                                    if collection['attributes'].get('title') or collection['attributes'].get('name'):
+                # List channel livestreams only if there's no route to channel page
+                elif channel['attributes'].get('hasLiveStream'):
+                    add_live_channel(included, channel, folder_name=page_data['data']['attributes'].get('title'))
 
-                                        # content-grid name can be title or name
-                                        if collection['attributes'].get('title'):
-                                            title = collection['attributes']['title']
-                                        else:
-                                            title = collection['attributes']['name']
+            # List collections in discoveryplus.com (US and EU) and discoveryplus.in
 
-                                        params = {
-                                            'action': 'list_collection',
-                                            'collection_id': collection['id']
-                                        }
+            # Browse -> Channel or genre -> Category listing (A-Z, Trending...)
+            collection = included.related(collectionItem, 'collection')
+            if collection:
+                if collection['attributes']['component']['id'] == 'content-grid':
+                    if collection['attributes'].get('title') or collection['attributes'].get('name'):
 
-                                        helper.add_item(title, params, content='videos')
-
-                                # discoveryplus.in
-                                if collection['attributes']['component']['id'] == 'taxonomy-replica':
-                                    # Don't list empty category
-                                    if collection.get('relationships'):
-                                        # Genres in discoveryplus.in
-                                        if collection['relationships'].get('cmpContextLink'):
-                                            for link in links:
-                                                if collection['relationships']['cmpContextLink']['data']['id'] == link[
-                                                    'id']:
-                                                    # Find page path from routes
-                                                    for route in routes:
-                                                        if route['id'] == \
-                                                                link['relationships']['linkedContentRoutes'][
-                                                                    'data'][0]['id']:
-                                                            next_page_path = route['attributes']['url']
-
-                                                    params = {
-                                                        'action': 'list_page',
-                                                        'page_path': next_page_path
-                                                    }
-
-                                                    for collectionItem2 in collectionItems:
-                                                        if collection['relationships']['items']['data'][0]['id'] == \
-                                                                collectionItem2['id']:
-                                                            if collectionItem2['relationships'].get('image'):
-                                                                for image in images:
-                                                                    if image['id'] == \
-                                                                            collectionItem2['relationships'][
-                                                                                'image'][
-                                                                                'data'][
-                                                                                'id']:
-                                                                        thumb_image = image['attributes']['src']
-                                                            else:
-                                                                thumb_image = None
-
-                                                    category_art = {
-                                                        'fanart': thumb_image,
-                                                        'thumb': thumb_image
-                                                    }
-
-                                                    # Category titles have stored in different places
-                                                    if collection['attributes'].get('title'):
-                                                        link_title = collection['attributes']['title']
-                                                    elif link['attributes'].get('title'):
-                                                        link_title = link['attributes']['title']
-                                                    elif link['attributes'].get('name'):
-                                                        link_title = link['attributes']['name']
-                                                    else:
-                                                        link_title = None
-
-                                                    helper.add_item(link_title, params, content='videos',
-                                                                    art=category_art,
-                                                                    folder_name=collection['attributes'].get(
-                                                                        'title'))
-
-                    # discoveryplus.com (US and EU) search result 'collections' folder content
-                    if collectionItem['relationships'].get('link'):
-                        for link in links:
-                            if collectionItem['relationships']['link']['data']['id'] == link['id']:
-                                # Find page path from routes
-                                for route in routes:
-                                    if route['id'] == \
-                                            link['relationships']['linkedContentRoutes'][
-                                                'data'][0]['id']:
-                                        next_page_path = route['attributes']['url']
-
-                                params = {
-                                    'action': 'list_page',
-                                    'page_path': next_page_path
-                                }
+                        # content-grid name can be title or name
+                        if collection['attributes'].get('title'):
+                            title = collection['attributes']['title']
+                        else:
+                            title = collection['attributes']['name']
+
+                        params = {
+                            'action': 'list_collection',
+                            'collection_id': collection['id']
+                        }
+
+                        helper.add_item(title, params, content='videos')
+
+                # discoveryplus.in
+                if collection['attributes']['component']['id'] == 'taxonomy-replica':
+                    # Genres in discoveryplus.in
+                    link = included.related(collection, 'cmpContextLink')
+                    # Don't list empty category
+                    if collection.get('relationships') and link:
+                        params = {
+                            'action': 'list_page',
+                            'page_path': included.route_url(link, 'linkedContentRoutes')
+                        }
+
+                        collectionItem2 = included.resolve(collection['relationships']['items']['data'][0])
+                        thumb_image = included.first_image(collectionItem2, 'image') if collectionItem2 else None
+
+                        category_art = {
+                            'fanart': thumb_image,
+                            'thumb': thumb_image
+                        }
+
+                        # Category titles have stored in different places
+                        if collection['attributes'].get('title'):
+                            link_title = collection['attributes']['title']
+                        elif link['attributes'].get('title'):
+                            link_title = link['attributes']['title']
+                        elif link['attributes'].get('name'):
+                            link_title = link['attributes']['name']
+                        else:
+                            link_title = None
 
-                                if link['relationships'].get('images'):
-                                    for image in images:
-                                        if image['id'] == \
-                                                link['relationships']['images']['data'][0][
-                                                    'id']:
-                                            thumb_image = image['attributes']['src']
-                                else:
-                                    thumb_image = None
+                        helper.add_item(link_title, params, content='videos', art=category_art,
+                                        folder_name=collection['attributes'].get('title'))
 
-                                link_info = {
-                                    'plot': link['attributes'].get('description')
-                                }
+            # discoveryplus.com (US and EU) search result 'collections' folder content
+            link = included.related(collectionItem, 'link')
+            if link:
+                params = {
+                    'action': 'list_page',
+                    'page_path': included.route_url(link, 'linkedContentRoutes')
+                }
 
-                                link_art = {
-                                    'fanart': thumb_image,
-                                    'thumb': thumb_image
-                                }
+                thumb_image = included.first_image(link)
 
-                                # Category titles have stored in different places
-                                if collectionItem.get('attributes') and collectionItem['attributes'].get('title'):
-                                    link_title = collectionItem['attributes']['title']
-                                elif link['attributes'].get('title'):
-                                    link_title = link['attributes']['title']
-                                elif link['attributes'].get('name'):
-                                    link_title = link['attributes']['name']
-                                else:
-                                    link_title = None
-
-                                helper.add_item(link_title, params, info=link_info, content='videos',
-                                                art=link_art,
-                                                folder_name=page_data['data']['attributes'].get('title'))
+                link_info = {
+                    'plot': link['attributes'].get('description')
+                }
 
-                    # Kids -> Superheroes discoveryplus.in
-                    if collectionItem['relationships'].get('taxonomyNode'):
-                        for taxonomyNode in taxonomyNodes:
-                            if collectionItem['relationships']['taxonomyNode']['data']['id'] == taxonomyNode['id']:
+                link_art = {
+                    'fanart': thumb_image,
+                    'thumb': thumb_image
+                }
 
-                                # Find page path from routes
-                                for route in routes:
-                                    if route['id'] == taxonomyNode['relationships']['routes']['data'][0]['id']:
-                                        next_page_path = route['attributes']['url']
+                # Category titles have stored in different places
+                if collectionItem.get('attributes') and collectionItem['attributes'].get('title'):
+                    link_title = collectionItem['attributes']['title']
+                elif link['attributes'].get('title'):
+                    link_title = link['attributes']['title']
+                elif link['attributes'].get('name'):
+                    link_title = link['attributes']['name']
+                else:
+                    link_title = None
 
-                                params = {
-                                    'action': 'list_page',
-                                    'page_path': next_page_path
-                                }
+                helper.add_item(link_title, params, info=link_info, content='videos', art=link_art,
+                                folder_name=page_data['data']['attributes'].get('title'))
 
-                                fanart_image = None
-                                thumb_image = None
-                                logo_image = None
-                                poster_image = None
-                                if taxonomyNode['relationships'].get('images'):
-                                    for image in images:
-                                        for taxonomyNode_images in taxonomyNode['relationships']['images']['data']:
-                                            if image['id'] == taxonomyNode_images['id']:
-                                                if image['attributes']['kind'] == 'default':
-                                                    fanart_image = image['attributes']['src']
-                                                    thumb_image = image['attributes']['src']
-                                                if image['attributes']['kind'] == 'logo':
-                                                    logo_image = image['attributes']['src']
-                                                # discoveryplus.in has logos in poster
-                                                if helper.d.locale_suffix == 'in':
-                                                    if image['attributes']['kind'] == 'poster':
-                                                        poster_image = image['attributes']['src']
-                                                else:
-                                                    if image['attributes'][
-                                                        'kind'] == 'poster_with_logo':
-                                                        poster_image = image['attributes']['src']
-
-                                art = {
-                                    'fanart': fanart_image,
-                                    'thumb': thumb_image,
-                                    'clearlogo': logo_image,
-                                    'poster': poster_image
-                                }
+            # Kids -> Superheroes discoveryplus.in
+            taxonomyNode = included.related(collectionItem, 'taxonomyNode')
+            if taxonomyNode:
+                params = {
+                    'action': 'list_page',
+                    'page_path': included.route_url(taxonomyNode)
+                }
 
-                                info = {
-                                    'plot': taxonomyNode['attributes'].get('description')
-                                }
+                info = {
+                    'plot': taxonomyNode['attributes'].get('description')
+                }
 
-                                helper.add_item(taxonomyNode['attributes']['name'], params, info=info, art=art,
-                                                content='tvshows', sort_method='unsorted')
+                helper.add_item(taxonomyNode['attributes']['name'], params, info=info,
+                                art=metadata.show_art(taxonomyNode), content='tvshows', sort_method='unsorted')
 
         try:
             if page_data['data']['meta']['itemsCurrentPage'] != page_data['data']['meta']['itemsTotalPages']:
@@ -2377,9 +1236,6 @@ def router(paramstring):
         if params['setting'] == 'reset_settings':
             helper.reset_settings()
     elif 'iptv' in params:
-        # Get new token
-        helper.d.get_token()
-
         if params['iptv'] == 'channels':
             """Return JSON-STREAMS formatted data for all live channels"""
             from resources.lib.iptvmanager import IPTVManager
@@ -2391,9 +1247,6 @@ def router(paramstring):
             port = int(params.get('port'))
             IPTVManager(port).send_epg()
     elif 'action' in params:
-        # Get new token
-        helper.d.get_token()
-
         if params['action'] == 'list_page':
             if helper.d.locale_suffix == 'in':
                 list_page_in(page_path=params['page_path'])
@@ -2453,4 +1306,8 @@ def router(paramstring):
 if __name__ == '__main__':
     # Call the router function and pass the plugin call parameters to it.
     # We use string slicing to trim the leading '?' from the plugin call paramstring
-    router(sys.argv[2][1:])
+    try:
+        router(sys.argv[2][1:])
+    finally:
+        # Save changed cookies once per invocation
+        helper.close()
@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+"""
+Availability evaluation benchmark
+
+Compares the playable and subscription checks listings did inline for every
+video with AvailabilityEvaluator on a 100 video page. A page that lists the
+same videos again (next page of a season, listing opened twice) is served
+from the evaluator's results.
+
+    python benchmarks/availability.py
+    python benchmarks/availability.py --pages 500
+"""
+import os
+import sys
+import time
+import argparse
+from datetime import datetime
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+ADDON_DIR = os.path.dirname(BENCHMARKS_DIR)
+sys.path[0:0] = [os.path.join(BENCHMARKS_DIR, 'kodistubs'), BENCHMARKS_DIR, ADDON_DIR]
+
+from fixtures import Included, SyntheticFixtures
+from parse_dates import strptime_parse, clear_memo
+from resources.lib.availability import AvailabilityEvaluator
+
+
+class Entitlements(object):
+    """UserEntitlements with packages already fetched"""
+
+    def __init__(self, packages):
+        self.packages = frozenset(packages)
+
+    def has_any(self, packages):
+        return not self.packages.isdisjoint(packages)
+
+
+def inline(videos, entitlements):
+    """Checks copied in list_collection, list_collection_items and list_favorite_watchlist_videos_in before"""
+    for video in videos:
+        if video['attributes'].get('earliestPlayableStart'):
+            if strptime_parse(video['attributes']['earliestPlayableStart']) > datetime.now():
+                strptime_parse(video['attributes']['earliestPlayableStart']).strftime('%d.%m.%Y %H:%M')
+        subscription_needed = None
+        if len(video['attributes']['packages']) > 1:
+            for availabilityWindow in video['attributes']['availabilityWindows']:
+                if availabilityWindow['package'] == 'Free' or availabilityWindow['package'] == 'Registered':
+                    if availabilityWindow.get('playableEnd'):
+                        if strptime_parse(availabilityWindow['playableStart']) < datetime.now() < strptime_parse(
+                                availabilityWindow['playableEnd']):
+                            subscription_needed = False
+                        else:
+                            subscription_needed = True
+        else:
+            subscription_needed = True
+        subscription_needed = not entitlements.has_any(video['attributes']['packages'])
+
+
+def measure(func, pages):
+    """Return microseconds per page."""
+    elapsed = 0
+    for _ in range(pages):
+        start = time.perf_counter()
+        func()
+        elapsed += time.perf_counter() - start
+    return elapsed / pages * 1000000
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Availability evaluation benchmark')
+    parser.add_argument('--pages', type=int, default=200, help='Pages to evaluate')
+    args = parser.parse_args()
+
+    fixtures = SyntheticFixtures('gb')
+    included = Included()
+    videos = [fixtures.video(included, n) for n in range(100)]
+    entitlements = Entitlements(['Registered'])
+
+    def new_listing():
+        clear_memo()
+        AvailabilityEvaluator(entitlements).evaluate(videos)
+
+    evaluator = AvailabilityEvaluator(entitlements)
+
+    print('%-26s %12s' % ('evaluation', 'us/page'))
+    print('%-26s %12.1f' % ('inline', measure(lambda: inline(videos, entitlements), args.pages)))
+    print('%-26s %12.1f' % ('evaluator, new listing', measure(new_listing, args.pages)))
+    print('%-26s %12.1f' % ('evaluator, same videos', measure(lambda: evaluator.evaluate(videos), args.pages)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,80 @@
+# -*- coding: utf-8 -*-
+"""
+EPG memory benchmark
+
+Builds a full week EPG for a European locale with Dplay.get_epg() against
+generated API responses and measures memory the result keeps alive. It is
+compared with the same EPG as JSON-EPG dicts with their own strings, which is
+how get_epg kept programmes before the compact programme model.
+
+    python benchmarks/epg_memory.py
+    python benchmarks/epg_memory.py --channels 40 --programmes 60
+"""
+import os
+import sys
+import gc
+import json
+import argparse
+import tracemalloc
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+ADDON_DIR = os.path.dirname(BENCHMARKS_DIR)
+sys.path[0:0] = [os.path.join(BENCHMARKS_DIR, 'kodistubs'), BENCHMARKS_DIR, ADDON_DIR]
+ARGV = sys.argv[1:]
+sys.argv = ['plugin://plugin.video.discoveryplus/', '1', '']
+
+import xbmcaddon
+
+from fixtures import SyntheticFixtures
+from run import Runner
+
+
+def retained(build):
+    """Return (result, bytes allocated by build() that are still alive)."""
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    result = build()
+    gc.collect()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return result, after - before
+
+
+def main():
+    parser = argparse.ArgumentParser(description='EPG memory benchmark')
+    parser.add_argument('--locale', default='fi', help='European locale to build EPG for')
+    parser.add_argument('--channels', type=int, default=12, help='Channels in EPG')
+    parser.add_argument('--programmes', type=int, default=48, help='Programmes per channel and day')
+    args = parser.parse_args(ARGV)
+
+    from resources.lib.epg import to_json
+    from resources.lib.kodihelper import KodiHelper
+
+    runner = Runner(warm=True)
+    try:
+        # Days from today on are a full week
+        runner.adapter.fixtures = SyntheticFixtures(args.locale, channels=args.channels, epg_days=7,
+                                                    programmes_per_day=args.programmes)
+        xbmcaddon.SETTINGS.update(country=args.locale)
+        xbmcaddon.PROFILE = runner.profile(args.locale)
+        d = KodiHelper(sys.argv[0], int(sys.argv[1])).d
+
+        # First call opens EPG store and connections, second call is measured
+        d.get_epg()
+        epg, compact = retained(d.get_epg)
+        # Programmes as dicts with strings of their own, like parsed from API responses
+        text = json.dumps(epg, default=to_json)
+        dicts, plain = retained(lambda: json.loads(text))
+    finally:
+        runner.close()
+
+    programmes = sum(len(p) for p in epg.values())
+    print('%d channels, %d programmes' % (len(epg), programmes))
+    print('%-10s %12s %14s' % ('model', 'KiB', 'bytes/programme'))
+    print('%-10s %12.1f %14.1f' % ('dicts', plain / 1024.0, plain / float(programmes)))
+    print('%-10s %12.1f %14.1f' % ('compact', compact / 1024.0, compact / float(programmes)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,389 @@
+# -*- coding: utf-8 -*-
+"""
+discovery+ API fixtures for the benchmarks
+
+SyntheticFixtures builds JSON:API responses with the same shape as the
+discovery+ API for each locale, so benchmarks run without network and
+without an account.
+"""
+import re
+import json
+import hashlib
+from datetime import date, timedelta
+
+try:  # Python 3
+    from urllib.parse import urlsplit, parse_qsl
+except ImportError:  # Python 2
+    from urlparse import urlsplit, parse_qsl
+
+LOCALES = ('gb', 'us', 'in', 'fi')
+
+class Included(object):
+    """Collects included resources in insertion order without duplicates"""
+
+    def __init__(self):
+        self.resources = []
+        self.ids = set()
+
+    def add(self, resource):
+        key = (resource['type'], resource['id'])
+        if key not in self.ids:
+            self.ids.add(key)
+            self.resources.append(resource)
+        return ref(resource)
+
+
+def ref(resource):
+    return {'type': resource['type'], 'id': resource['id']}
+
+
+def to_one(resource):
+    return {'data': ref(resource)}
+
+
+class SyntheticFixtures(object):
+    """Generated responses for locale"""
+
+    def __init__(self, locale, collection_size=100, channels=12, epg_days=7, programmes_per_day=48):
+        self.locale = locale
+        self.collection_size = collection_size
+        self.channels = channels
+        self.epg_days = epg_days
+        self.programmes_per_day = programmes_per_day
+        self.rating_system = {'gb': 'Ofcom', 'us': 'BLM', 'in': 'DMEC'}.get(locale, 'NICAM')
+        self.poster_kind = 'poster' if locale == 'in' else 'poster_with_logo'
+        self.today = date.today()
+        self.routes = [
+            ('GET', re.compile(r'^/token$'), self.token),
+            ('GET', re.compile(r'^/users/me$'), self.user),
+            ('GET', re.compile(r'^/cms/collections/(web-menubar-v2|bottom-menu-v3)$'), self.menu),
+            ('GET', re.compile(r'^/cms/collections/epg-(?P<channel>\d+)$'), self.epg_collection),
+            ('GET', re.compile(r'^/cms/collections/(?P<collection_id>[^/]+)$'), self.collection),
+            ('GET', re.compile(r'^/cms/routes/epg$'), self.epg_page),
+            ('GET', re.compile(r'^/cms/routes/home$'), self.home_page),
+            ('GET', re.compile(r'^/cms/routes/show/(?P<slug>[^/]+)$'), self.show_page),
+            ('GET', re.compile(r'^/content/videos/(?P<video_id>[^/]+)$'), self.content_video),
+            ('POST', re.compile(r'^/playback/v3/(video|channel)PlaybackInfo$'), self.playback_info),
+            ('PUT', re.compile(r'^/playback/v2/report/video/(?P<video_id>[^/]+)$'), self.empty),
+            ('POST', re.compile(r'^/users/me/favorites/show/(?P<show_id>[^/]+)$'), self.empty),
+        ]
+        self._bodies = {}
+
+    def response(self, method, url):
+        """Return (status, body bytes) for request."""
+        parts = urlsplit(url)
+        query = dict(parse_qsl(parts.query))
+        for route_method, pattern, handler in self.routes:
+            match = pattern.match(parts.path)
+            if route_method == method.upper() and match:
+                # Same request returns same bytes, like a recorded session
+                key = (method.upper(), parts.path, tuple(sorted(query.items())))
+                if key not in self._bodies:
+                    self._bodies[key] = json.dumps(handler(query, **match.groupdict())).encode('utf-8')
+                return 200, self._bodies[key]
+        body = {'errors': [{'status': '404', 'code': 'not.found', 'detail': 'No fixture for %s %s' % (method, url)}]}
+        return 404, json.dumps(body).encode('utf-8')
+
+    # Resources
+
+    def image(self, included, owner, kind):
+        return included.add({
+            'type': 'image', 'id': '%s-%s' % (owner, kind),
+            'attributes': {'kind': kind, 'src': 'https://images.example/%s/%s.jpg' % (owner, kind),
+                           'width': 1920, 'height': 1080}
+        })
+
+    def images(self, included, owner, kinds):
+        return {'data': [self.image(included, owner, kind) for kind in kinds]}
+
+    def route(self, included, url):
+        return included.add({
+            'type': 'route', 'id': hashlib.sha1(url.encode('utf-8')).hexdigest()[:16],
+            'attributes': {'url': url, 'canonical': True}
+        })
+
+    def genre(self, included, n):
+        return included.add({
+            'type': 'taxonomyNode', 'id': 'genre-%d' % (n % 8),
+            'attributes': {'name': 'Genre %d' % (n % 8), 'kind': 'genres'},
+            'relationships': {'routes': {'data': [self.route(included, '/genre/%d' % (n % 8))]}}
+        })
+
+    def channel(self, included, n, live=True):
+        channel = {
+            'type': 'channel', 'id': str(100 + n),
+            'attributes': {'name': 'Channel %d' % n, 'description': 'Channel %d description' % n,
+                           'hasLiveStream': live, 'alias': 'channel-%d' % n},
+            'relationships': {'images': self.images(included, 'channel-%d' % n, ('logo', 'default'))}
+        }
+        included.add(channel)
+        return channel
+
+    def content_ratings(self):
+        return [{'system': self.rating_system, 'code': '12'}, {'system': 'other', 'code': '16'}]
+
+    def show(self, included, n):
+        show = {
+            'type': 'show', 'id': str(1000 + n),
+            'attributes': {
+                'name': 'Show %d' % n, 'alias': 'show-%d' % n,
+                'description': 'Short description of show %d' % n,
+                'longDescription': 'Long description of show %d. ' % n * 4,
+                'isFavorite': n % 5 == 0, 'seasonNumbers': list(range(1, 2 + n % 6)),
+                'episodeCount': 10 + n % 30, 'contentRatings': self.content_ratings()
+            },
+            'relationships': {
+                'images': self.images(included, 'show-%d' % n, ('default', 'logo', self.poster_kind)),
+                'routes': {'data': [self.route(included, '/show/show-%d' % n)]},
+                'txGenres': {'data': [self.genre(included, n), self.genre(included, n + 3)]},
+                'primaryChannel': to_one(self.channel(included, n % self.channels))
+            }
+        }
+        included.add(show)
+        return show
+
+    def video(self, included, n, show=None):
+        show = show or self.show(included, n // 10)
+        day = self.today - timedelta(days=n % 30)
+        free = n % 4 == 0
+        video = {
+            'type': 'video', 'id': str(50000 + n),
+            'attributes': {
+                'name': ' Episode %d' % n, 'description': 'Description of episode %d' % n,
+                'videoType': 'EPISODE', 'videoDuration': 2580000 + n * 1000,
+                'seasonNumber': 1 + n % 3, 'episodeNumber': 1 + n % 12,
+                'airDate': '%sT18:00:00Z' % day.isoformat(),
+                'earliestPlayableStart': '%sT18:00:00Z' % day.isoformat(),
+                'packages': ['Free', 'Premium'] if free else ['Premium'],
+                'availabilityWindows': [
+                    {'package': 'Free' if free else 'Premium',
+                     'playableStart': '%sT18:00:00Z' % day.isoformat(),
+                     'playableEnd': '%sT18:00:00Z' % (day + timedelta(days=60)).isoformat()}
+                ],
+                'viewingHistory': {'viewed': n % 3 == 0, 'completed': n % 6 == 0, 'position': 600000},
+                'contentRatings': self.content_ratings()
+            },
+            'relationships': {
+                'show': to_one(show),
+                'images': self.images(included, 'video-%d' % n, ('default',)),
+                'txGenres': {'data': [self.genre(included, n)]},
+                'primaryChannel': to_one(self.channel(included, n % self.channels))
+            }
+        }
+        included.add(video)
+        return video
+
+    def link(self, included, n, url):
+        return included.add({
+            'type': 'link', 'id': 'link-%d' % n,
+            'attributes': {'kind': 'Internal Link', 'name': 'link-%d' % n, 'title': 'Link %d' % n,
+                           'alias': 'link-%d' % n, 'description': 'Menu link %d' % n},
+            'relationships': {
+                'linkedContentRoutes': {'data': [self.route(included, url)]},
+                'images': self.images(included, 'link-%d' % n, ('default',))
+            }
+        })
+
+    def collection_item(self, included, item_id, **relationships):
+        return included.add({
+            'type': 'collectionItem', 'id': item_id,
+            'relationships': dict((name, {'data': resource}) for name, resource in relationships.items())
+        })
+
+    # Responses
+
+    def token(self, query):
+        return {'data': {'type': 'token', 'id': 'token', 'attributes': {'token': 'benchmark-token'}}}
+
+    def user(self, query):
+        return {'data': {'type': 'user', 'id': 'user-1', 'attributes': {
+            'anonymous': False, 'selectedProfileId': 'profile-1', 'packages': ['Premium', 'Registered']}}}
+
+    def empty(self, query, **kwargs):
+        return {'meta': {}}
+
+    def menu(self, query):
+        included = Included()
+        items = []
+        for n in range(12):
+            url = '/home' if n == 0 else '/page-%d' % n
+            link = self.link(included, n, url)
+            if self.locale == 'in':
+                # discovery+ India wraps links to menu-item collections
+                inner = self.collection_item(included, 'menu-link-item-%d' % n, link=link)
+                collection = included.add({
+                    'type': 'collection', 'id': 'menu-item-%d' % n,
+                    'attributes': {'title': 'Menu %d' % n, 'alias': 'menu-item-%d' % n,
+                                   'component': {'id': 'menu-item'}},
+                    'relationships': {'items': {'data': [inner]}}
+                })
+                items.append(self.collection_item(included, 'menu-entry-%d' % n, collection=collection))
+            else:
+                items.append(self.collection_item(included, 'menu-entry-%d' % n, link=link))
+        return {
+            'data': {'type': 'collection', 'id': 'menu', 'attributes': {'alias': 'menu'},
+                     'relationships': {'items': {'data': items}}},
+            'included': included.resources
+        }
+
+    def collection(self, query, collection_id):
+        included = Included()
+        page = int(query.get('page[items.number]', 1))
+        items = []
+        for n in range(self.collection_size):
+            index = (page - 1) * self.collection_size + n
+            if n % 2:
+                items.append(self.collection_item(included, '%s-item-%d' % (collection_id, index),
+                                                  video=ref(self.video(included, index))))
+            else:
+                items.append(self.collection_item(included, '%s-item-%d' % (collection_id, index),
+                                                  show=ref(self.show(included, index))))
+        return {
+            'data': {
+                'type': 'collection', 'id': collection_id,
+                'attributes': {'title': 'Collection %s' % collection_id, 'alias': collection_id,
+                               'component': {'id': 'content-grid'}},
+                'relationships': {'items': {'data': items}},
+                'meta': {'itemsCurrentPage': page, 'itemsTotalPages': 3, 'itemsTotalCount': 3 * self.collection_size}
+            },
+            'included': included.resources
+        }
+
+    def home_page(self, query):
+        included = Included()
+        page_items = []
+        for n in range(15):
+            collection = included.add({
+                'type': 'collection', 'id': 'home-grid-%d' % n,
+                'attributes': {'title': 'Rail %d' % n, 'alias': 'home-rail-%d' % n,
+                               'component': {'id': 'content-grid', 'mandatoryParams': 'pf[rail]=%d' % n}},
+                'relationships': {'items': {'data': [
+                    self.collection_item(included, 'home-grid-%d-item-%d' % (n, i),
+                                         show=ref(self.show(included, n * 10 + i)))
+                    for i in range(10)]}}
+            })
+            page_items.append(included.add({'type': 'pageItem', 'id': 'home-page-item-%d' % n,
+                                            'relationships': {'collection': {'data': collection}}}))
+
+        # Introducing discovery+ Channels
+        channel_items = [self.collection_item(included, 'jip-item-%d' % n, channel=ref(self.channel(included, n)))
+                         for n in range(self.channels)]
+        collection = included.add({
+            'type': 'collection', 'id': 'home-jip-channels',
+            'attributes': {'title': 'discovery+ Channels', 'alias': 'home-rail-jip-channels',
+                           'component': {'id': 'content-grid'}},
+            'relationships': {'items': {'data': channel_items}}
+        })
+        page_items.append(included.add({'type': 'pageItem', 'id': 'home-page-item-jip',
+                                        'relationships': {'collection': {'data': collection}}}))
+
+        page = included.add({
+            'type': 'page', 'id': 'home',
+            'attributes': {'title': 'Home', 'pageMetadataTitle': 'Home'},
+            'relationships': {'items': {'data': page_items}}
+        })
+        return {
+            'data': {'type': 'route', 'id': 'route-home', 'attributes': {'url': '/home'},
+                     'relationships': {'target': {'data': page}}},
+            'included': included.resources
+        }
+
+    def show_page(self, query, slug):
+        included = Included()
+        show = self.show(included, int(slug.split('-')[-1]))
+        seasons = [{'id': str(season), 'parameter': 'pf[seasonNumber]=%d' % season}
+                   for season in range(1, 9)]
+        tabs = included.add({
+            'type': 'collection', 'id': 'show-page-episodes',
+            'attributes': {'title': 'Episodes', 'alias': 'show-page-episodes',
+                           'component': {'id': 'tabbed-content', 'mandatoryParams': 'pf[show.id]=%s' % show['id'],
+                                         'filters': [{'id': 'seasonNumber', 'options': seasons}]}},
+            'relationships': {'items': {'data': []}}
+        })
+        tab_item = self.collection_item(included, 'show-page-tab-item', collection=tabs)
+        container = included.add({
+            'type': 'collection', 'id': 'show-page-tabs',
+            'attributes': {'alias': 'show-page-tabs', 'component': {'id': 'tabbed-component'}},
+            'relationships': {'items': {'data': [tab_item]}}
+        })
+        page_item = included.add({'type': 'pageItem', 'id': 'show-page-item',
+                                  'relationships': {'collection': {'data': container}}})
+        page = included.add({
+            'type': 'page', 'id': 'show-page',
+            'attributes': {'title': show['attributes']['name'], 'pageMetadataTitle': show['attributes']['name']},
+            'relationships': {'items': {'data': [page_item]}, 'primaryContent': to_one(show)}
+        })
+        return {
+            'data': {'type': 'route', 'id': 'route-%s' % slug, 'attributes': {'url': '/show/%s' % slug},
+                     'relationships': {'target': {'data': page}}},
+            'included': included.resources
+        }
+
+    def epg_dates(self):
+        return [self.today + timedelta(days=n) for n in range(-self.epg_days, self.epg_days)]
+
+    def epg_page(self, query):
+        included = Included()
+        options = [{'id': day.isoformat(), 'parameter': 'pf[day]=%s' % day.isoformat()} for day in self.epg_dates()]
+        items = []
+        for n in range(self.channels):
+            collection = included.add({
+                'type': 'collection', 'id': 'epg-%d' % n,
+                'attributes': {'alias': 'epg-listing-%d' % n, 'component': {'id': 'epg-listing'}}
+            })
+            items.append(self.collection_item(included, 'epg-wrapper-item-%d' % n, collection=collection))
+        included.add({
+            'type': 'collection', 'id': 'epg-wrapper',
+            'attributes': {'alias': 'epg-listing-wrapper', 'component': {
+                'id': 'epg-listing-wrapper',
+                'filters': [{'id': 'day', 'options': options,
+                             'initiallySelectedOptionIds': [self.today.isoformat()]}]}},
+            'relationships': {'items': {'data': items}}
+        })
+        return {'data': {'type': 'route', 'id': 'route-epg', 'attributes': {'url': '/epg'}},
+                'included': included.resources}
+
+    def epg_collection(self, query, channel):
+        included = Included()
+        day = query.get('pf[day]', self.today.isoformat())
+        self.channel(included, int(channel))
+        items = []
+        minutes = 24 * 60 // self.programmes_per_day
+        for n in range(self.programmes_per_day):
+            start = n * minutes
+            stop = start + minutes
+            video = {
+                'type': 'video', 'id': 'epg-%s-%s-%d' % (channel, day, n),
+                'attributes': {
+                    'name': 'Programme %d' % n, 'description': 'Programme %d on channel %s' % (n, channel),
+                    'scheduleStart': '%sT%02d:%02d:00Z' % (day, start // 60, start % 60),
+                    'scheduleEnd': '%sT%02d:%02d:00Z' % (day, (stop // 60) % 24, stop % 60),
+                    'customAttributes': {'listingShowName': 'Show %d' % (n % 7),
+                                         'listingSeasonNumber': 1 + n % 4, 'listingEpisodeNumber': 1 + n % 10}
+                },
+                'relationships': {'images': self.images(included, 'epg-%s-%d' % (channel, n % 7), ('default',))}
+            }
+            if n % 12 == 0:
+                # Sport events
+                video['attributes']['secondaryTitle'] = 'Round %d' % n
+                video['relationships']['txSports'] = {'data': [self.genre(included, n)]}
+            included.add(video)
+            items.append(self.collection_item(included, 'epg-item-%s-%s-%d' % (channel, day, n), video=ref(video)))
+        return {
+            'data': {'type': 'collection', 'id': 'epg-%s' % channel, 'attributes': {'alias': 'epg-%s' % channel},
+                     'relationships': {'items': {'data': items}}},
+            'included': included.resources
+        }
+
+    def content_video(self, query, video_id):
+        included = Included()
+        video = self.video(included, int(video_id) - 50000)
+        return {'data': video, 'included': [r for r in included.resources if r is not video]}
+
+    def playback_info(self, query):
+        return {'data': {'type': 'videoPlaybackInfo', 'id': 'playback', 'attributes': {'streaming': [{
+            'url': 'https://stream.example/manifest.mpd', 'type': 'dash',
+            'protection': {'drmEnabled': True, 'drmToken': 'drm-token',
+                           'schemes': {'widevine': {'licenseUrl': 'https://license.example/widevine'}}}
+        }]}}}
+
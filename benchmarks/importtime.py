@@ -0,0 +1,115 @@
+# -*- coding: utf-8 -*-
+"""
+Plugin cold start benchmark
+
+Every plugin invocation is a new Python interpreter that imports addon.py,
+which creates KodiHelper at module level. This imports addon.py the same way
+in a new interpreter started with -X importtime and compares the import time
+of addon with a budget. Modules that only some actions need (requests and
+Dplay on first API use, inputstreamhelper on DRM playback) must not be
+imported by the entry point.
+
+    python benchmarks/importtime.py
+    python benchmarks/importtime.py --budget 20 --runs 10
+
+Exits with status 1 when the budget is exceeded or a deferred module is imported.
+"""
+import os
+import sys
+import json
+import argparse
+import warnings
+import compileall
+import subprocess
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+ADDON_DIR = os.path.dirname(BENCHMARKS_DIR)
+
+# Entry point took 141 ms with requests and Dplay imported at module load
+DEFAULT_BUDGET_MS = 30
+
+DEFERRED = ('requests', 'urllib3', 'inputstreamhelper', 'http.cookiejar', 'sqlite3', 'uuid',
+            'resources.lib.dplay', 'resources.lib.iptvmanager')
+
+CHILD = '''
+import sys, json, shutil, tempfile
+sys.path[0:0] = %r
+sys.argv = ['plugin://plugin.video.discoveryplus/', '1', '']
+import xbmcaddon
+xbmcaddon.PROFILE = tempfile.mkdtemp(prefix='dplus-bench-')
+try:
+    import addon
+    sys.stdout.write(json.dumps(sorted(sys.modules)))
+finally:
+    shutil.rmtree(xbmcaddon.PROFILE, ignore_errors=True)
+''' % [os.path.join(BENCHMARKS_DIR, 'kodistubs'), ADDON_DIR]
+
+
+def parse_importtime(stderr):
+    """Return {module: (self us, cumulative us, depth)} from -X importtime output."""
+    modules = {}
+    for line in stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        depth = (len(name) - len(name.lstrip())) // 2
+        modules[name.strip()] = (int(self_us), int(cumulative_us), depth)
+    return modules
+
+
+def compile_addon():
+    """Write bytecode like Kodi does on first run so runs don't measure compiling."""
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore')
+        compileall.compile_file(os.path.join(ADDON_DIR, 'addon.py'), quiet=2)
+        for directory in (os.path.join(ADDON_DIR, 'resources'), os.path.join(BENCHMARKS_DIR, 'kodistubs')):
+            compileall.compile_dir(directory, quiet=2)
+
+
+def run_once():
+    """Import addon in a new interpreter. Return (importtime modules, modules loaded)."""
+    process = subprocess.run([sys.executable, '-X', 'importtime', '-c', CHILD], cwd=ADDON_DIR,
+                             stdout=subprocess.PIPE, stderr=subprocess.PIPE, universal_newlines=True, check=True)
+    return parse_importtime(process.stderr), json.loads(process.stdout)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Plugin cold start benchmark')
+    parser.add_argument('--runs', type=int, default=5, help='Interpreters to start. Fastest run is reported')
+    parser.add_argument('--budget', type=float, default=DEFAULT_BUDGET_MS, help='Import time budget of addon in ms')
+    parser.add_argument('--top', type=int, default=10, help='Slowest modules to list')
+    args = parser.parse_args()
+
+    compile_addon()
+    runs = [run_once() for _ in range(args.runs)]
+    modules, loaded = min(runs, key=lambda run: run[0]['addon'][1])
+    total_ms = modules['addon'][1] / 1000.0
+    addon_depth = modules['addon'][2]
+
+    print('%-40s %10s %10s' % ('module', 'self ms', 'cumul ms'))
+    # Modules imported under addon, python startup (site, encodings) is left out
+    names = list(modules)
+    under_addon = names[names.index('addon') - 1::-1]
+    children = []
+    for name in under_addon:
+        if modules[name][2] <= addon_depth:
+            break
+        children.append(name)
+    for name in sorted(children, key=lambda name: -modules[name][1])[:args.top]:
+        print('%-40s %10.1f %10.1f' % (name, modules[name][0] / 1000.0, modules[name][1] / 1000.0))
+    print('%-40s %10.1f %10.1f' % ('addon', modules['addon'][0] / 1000.0, total_ms))
+
+    failed = False
+    print('\naddon import: %.1f ms, budget %.1f ms' % (total_ms, args.budget))
+    if total_ms > args.budget:
+        print('FAIL: import time over budget')
+        failed = True
+    imported = [name for name in DEFERRED if name in loaded]
+    if imported:
+        print('FAIL: deferred modules imported at entry: %s' % ', '.join(imported))
+        failed = True
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
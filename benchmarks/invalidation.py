@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+"""
+Response cache invalidation check
+
+Fills the response cache with menu, page, collection and favorites responses
+from fixtures, then sends a playback progress report and a favorite change
+and checks which cached endpoints are left. Pages and collections have
+viewingHistory and isFavorite decorators, so both writes must remove them.
+Menus don't change and must stay.
+
+    python benchmarks/invalidation.py
+
+Exits with status 1 when a write leaves a stale endpoint or removes a menu.
+"""
+import os
+import sys
+import shutil
+import tempfile
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+ADDON_DIR = os.path.dirname(BENCHMARKS_DIR)
+sys.path[0:0] = [os.path.join(BENCHMARKS_DIR, 'kodistubs'), BENCHMARKS_DIR, ADDON_DIR]
+
+import xbmcaddon
+
+from fixtures import SyntheticFixtures
+from replay import ReplayAdapter, install
+from run import SETTINGS
+
+# Write, endpoints it must remove from cache
+WRITES = [
+    ('update_playback_progress', lambda d: d.update_playback_progress('put', '50003', 1000),
+     ('page', 'collection', 'favorites')),
+    ('add_or_delete_favorite', lambda d: d.add_or_delete_favorite('post', 'show-3'),
+     ('page', 'collection', 'favorites')),
+]
+
+
+def fill_cache(d):
+    d.get_menu('/web-menubar-v2')
+    d.get_page('/home')
+    d.get_collections('benchmark-grid', 1)
+    # Favorites listings are discoveryplus.in only, store one like make_cached_request does
+    d.cache.set(d.cache.make_key('favorites-check'), b'{}', 300, endpoint='favorites')
+
+
+def cached_endpoints(d):
+    return set(row[0] for row in d.cache._execute('SELECT DISTINCT endpoint FROM responses'))
+
+
+def main():
+    install(ReplayAdapter(SyntheticFixtures('gb')))
+    xbmcaddon.PROFILE = tempfile.mkdtemp(prefix='dplus-bench-')
+    xbmcaddon.SETTINGS.update(SETTINGS, country='gb')
+    from resources.lib.kodihelper import KodiHelper
+
+    failed = False
+    try:
+        d = KodiHelper('plugin://plugin.video.discoveryplus/', 1, backend=False).d
+        for name, write, evicted in WRITES:
+            d.cache.clear()
+            fill_cache(d)
+            write(d)
+            left = cached_endpoints(d)
+            stale = sorted(left.intersection(evicted))
+            print('%-26s cached after write: %s' % (name, ', '.join(sorted(left)) or '-'))
+            if stale:
+                print('FAIL: %s left %s in cache' % (name, ', '.join(stale)))
+                failed = True
+            if 'menu' not in left:
+                print('FAIL: %s removed menu from cache' % name)
+                failed = True
+    finally:
+        shutil.rmtree(xbmcaddon.PROFILE, ignore_errors=True)
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
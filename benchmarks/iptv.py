@@ -0,0 +1,174 @@
+# -*- coding: utf-8 -*-
+"""
+IPTV Manager transfer benchmark
+
+Sends a generated multi-day EPG to a local socket like IPTV Manager receives
+it, once with the old single json.dumps() and sendall() and once with the
+streaming sender of resources/lib/iptvmanager.py. Every send runs in its own
+process so peak RSS of one doesn't hide the other.
+
+    python benchmarks/iptv.py
+    python benchmarks/iptv.py --channels 40 --days 14 --programmes 48
+
+Peak RSS is read from /proc/self/status, so RSS columns are only filled on Linux.
+"""
+import os
+import sys
+import json
+import time
+import socket
+import argparse
+import tempfile
+import threading
+import subprocess
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+ADDON_DIR = os.path.dirname(BENCHMARKS_DIR)
+
+MODES = ('dumps', 'stream')
+
+
+def make_epg(channels, days, programmes):
+    """Return EPG dict with the same fields as Dplay.get_epg()."""
+    epg = {}
+    for c in range(channels):
+        channel_id = 'plugin.video.discoveryplus.%d' % (100 + c)
+        epg[channel_id] = []
+        for p in range(days * programmes):
+            start = 1700000000 + p * 1800
+            epg[channel_id].append(dict(
+                start=time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime(start)),
+                stop=time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime(start + 1800)),
+                title='Show %d' % (p % 97),
+                description=('Episode %d of channel %d. ' % (p, c)) * 12,
+                subtitle='Episode %d' % p,
+                episode='S%dE%d' % (p % 9 + 1, p % 24 + 1),
+                image='https://eu1-prod-images.disco-api.com/2023/01/01/%032x.jpeg' % (c * 100000 + p)
+            ))
+    return epg
+
+
+def read_status(field):
+    """Return field of /proc/self/status in KiB or None."""
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith(field + ':'):
+                    return int(line.split()[1])
+    except (IOError, OSError):
+        pass
+    return None
+
+
+class Receiver(threading.Thread):
+    """Accepts one connection and counts received bytes like IPTV Manager reading the socket"""
+
+    def __init__(self):
+        threading.Thread.__init__(self)
+        self.daemon = True
+        self.server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.server.bind(('127.0.0.1', 0))
+        self.server.listen(1)
+        self.port = self.server.getsockname()[1]
+        self.first_byte = None
+        self.bytes = 0
+
+    def run(self):
+        conn, _ = self.server.accept()
+        while True:
+            data = conn.recv(65536)
+            if not data:
+                break
+            if self.first_byte is None:
+                self.first_byte = time.perf_counter()
+            self.bytes += len(data)
+        conn.close()
+        self.server.close()
+
+
+def send_dumps(port, data):
+    """Sender before streaming: whole document as one string and one bytes object"""
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.connect(('127.0.0.1', port))
+    try:
+        sock.sendall(json.dumps(data).encode())
+    finally:
+        sock.close()
+
+
+def child(mode, channels, days, programmes):
+    """Run one send in this process and print results as JSON."""
+    sys.path[0:0] = [os.path.join(BENCHMARKS_DIR, 'kodistubs'), ADDON_DIR]
+    # iptvmanager creates KodiHelper on import
+    sys.argv = ['plugin://plugin.video.discoveryplus/', '1', '']
+    import xbmcaddon
+    xbmcaddon.PROFILE = tempfile.mkdtemp(prefix='dplus-bench-')
+    xbmcaddon.SETTINGS.update(country='gb', cookie='benchmark', numresults='100')
+    from resources.lib import iptvmanager
+
+    epg = make_epg(channels, days, programmes)
+    iptvmanager.helper.d.get_epg = lambda: epg
+    receiver = Receiver()
+    receiver.start()
+
+    # Reset peak RSS so it only covers the send
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+    except (IOError, OSError):
+        pass
+    rss_before = read_status('VmRSS')
+
+    start = time.perf_counter()
+    if mode == 'dumps':
+        send_dumps(receiver.port, dict(version=1, epg=epg))
+    else:
+        iptvmanager.IPTVManager(receiver.port).send_epg()
+    receiver.join()
+    elapsed = time.perf_counter() - start
+
+    rss_peak = read_status('VmHWM')
+    print(json.dumps(dict(
+        mode=mode,
+        total_ms=elapsed * 1000,
+        ttfb_ms=(receiver.first_byte - start) * 1000,
+        bytes=receiver.bytes,
+        rss_before_kib=rss_before,
+        rss_peak_kib=rss_peak,
+        rss_growth_kib=rss_peak - rss_before if rss_before and rss_peak else None
+    )))
+
+
+def run_mode(mode, args):
+    output = subprocess.check_output([
+        sys.executable, os.path.abspath(__file__), '--child', mode, '--channels', str(args.channels),
+        '--days', str(args.days), '--programmes', str(args.programmes)])
+    return json.loads(output.decode('utf-8').strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description='IPTV Manager transfer benchmark')
+    parser.add_argument('--channels', type=int, default=30, help='Channels in EPG')
+    parser.add_argument('--days', type=int, default=8, help='Days of programmes per channel')
+    parser.add_argument('--programmes', type=int, default=40, help='Programmes per channel and day')
+    parser.add_argument('--repeat', type=int, default=3, help='Runs per mode')
+    parser.add_argument('--child', choices=MODES, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        return child(args.child, args.channels, args.days, args.programmes)
+
+    header = '%-8s %10s %10s %10s %14s' % ('mode', 'MiB sent', 'ttfb ms', 'total ms', 'RSS growth MiB')
+    print(header)
+    print('-' * len(header))
+    for mode in MODES:
+        runs = sorted((run_mode(mode, args) for _ in range(max(1, args.repeat))), key=lambda r: r['total_ms'])
+        r = runs[len(runs) // 2]
+        growth = [run['rss_growth_kib'] for run in runs if run['rss_growth_kib'] is not None]
+        print('%-8s %10.1f %10.1f %10.1f %14s' % (
+            mode, r['bytes'] / 1048576.0, r['ttfb_ms'], r['total_ms'],
+            '%.1f' % (max(growth) / 1024.0) if growth else '-'))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,78 @@
+# -*- coding: utf-8 -*-
+"""Minimal xbmc module for running the add-on outside Kodi"""
+
+LOGDEBUG = 0
+LOGINFO = 1
+LOGWARNING = 2
+LOGERROR = 3
+
+# Set by the benchmark runner to end player loops after the stream is resolved
+abort_requested = False
+# Returned by System.GetBool(debug.showloginfo)
+debug_logging = False
+
+log_lines = 0
+log_bytes = 0
+
+
+def log(msg, level=LOGDEBUG):
+    global log_lines, log_bytes
+    # Kodi converts message to UTF-8 before writing it
+    log_lines += 1
+    log_bytes += len(msg.encode('utf-8'))
+
+
+def sleep(milliseconds):
+    pass
+
+
+def getGlobalIdleTime():
+    return 0
+
+
+def getInfoLabel(label):
+    if label == 'System.BuildVersion':
+        return '19.4 (19.4.0) Git:20220303-b07ad56'
+    return ''
+
+
+def getCondVisibility(condition):
+    if condition == 'System.GetBool(debug.showloginfo)':
+        return debug_logging
+    return False
+
+
+def executebuiltin(function, wait=False):
+    pass
+
+
+def executeJSONRPC(jsonrpccommand):
+    return '{"id": 0, "jsonrpc": "2.0", "result": "OK"}'
+
+
+class Monitor(object):
+    def abortRequested(self):
+        return abort_requested
+
+    def waitForAbort(self, timeout=None):
+        return abort_requested
+
+
+class Player(object):
+    def isPlayingVideo(self):
+        return False
+
+    def isPlaying(self):
+        return False
+
+    def getTime(self):
+        return 0.0
+
+    def getTotalTime(self):
+        return 0.0
+
+    def updateInfoTag(self, item):
+        pass
+
+    def stop(self):
+        pass
@@ -0,0 +1,40 @@
+# -*- coding: utf-8 -*-
+"""Minimal xbmcaddon module for running the add-on outside Kodi"""
+import os
+
+ADDON_PATH = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Set by the benchmark runner before creating KodiHelper
+PROFILE = os.path.join(ADDON_PATH, 'benchmarks', '.profile')
+SETTINGS = {}
+# Calls that go through the Kodi Python bridge
+bridge_calls = 0
+
+
+class Addon(object):
+    def __init__(self, id=None):
+        global bridge_calls
+        bridge_calls += 1
+        self.id = id or 'plugin.video.discoveryplus'
+
+    def getAddonInfo(self, key):
+        return {
+            'id': self.id,
+            'name': 'discovery+',
+            'version': '0.0.0',
+            'path': ADDON_PATH,
+            'profile': PROFILE,
+            'icon': os.path.join(ADDON_PATH, 'resources', 'icon.png'),
+            'fanart': os.path.join(ADDON_PATH, 'resources', 'fanart.jpg')
+        }.get(key, '')
+
+    def getSetting(self, setting_id):
+        global bridge_calls
+        bridge_calls += 1
+        return SETTINGS.get(setting_id, '')
+
+    def setSetting(self, setting_id, value):
+        SETTINGS[setting_id] = value
+
+    def getLocalizedString(self, string_id):
+        return 'String %s' % string_id
@@ -0,0 +1,78 @@
+# -*- coding: utf-8 -*-
+"""Minimal xbmcgui module for running the add-on outside Kodi"""
+
+NOTIFICATION_INFO = 'info'
+
+
+def getScreenHeight():
+    return 1080
+
+
+def getScreenWidth():
+    return 1920
+
+
+class ListItem(object):
+    def __init__(self, label='', label2='', path='', offscreen=False):
+        self.label = label
+        self.path = path
+        self.properties = {}
+        self.art = {}
+        self.info = {}
+        self.context_menu = []
+
+    def setProperty(self, key, value):
+        self.properties[key] = value
+
+    def getProperty(self, key):
+        return self.properties.get(key, '')
+
+    def setArt(self, values):
+        self.art.update(values)
+
+    def setInfo(self, type, infoLabels):
+        self.info = infoLabels
+
+    def addContextMenuItems(self, items, replaceItems=False):
+        self.context_menu.extend(items)
+
+    def setPath(self, path):
+        self.path = path
+
+
+class Dialog(object):
+    def ok(self, heading, message):
+        return True
+
+    def yesno(self, heading, message, nolabel='', yeslabel=''):
+        return False
+
+    def select(self, heading, options):
+        return -1
+
+    def input(self, heading, defaultt='', type=0, option=0):
+        return ''
+
+    def numeric(self, type, heading, defaultt=''):
+        return ''
+
+    def notification(self, heading, message, icon=NOTIFICATION_INFO, time=5000, sound=True):
+        pass
+
+
+# Window properties are shared between add-on processes in Kodi
+window_properties = {}
+
+
+class Window(object):
+    def __init__(self, existingWindowId=-1):
+        self.properties = window_properties.setdefault(existingWindowId, {})
+
+    def getProperty(self, key):
+        return self.properties.get(key, '')
+
+    def setProperty(self, key, value):
+        self.properties[key] = value
+
+    def clearProperty(self, key):
+        self.properties.pop(key, None)
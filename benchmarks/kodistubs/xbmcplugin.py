@@ -0,0 +1,45 @@
+# -*- coding: utf-8 -*-
+"""Minimal xbmcplugin module for running the add-on outside Kodi"""
+
+SORT_METHOD_NONE = 0
+SORT_METHOD_LABEL = 1
+SORT_METHOD_EPISODE = 24
+SORT_METHOD_VIDEO_TITLE = 25
+SORT_METHOD_UNSORTED = 40
+
+# Counters read by the benchmark runner
+directory_items = 0
+resolved = 0
+
+
+def addDirectoryItem(handle, url, listitem, isFolder=False, totalItems=0):
+    global directory_items
+    directory_items += 1
+    return True
+
+
+def addDirectoryItems(handle, items, totalItems=0):
+    global directory_items
+    directory_items += len(items)
+    return True
+
+
+def endOfDirectory(handle, succeeded=True, updateListing=False, cacheToDisc=True):
+    pass
+
+
+def setContent(handle, content):
+    pass
+
+
+def setPluginCategory(handle, category):
+    pass
+
+
+def addSortMethod(handle, sortMethod, label2Mask=''):
+    pass
+
+
+def setResolvedUrl(handle, succeeded, listitem):
+    global resolved
+    resolved += 1
@@ -0,0 +1,26 @@
+# -*- coding: utf-8 -*-
+"""Minimal xbmcvfs module for running the add-on outside Kodi"""
+import os
+
+
+def translatePath(path):
+    return path
+
+
+def exists(path):
+    return os.path.exists(path)
+
+
+def mkdir(path):
+    os.makedirs(path)
+    return True
+
+
+def mkdirs(path):
+    os.makedirs(path)
+    return True
+
+
+def delete(path):
+    os.remove(path)
+    return True
@@ -0,0 +1,98 @@
+# -*- coding: utf-8 -*-
+"""
+Timestamp parsing benchmark
+
+Runs the date checks listings do for every video (earliestPlayableStart and
+free availability windows) on a 100 video page. The parser before
+resources/lib/timestamps.py (time.strptime, calendar.timegm and
+datetime.fromtimestamp, datetime.now() in every comparison) is compared with
+the memoized parser and a per-listing Now snapshot.
+
+    python benchmarks/parse_dates.py
+    python benchmarks/parse_dates.py --pages 500
+"""
+import os
+import sys
+import time
+import calendar
+import argparse
+from datetime import datetime, timedelta
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+ADDON_DIR = os.path.dirname(BENCHMARKS_DIR)
+sys.path[0:0] = [os.path.join(BENCHMARKS_DIR, 'kodistubs'), BENCHMARKS_DIR, ADDON_DIR]
+
+from fixtures import Included, SyntheticFixtures
+from resources.lib import timestamps
+
+
+def strptime_parse(date):
+    """Dplay.parse_datetime before timestamps module"""
+    datetime_obj = datetime(*(time.strptime(date, '%Y-%m-%dT%H:%M:%SZ')[0:6]))
+    timestamp = calendar.timegm(datetime_obj.timetuple())
+    local_dt = datetime.fromtimestamp(timestamp)
+    assert datetime_obj.resolution >= timedelta(microseconds=1)
+    return local_dt.replace(microsecond=datetime_obj.microsecond)
+
+
+def check_before(videos):
+    for video in videos:
+        attributes = video['attributes']
+        if attributes.get('earliestPlayableStart'):
+            if strptime_parse(attributes['earliestPlayableStart']) > datetime.now():
+                strptime_parse(attributes['earliestPlayableStart']).strftime('%d.%m.%Y %H:%M')
+        if len(attributes['packages']) > 1:
+            for window in attributes['availabilityWindows']:
+                if window['package'] in ('Free', 'Registered') and window.get('playableEnd'):
+                    strptime_parse(window['playableStart']) < datetime.now() < strptime_parse(window['playableEnd'])
+
+
+def check_after(videos):
+    now = timestamps.Now()
+    for video in videos:
+        attributes = video['attributes']
+        if attributes.get('earliestPlayableStart'):
+            if now.is_future(attributes['earliestPlayableStart']):
+                timestamps.parse_local(attributes['earliestPlayableStart']).strftime('%d.%m.%Y %H:%M')
+        if len(attributes['packages']) > 1:
+            for window in attributes['availabilityWindows']:
+                if window['package'] in ('Free', 'Registered') and window.get('playableEnd'):
+                    timestamps.parse_utc(window['playableStart']) < now.epoch < timestamps.parse_utc(
+                        window['playableEnd'])
+
+
+def clear_memo():
+    for func in (timestamps.parse_utc, timestamps.parse_local):
+        if hasattr(func, 'cache_clear'):
+            func.cache_clear()
+
+
+def measure(func, videos, pages, cold=False):
+    """Return microseconds per page."""
+    elapsed = 0
+    for _ in range(pages):
+        if cold:
+            clear_memo()
+        start = time.perf_counter()
+        func(videos)
+        elapsed += time.perf_counter() - start
+    return elapsed / pages * 1000000
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Timestamp parsing benchmark')
+    parser.add_argument('--pages', type=int, default=200, help='Pages to check')
+    args = parser.parse_args()
+
+    fixtures = SyntheticFixtures('gb')
+    included = Included()
+    videos = [fixtures.video(included, n) for n in range(100)]
+
+    print('%-24s %12s' % ('parser', 'us/page'))
+    print('%-24s %12.1f' % ('strptime', measure(check_before, videos, args.pages)))
+    print('%-24s %12.1f' % ('timestamps, empty memo', measure(check_after, videos, args.pages, cold=True)))
+    print('%-24s %12.1f' % ('timestamps', measure(check_after, videos, args.pages)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,97 @@
+# -*- coding: utf-8 -*-
+"""
+Transport adapter for running the add-on against fixtures
+"""
+import time
+import threading
+
+import requests
+
+from requests.adapters import BaseAdapter
+from requests.models import Response
+from requests.structures import CaseInsensitiveDict
+
+
+class ReplayAdapter(BaseAdapter):
+    """Answers requests from fixtures and counts what the add-on downloaded"""
+
+    def __init__(self, fixtures, latency=0):
+        super(ReplayAdapter, self).__init__()
+        self.fixtures = fixtures
+        # Simulated round trip time in seconds
+        self.latency = latency
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.requests = 0
+            self.bytes = 0
+            self.endpoints = {}
+
+    def send(self, request, stream=False, timeout=None, verify=True, cert=None, proxies=None):
+        if self.latency:
+            time.sleep(self.latency)
+        status, body = self.fixtures.response(request.method, request.url)
+
+        with self.lock:
+            self.requests += 1
+            self.bytes += len(body)
+            endpoint = '%s %s' % (request.method, request.path_url.split('?')[0])
+            self.endpoints[endpoint] = self.endpoints.get(endpoint, 0) + 1
+
+        response = Response()
+        response.status_code = status
+        response.reason = 'OK' if status == 200 else 'Not Found'
+        response.headers = CaseInsensitiveDict({'Content-Type': 'application/json',
+                                                'Content-Length': str(len(body))})
+        response._content = body
+        response.url = request.url
+        response.request = request
+        response.connection = self
+        response.encoding = 'utf-8'
+        return response
+
+    def close(self):
+        pass
+
+
+
+class ConnectionAdapter(BaseAdapter):
+    """Per session adapter that adds simulated connection setup (TCP and TLS) time to first request"""
+
+    def __init__(self, adapter, connect_latency=0):
+        super(ConnectionAdapter, self).__init__()
+        self.adapter = adapter
+        self.connect_latency = connect_latency
+        self.connected = False
+
+    def send(self, request, **kwargs):
+        if not self.connected:
+            self.connected = True
+            if self.connect_latency:
+                time.sleep(self.connect_latency)
+        return self.adapter.send(request, **kwargs)
+
+    def close(self):
+        self.connected = False
+
+
+class ReplaySession(requests.Session):
+    """Session that never goes to network"""
+
+    adapter = None
+    connect_latency = 0
+
+    def __init__(self):
+        super(ReplaySession, self).__init__()
+        adapter = ConnectionAdapter(self.adapter, self.connect_latency)
+        self.mount('https://', adapter)
+        self.mount('http://', adapter)
+
+
+def install(adapter, connect_latency=0):
+    """Route all sessions created after this call through adapter."""
+    ReplaySession.adapter = adapter
+    ReplaySession.connect_latency = connect_latency
+    requests.Session = ReplaySession
@@ -0,0 +1,304 @@
+# -*- coding: utf-8 -*-
+"""
+Offline benchmarks for plugin.video.discoveryplus
+
+Runs add-on listings, EPG and playback resolution against Kodi stub
+modules and generated discovery+ API responses. Every scenario starts
+like a Kodi plugin invocation: a new KodiHelper and Dplay are created
+and the scenario function is called once.
+
+    python benchmarks/run.py
+    python benchmarks/run.py --scenario get_epg --scenario get_epg_serial --latency 40
+    python benchmarks/run.py --warm --json results.json
+    python benchmarks/run.py --scenario make_request_x20 --debug-logging
+    python benchmarks/run.py --backend --latency 40 --connect-latency 150
+"""
+import os
+import sys
+import gc
+import json
+import time
+import shutil
+import argparse
+import tempfile
+import tracemalloc
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+ADDON_DIR = os.path.dirname(BENCHMARKS_DIR)
+sys.path[0:0] = [os.path.join(BENCHMARKS_DIR, 'kodistubs'), BENCHMARKS_DIR, ADDON_DIR]
+# addon.py reads plugin url and handle on import
+ARGV = sys.argv[1:]
+sys.argv = ['plugin://plugin.video.discoveryplus/', '1', '']
+
+import xbmc
+import xbmcaddon
+import xbmcplugin
+
+from fixtures import LOCALES, SyntheticFixtures
+from replay import ReplayAdapter, install
+
+SETTINGS = {
+    'numresults': '100',
+    'cookiestxt': 'false',
+    'cookiestxt_file': '',
+    'cookie': 'benchmark',
+    'us_uhd': 'false',
+    'seasonsonly': 'false',
+    'flattentvshows': 'false',
+    'sync_playback': 'true',
+    'use_isa': 'true',
+    'epg_workers': '4'
+}
+
+
+class CountingJson(object):
+    """json module replacement that counts bytes given to loads()"""
+
+    def __init__(self):
+        self.bytes = 0
+
+    def loads(self, s, **kwargs):
+        self.bytes += len(s)
+        return json.loads(s, **kwargs)
+
+    def __getattr__(self, name):
+        return getattr(json, name)
+
+
+class Scenario(object):
+    def __init__(self, name, locales, func):
+        self.name = name
+        self.locales = locales
+        self.func = func
+
+
+def player(helper=None):
+    from resources.lib.kodihelper import DplusPlayer
+    return DplusPlayer(helper)
+
+
+def serial_epg(helper):
+    """get_epg with one worker, like the EPG was fetched before days were fetched concurrently"""
+    d = helper.d
+    d.epg_workers = 1
+    return d.get_epg()
+
+
+def unshared_player():
+    from resources.lib import clients
+    clients.clear()
+    return player()
+
+
+def scenarios(addon):
+    helper = lambda: addon.helper
+    return [
+        Scenario('list_pages', LOCALES, lambda: addon.list_pages()),
+        Scenario('list_page_us', ('gb', 'us', 'fi'), lambda: addon.list_page_us('/home')),
+        Scenario('list_collection', LOCALES, lambda: addon.list_collection('benchmark-grid', 1)),
+        Scenario('list_collection_items', LOCALES,
+                 lambda: addon.list_collection_items('show-page-episodes', '/show/show-3')),
+        Scenario('get_epg', ('gb', 'fi'), lambda: helper().d.get_epg()),
+        Scenario('get_epg_serial', ('gb', 'fi'), lambda: serial_epg(helper())),
+        Scenario('get_channels_us', ('us',), lambda: helper().d.get_channels_us()),
+        Scenario('play_item', LOCALES, lambda: helper().play_item('50003', 'EPISODE')),
+        # Player setup in play_item, with helper's client and with a client of its own like before
+        Scenario('player_setup', ('gb',), lambda: player(helper())),
+        Scenario('player_setup_unshared', ('gb',), lambda: unshared_player()),
+        # Uncached requests of a large collection, shows per request overhead like logging
+        Scenario('make_request_x20', ('gb',), lambda: [
+            helper().d.make_request('%s/cms/collections/benchmark-grid' % helper().d.api_url, 'get',
+                                    headers=helper().d.site_headers) for _ in range(20)]),
+    ]
+
+
+class Runner(object):
+    def __init__(self, latency=0, connect_latency=0, warm=False, debug_logging=False, dump_responses=False,
+                 backend=False):
+        self.latency = latency
+        self.warm = warm
+        xbmc.debug_logging = debug_logging
+        self.fixtures = {}
+        self.profiles = {}
+        self.adapter = ReplayAdapter(None, latency=latency / 1000.0)
+        install(self.adapter, connect_latency=connect_latency / 1000.0)
+        self.backend = None
+        self.use_backend = backend
+
+        xbmcaddon.PROFILE = tempfile.mkdtemp(prefix='dplus-bench-')
+        xbmcaddon.SETTINGS.update(SETTINGS, country='gb', dump_responses='true' if dump_responses else 'false')
+        import addon
+        self.addon = addon
+
+        from resources.lib import dplay, kodihelper
+        self.json = CountingJson()
+        dplay.json = self.json
+        kodihelper.json = self.json
+
+    def close(self):
+        if self.backend:
+            self.backend.stop()
+        shutil.rmtree(xbmcaddon.PROFILE, ignore_errors=True)
+        for profile in self.profiles.values():
+            shutil.rmtree(profile, ignore_errors=True)
+
+    def profile(self, locale):
+        """Return add-on profile folder. Cold runs get an empty one every time."""
+        if not self.warm:
+            return tempfile.mkdtemp(prefix='dplus-bench-')
+        if locale not in self.profiles:
+            self.profiles[locale] = tempfile.mkdtemp(prefix='dplus-bench-')
+        return self.profiles[locale]
+
+    def invoke(self, scenario, locale):
+        """Run scenario once like a new plugin invocation. Return wall time in seconds."""
+        from resources.lib import clients
+        from resources.lib.kodihelper import KodiHelper
+
+        if locale not in self.fixtures:
+            self.fixtures[locale] = SyntheticFixtures(locale)
+        self.adapter.fixtures = self.fixtures[locale]
+        self.adapter.reset()
+        # New process has no clients
+        clients.clear()
+        self.json.bytes = 0
+        xbmc.log_bytes = 0
+        xbmcplugin.directory_items = 0
+        xbmcaddon.bridge_calls = 0
+        # Player loop in play_item ends when Kodi is exiting
+        xbmc.abort_requested = scenario.name == 'play_item'
+
+        profile = self.profile(locale)
+        xbmcaddon.PROFILE = profile
+        xbmcaddon.SETTINGS.update(country=locale)
+        if self.use_backend:
+            self.start_backend()
+        gc.collect()
+
+        start = time.perf_counter()
+        self.addon.helper = KodiHelper(sys.argv[0], int(sys.argv[1]))
+        scenario.func()
+        elapsed = time.perf_counter() - start
+
+        if not self.warm:
+            shutil.rmtree(profile, ignore_errors=True)
+        return elapsed
+
+    def start_backend(self):
+        """Run service backend in this process like add-on service does in Kodi."""
+        from resources.lib.backend import Backend
+        from resources.lib.kodihelper import KodiHelper
+
+        if self.backend is None:
+            self.backend = Backend(lambda: KodiHelper(backend=False))
+            self.backend.start()
+        # Settings (profile, country) changed
+        self.backend.reload()
+        # Service has been running before plugin is opened
+        self.backend.dplay.tokens.ensure()
+        self.adapter.reset()
+
+    def run(self, scenario, locale, repeat):
+        if self.warm:
+            # Fill response cache and token state before measuring
+            self.invoke(scenario, locale)
+
+        times = []
+        for _ in range(repeat):
+            times.append(self.invoke(scenario, locale))
+        requests_made = self.adapter.requests
+        bytes_downloaded = self.adapter.bytes
+        bytes_parsed = self.json.bytes
+        endpoints = dict(self.adapter.endpoints)
+        items = xbmcplugin.directory_items
+        bridge_calls = xbmcaddon.bridge_calls
+        logged = xbmc.log_bytes
+
+        tracemalloc.start()
+        self.invoke(scenario, locale)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+        times.sort()
+        return dict(
+            scenario=scenario.name,
+            locale=locale,
+            mode='warm' if self.warm else 'cold',
+            median_ms=times[len(times) // 2] * 1000,
+            min_ms=times[0] * 1000,
+            requests=requests_made,
+            downloaded=bytes_downloaded,
+            parsed=bytes_parsed,
+            items=items,
+            bridge_calls=bridge_calls,
+            logged=logged,
+            peak_kib=peak / 1024.0,
+            endpoints=endpoints
+        )
+
+
+def print_table(results, verbose=False):
+    header = '%-22s %-6s %-5s %10s %10s %8s %10s %10s %7s %7s %10s %10s' % (
+        'scenario', 'locale', 'mode', 'median ms', 'min ms', 'requests', 'down KiB', 'parsed KiB', 'items',
+        'bridge', 'log KiB', 'peak KiB')
+    print(header)
+    print('-' * len(header))
+    for r in results:
+        print('%-22s %-6s %-5s %10.1f %10.1f %8d %10.1f %10.1f %7d %7d %10.1f %10.1f' % (
+            r['scenario'], r['locale'], r['mode'], r['median_ms'], r['min_ms'], r['requests'],
+            r['downloaded'] / 1024.0, r['parsed'] / 1024.0, r['items'], r['bridge_calls'], r['logged'] / 1024.0,
+            r['peak_kib']))
+        if verbose:
+            for endpoint, count in sorted(r['endpoints'].items()):
+                print('    %4d  %s' % (count, endpoint))
+
+
+def print_epg_speedup(results):
+    """Compare concurrent get_epg with get_epg_serial of same locale."""
+    serial = dict((r['locale'], r) for r in results if r['scenario'] == 'get_epg_serial')
+    for r in results:
+        if r['scenario'] == 'get_epg' and r['locale'] in serial:
+            print('get_epg %s: %d workers %.1f ms, 1 worker %.1f ms, speedup %.1fx' % (
+                r['locale'], int(SETTINGS['epg_workers']), r['median_ms'], serial[r['locale']]['median_ms'],
+                serial[r['locale']]['median_ms'] / r['median_ms']))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Offline benchmarks for plugin.video.discoveryplus')
+    parser.add_argument('--scenario', action='append', help='Scenario to run. Can be repeated. Default: all')
+    parser.add_argument('--locale', action='append', choices=LOCALES, help='Locale to run. Default: all')
+    parser.add_argument('--repeat', type=int, default=5, help='Measured runs per scenario')
+    parser.add_argument('--latency', type=float, default=0, help='Simulated round trip time per request in ms')
+    parser.add_argument('--connect-latency', type=float, default=0,
+                        help='Simulated TCP and TLS setup time of new connection in ms')
+    parser.add_argument('--backend', action='store_true', help='Send requests through add-on service backend')
+    parser.add_argument('--warm', action='store_true', help='Keep add-on profile (cache, token) between runs')
+    parser.add_argument('--debug-logging', action='store_true', help='Run with Kodi debug logging enabled')
+    parser.add_argument('--dump-responses', action='store_true', help='Run with response dump file enabled')
+    parser.add_argument('--json', help='Write results to file')
+    parser.add_argument('--verbose', action='store_true', help='Show requests per endpoint')
+    args = parser.parse_args(ARGV if argv is None else argv)
+
+    runner = Runner(latency=args.latency, connect_latency=args.connect_latency, warm=args.warm,
+                    debug_logging=args.debug_logging, dump_responses=args.dump_responses, backend=args.backend)
+    results = []
+    try:
+        for scenario in scenarios(runner.addon):
+            if args.scenario and scenario.name not in args.scenario:
+                continue
+            for locale in scenario.locales:
+                if args.locale and locale not in args.locale:
+                    continue
+                results.append(runner.run(scenario, locale, max(1, args.repeat)))
+    finally:
+        runner.close()
+
+    print_table(results, verbose=args.verbose)
+    print_epg_speedup(results)
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,98 @@
+# -*- coding: utf-8 -*-
+"""
+Transport policy benchmark
+
+Sends requests through TransportPolicy to a simulated API with a long
+latency tail: most responses take 20-40 ms, a few stall for 600 ms and a
+few fail with 503. Requests are sent without retries (like before the
+policy), with jittered retries and with retries and hedged GETs. Reports
+p50/p95/p99 latency, requests sent to the API and requests that still
+failed.
+
+    python benchmarks/transport.py
+    python benchmarks/transport.py --requests 500 --stall 0.05 --errors 0.03
+"""
+import os
+import sys
+import time
+import random
+import argparse
+import threading
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+ADDON_DIR = os.path.dirname(BENCHMARKS_DIR)
+sys.path[0:0] = [os.path.join(BENCHMARKS_DIR, 'kodistubs'), BENCHMARKS_DIR, ADDON_DIR]
+
+from resources.lib.transport import TransportPolicy
+
+URL = 'https://eu1-prod-direct.discoveryplus.com/cms/collections/123456'
+
+
+class Response(object):
+    def __init__(self, status_code):
+        self.status_code = status_code
+
+
+class SimulatedApi(object):
+    def __init__(self, stall, errors, stall_time, seed):
+        self.stall = stall
+        self.errors = errors
+        self.stall_time = stall_time
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.sent = 0
+
+    def send_once(self, timeout):
+        with self.lock:
+            self.sent += 1
+            roll = self.random.random()
+            latency = self.random.uniform(0.02, 0.04)
+        if roll < self.stall:
+            latency = self.stall_time
+        time.sleep(latency)
+        return Response(503 if roll > 1 - self.errors else 200)
+
+
+def measure(policy, args):
+    api = SimulatedApi(args.stall, args.errors, args.stall_time, args.seed)
+    failed = 0
+    latencies = []
+    for _ in range(args.requests):
+        start = time.perf_counter()
+        if policy:
+            response = policy.send(URL, 'get', api.send_once)
+        else:
+            response = api.send_once(None)
+        latencies.append(time.perf_counter() - start)
+        if response.status_code != 200:
+            failed += 1
+    latencies.sort()
+
+    def percentile(percent):
+        return latencies[max(0, int(round(percent / 100.0 * len(latencies))) - 1)] * 1000
+
+    return percentile(50), percentile(95), percentile(99), api.sent, failed
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Transport policy benchmark')
+    parser.add_argument('--requests', type=int, default=200, help='GET requests to send')
+    parser.add_argument('--stall', type=float, default=0.04, help='Share of responses that stall')
+    parser.add_argument('--stall-time', type=float, default=0.6, help='Stalled response time in seconds')
+    parser.add_argument('--errors', type=float, default=0.03, help='Share of 503 responses')
+    parser.add_argument('--hedge-after', type=float, default=0.1, help='Hedging threshold in seconds')
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    modes = [
+        ('no policy', None),
+        ('retries', TransportPolicy(backoff=0.05)),
+        ('retries and hedging', TransportPolicy(backoff=0.05, hedge_after=args.hedge_after))
+    ]
+    print('%-22s %8s %8s %8s %8s %8s' % ('mode', 'p50 ms', 'p95 ms', 'p99 ms', 'sent', 'failed'))
+    for name, policy in modes:
+        print('%-22s %8.1f %8.1f %8.1f %8d %8d' % ((name,) + measure(policy, args)))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,53 @@
+# -*- coding: utf-8 -*-
+"""
+Playability and subscription status of videos in a listing
+"""
+from collections import namedtuple
+
+from .timestamps import Now, parse_local
+
+# playable is True if video can be played now. playable_from is local datetime of earliestPlayableStart for upcoming videos.
+Availability = namedtuple('Availability', ('playable', 'upcoming', 'subscription_needed', 'playable_from'))
+
+
+class AvailabilityEvaluator(object):
+    """Evaluates videos of one listing against user packages and one moment in time"""
+
+    def __init__(self, entitlements, now=None):
+        # Packages are read on first video so listings without videos don't fetch them
+        self.entitlements = entitlements
+        self.now = now or Now()
+        self._results = {}
+
+    @staticmethod
+    def signature(video):
+        """Return values the result depends on. Videos of one listing often share them, e.g. episodes of a season."""
+        attributes = video['attributes']
+        return attributes.get('earliestPlayableStart'), tuple(attributes.get('packages') or ())
+
+    def evaluate(self, videos):
+        """Evaluate all videos of the listing against the same moment. Return {video id: Availability}."""
+        return dict((video['id'], self.get(video)) for video in videos)
+
+    def get(self, video):
+        key = self.signature(video)
+        result = self._results.get(key)
+        if result is None:
+            result = self._results[key] = self._evaluate(key)
+        return result
+
+    def _evaluate(self, key):
+        earliest_playable_start, packages = key
+
+        upcoming = bool(earliest_playable_start) and self.now.is_future(earliest_playable_start)
+        playable_from = parse_local(earliest_playable_start) if upcoming else None
+
+        # User needs a subscription if they have none of the packages of the video
+        subscription_needed = not self.entitlements.has_any(packages)
+
+        return Availability(
+            playable=not upcoming and not subscription_needed,
+            upcoming=upcoming,
+            subscription_needed=subscription_needed,
+            playable_from=playable_from
+        )
@@ -0,0 +1,234 @@
+# -*- coding: utf-8 -*-
+"""
+Backend that runs in the add-on service and sends API requests for plugin invocations
+
+The service keeps one Dplay with a warm connection pool, cookies and token. Plugin
+invocations send their HTTP requests to it over a local socket instead of opening
+new TLS connections. If the backend is not running, plugin does requests itself.
+"""
+import json
+import socket
+import threading
+import binascii
+import os
+
+import xbmcgui
+
+from . import clients
+from .transport import TransportPolicy, get_requests
+
+try:  # Python 3
+    import socketserver
+except ImportError:  # Python 2
+    import SocketServer as socketserver
+
+# Home window property with address of running backend
+BACKEND_PROPERTY = 'plugin.video.discoveryplus.backend'
+
+
+class BackendError(Exception):
+    """Backend is not available or failed before sending the request. Request can be sent in-process."""
+
+
+class UpstreamError(Exception):
+    """Request was given to the backend and failed. It may have reached the API, so it is not sent again."""
+
+    def __init__(self, message, kind=None):
+        Exception.__init__(self, message)
+        # Name of requests exception class, e.g. ReadTimeout
+        self.kind = kind
+
+
+def get_backend_address():
+    """Return (port, key) of running backend or None."""
+    value = xbmcgui.Window(10000).getProperty(BACKEND_PROPERTY)
+    if not value:
+        return None
+    try:
+        address = json.loads(value)
+        return address['port'], address['key']
+    except (ValueError, KeyError):
+        return None
+
+
+class SessionTransport(object):
+    """Sends requests with requests session of this process"""
+
+    def __init__(self, http_session, policy=None):
+        self.http_session = http_session
+        self.policy = policy or TransportPolicy()
+
+    def send(self, url, method, params=None, payload=None, headers=None):
+        exceptions = get_requests().exceptions
+
+        def send_once(timeout):
+            if method == 'get':
+                return self.http_session.get(url, params=params, headers=headers, timeout=timeout)
+            elif method == 'put':
+                return self.http_session.put(url, params=params, data=payload, headers=headers, timeout=timeout)
+            elif method == 'delete':
+                return self.http_session.delete(url, params=params, data=payload, headers=headers, timeout=timeout)
+            elif method == 'patch':
+                return self.http_session.patch(url, params=params, data=payload, headers=headers, timeout=timeout)
+            else:  # post
+                return self.http_session.post(url, params=params, data=payload, headers=headers, timeout=timeout)
+
+        return self.policy.send(url, method, send_once,
+                                retry_exceptions=(exceptions.ConnectionError, exceptions.Timeout))
+
+
+class BackendResponse(object):
+    """Response received from backend. Has same attributes as requests response that add-on uses."""
+
+    def __init__(self, status_code, headers, content, url):
+        self.status_code = status_code
+        self.headers = headers
+        self.content = content
+        self.url = url
+
+    @property
+    def text(self):
+        return self.content.decode('utf-8', 'replace')
+
+
+class BackendTransport(object):
+    """Sends requests through backend in add-on service
+
+    Backend sends the request with its TransportPolicy, so the socket waits
+    as long as the policy's timeouts and retries can take and some margin.
+    """
+
+    def __init__(self, port, key, policy=None, margin=10):
+        self.port = port
+        self.key = key
+        self.policy = policy or TransportPolicy()
+        self.margin = margin
+
+    def send(self, url, method, params=None, payload=None, headers=None):
+        request = dict(key=self.key, url=url, method=method, params=params, payload=payload, headers=headers)
+        timeout = self.policy.get_max_time(url, method) + self.margin
+        try:
+            sock = socket.create_connection(('127.0.0.1', self.port), timeout=timeout)
+        except (socket.error, socket.timeout) as error:
+            raise BackendError(error)
+        try:
+            try:
+                # Backend doesn't send a request it hasn't read as a whole
+                sock.sendall(json.dumps(request).encode('utf-8') + b'\n')
+            except (socket.error, socket.timeout) as error:
+                raise BackendError(error)
+            stream = sock.makefile('rb')
+            try:
+                header = json.loads(stream.readline().decode('utf-8'))
+                if 'upstream_error' not in header and 'error' not in header:
+                    content = stream.read(header['length'])
+                    if len(content) != header['length']:
+                        raise UpstreamError('Backend closed connection', 'ConnectionError')
+            except socket.timeout as error:
+                raise UpstreamError(error, 'ReadTimeout')
+            except (socket.error, ValueError) as error:
+                raise UpstreamError(error, 'ConnectionError')
+        finally:
+            sock.close()
+        if 'error' in header:
+            raise BackendError(header['error'])
+        if 'upstream_error' in header:
+            raise UpstreamError(header['upstream_error'], header.get('kind'))
+        return BackendResponse(header['status'], header['headers'], content, header['url'])
+
+
+class BackendRequestHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        try:
+            request = json.loads(self.rfile.readline().decode('utf-8'))
+            url, method = request['url'], request['method']
+        except (ValueError, KeyError, TypeError):
+            self.write_header(dict(error='Invalid request'))
+            return
+        if request.get('key') != self.server.key:
+            self.write_header(dict(error='Invalid key'))
+            return
+
+        try:
+            req = self.server.backend.send_request(url, method, params=request.get('params'),
+                                                   payload=request.get('payload'), headers=request.get('headers'))
+        except Exception as error:  # Plugin raises it without sending the request again
+            self.write_header(dict(upstream_error=str(error), kind=type(error).__name__))
+            return
+
+        self.write_header(dict(
+            status=req.status_code,
+            url=req.url,
+            length=len(req.content),
+            # Headers used by response cache
+            headers=dict((k, v) for k, v in req.headers.items() if k in ('ETag', 'Last-Modified'))
+        ))
+        self.wfile.write(req.content)
+
+    def write_header(self, header):
+        self.wfile.write(json.dumps(header).encode('utf-8') + b'\n')
+
+
+class BackendServer(socketserver.ThreadingMixIn, socketserver.TCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+
+class Backend(object):
+    """Hosts persistent Dplay for plugin invocations"""
+
+    def __init__(self, helper_factory):
+        self.helper_factory = helper_factory
+        self.helper = None
+        self.lock = threading.Lock()
+        self.server = None
+        self.thread = None
+
+    def get_helper(self):
+        with self.lock:
+            if self.helper is None:
+                self.helper = self.helper_factory()
+            return self.helper
+
+    @property
+    def dplay(self):
+        return self.get_helper().d
+
+    def reload(self):
+        """Create new Dplay on next request. Used when add-on settings change."""
+        with self.lock:
+            if self.helper:
+                self.helper.close()
+            self.helper = None
+            clients.clear()
+
+    def send_request(self, url, method, params=None, payload=None, headers=None):
+        dplay = self.dplay
+        # Plugin may have reset settings or got new token in-process, don't send cookies it has removed
+        dplay.tokens.sync()
+        req = dplay.send_request(url, method, params=params, payload=payload, headers=headers)
+        # Plugin invocations and in-process fallback read cookies from file
+        dplay.cookie_jar.flush()
+        return req
+
+    def start(self):
+        self.server = BackendServer(('127.0.0.1', 0), BackendRequestHandler)
+        self.server.backend = self
+        self.server.key = binascii.hexlify(os.urandom(16)).decode('ascii')
+        self.thread = threading.Thread(target=self.server.serve_forever)
+        self.thread.daemon = True
+        self.thread.start()
+
+        address = dict(port=self.server.server_address[1], key=self.server.key)
+        xbmcgui.Window(10000).setProperty(BACKEND_PROPERTY, json.dumps(address))
+
+    def stop(self):
+        xbmcgui.Window(10000).clearProperty(BACKEND_PROPERTY)
+        if self.server:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
+        with self.lock:
+            if self.helper:
+                self.helper.close()
+            self.helper = None
@@ -0,0 +1,134 @@
+# -*- coding: utf-8 -*-
+"""
+Persistent response cache for discovery+ API reads
+"""
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+
+# Seconds a cached response is served without asking the API
+CACHE_TTLS = {
+    'menu': 3600,
+    'page': 300,
+    'collection': 300,
+    'favorites': 300
+}
+
+
+class CacheEntry(object):
+    def __init__(self, body, etag, last_modified, expires):
+        self.body = body
+        self.etag = etag
+        self.last_modified = last_modified
+        self.expires = expires
+
+    @property
+    def fresh(self):
+        return self.expires > time.time()
+
+
+class ResponseCache(object):
+    """Size-bounded LRU cache stored in SQLite in the add-on profile folder"""
+
+    def __init__(self, cache_folder, max_entries=500, max_bytes=20 * 1024 * 1024):
+        self.db_path = os.path.join(cache_folder, 'cache.db')
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.revalidated = 0
+        self._lock = threading.Lock()
+        self._conn = None
+
+    def _connect(self):
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.db_path, timeout=5, isolation_level=None, check_same_thread=False)
+            self._conn.execute('CREATE TABLE IF NOT EXISTS responses ('
+                               'key TEXT PRIMARY KEY, body BLOB, etag TEXT, last_modified TEXT, '
+                               'expires REAL, accessed REAL, size INTEGER, endpoint TEXT)')
+            try:
+                # Databases of older versions don't have endpoint column
+                self._conn.execute('ALTER TABLE responses ADD COLUMN endpoint TEXT')
+            except sqlite3.OperationalError:
+                pass
+            self._conn.execute('CREATE TABLE IF NOT EXISTS vals (key TEXT PRIMARY KEY, value TEXT, expires REAL)')
+        return self._conn
+
+    def _execute(self, sql, args=()):
+        with self._lock:
+            try:
+                return self._connect().execute(sql, args).fetchall()
+            except sqlite3.Error:
+                # Cache is only an optimization, never fail a request because of it
+                return []
+
+    @staticmethod
+    def make_key(*parts):
+        return hashlib.sha1(json.dumps(parts, sort_keys=True).encode('utf-8')).hexdigest()
+
+    def get(self, key):
+        """Return CacheEntry (fresh or stale) or None."""
+        rows = self._execute('SELECT body, etag, last_modified, expires FROM responses WHERE key = ?', (key,))
+        if not rows:
+            return None
+        self._execute('UPDATE responses SET accessed = ? WHERE key = ?', (time.time(), key))
+        body, etag, last_modified, expires = rows[0]
+        return CacheEntry(bytes(body), etag, last_modified, expires)
+
+    def set(self, key, body, ttl, etag=None, last_modified=None, endpoint=None):
+        now = time.time()
+        self._execute('INSERT OR REPLACE INTO responses (key, body, etag, last_modified, expires, accessed, size, '
+                      'endpoint) VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                      (key, sqlite3.Binary(body), etag, last_modified, now + ttl, now, len(body), endpoint))
+        self._evict()
+
+    def touch(self, key, ttl):
+        """Mark a revalidated entry fresh again."""
+        now = time.time()
+        self._execute('UPDATE responses SET expires = ?, accessed = ? WHERE key = ?', (now + ttl, now, key))
+
+    def get_value(self, key):
+        """Return a fresh JSON value stored with set_value or None."""
+        rows = self._execute('SELECT value FROM vals WHERE key = ? AND expires > ?', (key, time.time()))
+        if not rows:
+            return None
+        return json.loads(rows[0][0])
+
+    def set_value(self, key, value, ttl):
+        self._execute('INSERT OR REPLACE INTO vals VALUES (?, ?, ?)', (key, json.dumps(value), time.time() + ttl))
+
+    def delete_value(self, key):
+        self._execute('DELETE FROM vals WHERE key = ?', (key,))
+
+    def delete(self, key):
+        self._execute('DELETE FROM responses WHERE key = ?', (key,))
+
+    def clear(self, *endpoints):
+        """Remove cached responses of endpoints, or all cached responses if none are given. Stored values are kept."""
+        if not endpoints:
+            self._execute('DELETE FROM responses')
+            return
+        # Entries without endpoint are from older versions and may be of any endpoint
+        self._execute('DELETE FROM responses WHERE endpoint IS NULL OR endpoint IN (%s)' %
+                      ', '.join('?' * len(endpoints)), endpoints)
+
+    def _evict(self):
+        rows = self._execute('SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses')
+        if not rows:
+            return
+        count, total = rows[0]
+        if count <= self.max_entries and total <= self.max_bytes:
+            return
+        # Drop least recently used entries until both limits are met
+        for key, size in self._execute('SELECT key, size FROM responses ORDER BY accessed ASC'):
+            if count <= self.max_entries and total <= self.max_bytes:
+                break
+            self.delete(key)
+            count -= 1
+            total -= size
+
+    def stats(self):
+        return dict(hits=self.hits, misses=self.misses, revalidated=self.revalidated)
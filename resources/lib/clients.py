@@ -0,0 +1,27 @@
+# -*- coding: utf-8 -*-
+"""
+Dplay clients shared inside one add-on process
+
+KodiHelper instances created with the same settings use the same Dplay, so
+the player and the helper that started playback share connection pool,
+cookies and token state.
+"""
+import threading
+
+_clients = {}
+_lock = threading.Lock()
+
+
+def get_client(key, factory):
+    """Return client created for key, or create it with factory()."""
+    with _lock:
+        client = _clients.get(key)
+        if client is None:
+            client = _clients[key] = factory()
+        return client
+
+
+def clear():
+    """Forget all clients. Next get_client creates new ones."""
+    with _lock:
+        _clients.clear()
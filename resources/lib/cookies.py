@@ -0,0 +1,115 @@
+# -*- coding: utf-8 -*-
+"""
+Cookie jars that write the cookie file only when cookies have changed
+"""
+import os
+
+try:  # Python 3
+    import http.cookiejar as cookielib
+except ImportError:  # Python 2
+    import cookielib
+
+
+def get_file_state(filename):
+    """Return (mtime, size) of file or None if it doesn't exist."""
+    try:
+        stat = os.stat(filename)
+        return stat.st_mtime, stat.st_size
+    except (OSError, TypeError):
+        return None
+
+
+class DirtyTrackingMixin(object):
+    """Tracks changes to the jar and saves it atomically with flush()
+
+    Jar remembers the state of the file it has loaded or saved, so it can
+    follow changes other processes make to the file with sync_file().
+    """
+
+    dirty = False
+    # State of file when jar was loaded or saved, None if it had no file
+    file_state = None
+
+    def set_cookie(self, cookie):
+        with self._cookies_lock:
+            old = self._cookies.get(cookie.domain, {}).get(cookie.path, {}).get(cookie.name)
+            if old is None or old.value != cookie.value or old.expires != cookie.expires:
+                self.dirty = True
+            super(DirtyTrackingMixin, self).set_cookie(cookie)
+
+    def clear(self, domain=None, path=None, name=None):
+        super(DirtyTrackingMixin, self).clear(domain, path, name)
+        self.dirty = True
+
+    def clear_expired_cookies(self):
+        with self._cookies_lock:
+            count = len(self)
+            super(DirtyTrackingMixin, self).clear_expired_cookies()
+            if len(self) != count:
+                self.dirty = True
+
+    def load(self, filename=None, ignore_discard=False, ignore_expires=False):
+        super(DirtyTrackingMixin, self).load(filename, ignore_discard, ignore_expires)
+        # Cookies in file are already saved
+        self.dirty = False
+        self.file_state = get_file_state(filename or self.filename)
+
+    def file_removed(self):
+        """Return True if file this jar has loaded or saved has been removed, e.g. by reset of settings."""
+        return self.file_state is not None and get_file_state(self.filename) is None
+
+    def sync_file(self):
+        """Replace cookies with cookies of file if another process has changed it. Return True if it had.
+
+        Changes of this jar that haven't been flushed are kept, unless the file has been removed.
+        """
+        with self._cookies_lock:
+            state = get_file_state(self.filename)
+            if not self.filename or state == self.file_state:
+                return False
+            if state is not None and self.dirty:
+                return False
+            super(DirtyTrackingMixin, self).clear()
+            self.dirty = False
+            self.file_state = None
+            if state is not None:
+                try:
+                    self.load(ignore_discard=True, ignore_expires=True)
+                except (IOError, ValueError):
+                    pass
+            return True
+
+    def flush(self):
+        """Save cookies to file if they have changed since load or last flush."""
+        with self._cookies_lock:
+            if not self.dirty or not self.filename:
+                return
+            # Writing would bring back cookies that were removed on purpose
+            if self.file_removed():
+                return
+            # Write to temp file and rename so concurrent invocations never see half written file
+            tmp_file = '%s.%s.tmp' % (self.filename, os.getpid())
+            try:
+                self.save(tmp_file, ignore_discard=True, ignore_expires=True)
+                os.replace(tmp_file, self.filename)
+                self.dirty = False
+                self.file_state = get_file_state(self.filename)
+            except (IOError, OSError):
+                pass
+
+    def discard(self):
+        """Remove cookies from jar and file."""
+        with self._cookies_lock:
+            super(DirtyTrackingMixin, self).clear()
+            self.dirty = False
+            self.file_state = None
+            if self.filename and os.path.exists(self.filename):
+                os.remove(self.filename)
+
+
+class LWPCookieJar(DirtyTrackingMixin, cookielib.LWPCookieJar):
+    pass
+
+
+class MozillaCookieJar(DirtyTrackingMixin, cookielib.MozillaCookieJar):
+    pass
@@ -3,17 +3,29 @@
 A Kodi-agnostic library for Discovery+
 """
 import os
+import atexit
+import weakref
 import xbmc
 import re
 import json
 import time
-import calendar
+import threading
 from datetime import datetime, timedelta, date
-import requests
 import uuid
 import xbmcaddon
 import xbmcgui
 
+from .cache import ResponseCache, CACHE_TTLS
+from .epgstore import EpgStore
+from .epg import Programme, intern, to_epoch
+from .timestamps import parse_local
+from .entitlements import UserEntitlements
+from .tokenmanager import TokenManager
+from .jsonapi import Resolver
+from .cookies import LWPCookieJar, MozillaCookieJar
+from .backend import BackendError, UpstreamError, BackendTransport, SessionTransport, get_backend_address
+from .transport import TransportPolicy, DEFAULT_TIMEOUT, get_requests
+
 try: # Python 3
     import http.cookiejar as cookielib
 except ImportError: # Python 2
@@ -24,6 +36,14 @@ try: # Python 3
 except ImportError: # Python 2
     from urlparse import urlparse, urljoin
 
+# Cookie jars of clients still in use, saved when the process exits. Replaced clients aren't kept alive.
+_cookie_jars = weakref.WeakSet()
+
+@atexit.register
+def flush_cookie_jars():
+    for cookie_jar in list(_cookie_jars):
+        cookie_jar.flush()
+
 def slugify(text):
     non_url_safe = [' ','"', '#', '$', '%', '&', '+',',', '/', ':', ';', '=', '?','@', '[', '\\', ']', '^', '`','{', '|', '}', '~', "'"]
     non_url_safe_regex = re.compile(r'[{}]'.format(''.join(re.escape(x) for x in non_url_safe)))
@@ -32,13 +52,23 @@ def slugify(text):
     return text
 
 class Dplay(object):
-    def __init__(self, settings_folder, country, logging_prefix, numresults, cookiestxt, cookiestxt_file, cookie, us_uhd):
+    def __init__(self, settings_folder, country, logging_prefix, numresults, cookiestxt, cookiestxt_file, cookie, us_uhd,
+                 epg_workers=4, body_preview=500, dump_responses=False, backend=True, epg_refresh_hours=12,
+                 hedge_requests=False):
         self.logging_prefix = logging_prefix
+        # Log messages are not built at all when Kodi debug logging is off
+        self._debug_logging = None
+        self._debug_logging_checked = 0
+        self.body_preview = int(body_preview)
         self.numResults = numresults
         self.locale_suffix = country
         self.client_id = str(uuid.uuid1())
-        self.device_id = self.client_id.replace("-", "")
         self.us_uhd = us_uhd
+        self.epg_workers = int(epg_workers)
+        # Stored EPG days older than this are fetched again
+        self.epg_max_age = float(epg_refresh_hours) * 3600
+        # IPTV Manager channel ids are <channel id>@<add-on name>
+        self.channel_id_suffix = '@' + slugify(xbmcaddon.Addon(id='plugin.video.discoveryplus').getAddonInfo('name'))
 
         if self.locale_suffix == 'gb':
             self.api_url = 'https://eu1-prod-direct.discoveryplus.com'
@@ -73,16 +103,23 @@ class Dplay(object):
                 'x-disco-client': 'WEB:UNKNOWN:dplus_us:1.25.0'
             }
 
-        self.http_session = requests.Session()
+        self._http_session = None
+        self._http_session_lock = threading.Lock()
         self.settings_folder = settings_folder
+        self.response_log = self.get_response_log() if dump_responses else None
         self.unwanted_menu_items = ('epg')
+        self.cache = ResponseCache(self.settings_folder)
+        self.epg_store = EpgStore(self.settings_folder)
+        self.entitlements = UserEntitlements(self)
+        self.tokens = TokenManager(self, os.path.join(self.settings_folder, 'token.json'))
+        self.device_id = self.tokens.device_id
 
         # Use exported cookies.txt
         if cookiestxt:
-            self.cookie_jar = cookielib.MozillaCookieJar(cookiestxt_file)
+            self.cookie_jar = MozillaCookieJar(cookiestxt_file)
         # Else try to use user defined cookie from add-on settings
         else:
-            self.cookie_jar = cookielib.LWPCookieJar(os.path.join(self.settings_folder, 'cookie_file'))
+            self.cookie_jar = LWPCookieJar(os.path.join(self.settings_folder, 'cookie_file'))
 
             ck = cookielib.Cookie(version=0, name='st', value=cookie, port=None, port_specified=False,
                                 domain=self.api_url.replace('https://', ''), domain_specified=False, domain_initial_dot=False, path='/',
@@ -94,7 +131,45 @@ class Dplay(object):
             self.cookie_jar.load(ignore_discard=True, ignore_expires=True)
         except IOError:
             pass
-        self.http_session.cookies = self.cookie_jar
+        # Changed cookies are written once when the invocation ends
+        _cookie_jars.add(self.cookie_jar)
+
+        # Requests are sent from this process (SessionTransport) if the service isn't running
+        self.transport = None
+        # Slow GETs are sent again after 0.5 s or p95 latency of the endpoint
+        self.policy = TransportPolicy(hedge_after=0.5 if hedge_requests else 0)
+        # Use warm connections of add-on service when it is running
+        if backend:
+            address = get_backend_address()
+            if address:
+                self.transport = BackendTransport(*address, policy=self.policy)
+
+    @property
+    def debug_logging(self):
+        """Kodi debug logging setting. Checked again after 10 s so it follows changes in the long-lived service."""
+        now = time.time()
+        if now - self._debug_logging_checked > 10:
+            self._debug_logging = xbmc.getCondVisibility('System.GetBool(debug.showloginfo)')
+            self._debug_logging_checked = now
+        return self._debug_logging
+
+    @property
+    def http_session(self):
+        """requests session of this process, created when the first request is sent without the backend"""
+        with self._http_session_lock:
+            if self._http_session is None:
+                self._http_session = get_requests().Session()
+                self._http_session.cookies = self.cookie_jar
+            return self._http_session
+
+    def reload_cookies(self):
+        """Read cookies the backend has saved to the cookie file. Requests sent from this process update the jar."""
+        if not isinstance(self.transport, BackendTransport):
+            return
+        try:
+            self.cookie_jar.load(ignore_discard=True, ignore_expires=True)
+        except (IOError, ValueError):
+            pass
 
     class DplayError(Exception):
         def __init__(self, value):
@@ -104,42 +179,132 @@ class Dplay(object):
             return repr(self.value)
 
     def log(self, string):
-        msg = '%s: %s' % (self.logging_prefix, string)
-        xbmc.log(msg=msg, level=xbmc.LOGDEBUG)
-
-    def make_request(self, url, method, params=None, payload=None, headers=None, text=False):
+        if self.debug_logging:
+            msg = '%s: %s' % (self.logging_prefix, string)
+            xbmc.log(msg=msg, level=xbmc.LOGDEBUG)
+
+    def log_latency(self):
+        """Log p50, p95 and p99 response times per endpoint of requests sent from this process."""
+        if not self.debug_logging:
+            return
+        for endpoint, stats in sorted(self.policy.latency.summary().items()):
+            self.log('Latency %s: %d requests, p50 %d ms, p95 %d ms, p99 %d ms' % (
+                endpoint, stats['count'], stats['p50'], stats['p95'], stats['p99']))
+        if self.policy.retried or self.policy.hedged:
+            self.log('Retried %d and hedged %d requests' % (self.policy.retried, self.policy.hedged))
+
+    def get_response_log(self):
+        """Return logger that writes full API responses to rotating file in profile folder."""
+        import logging
+        from logging.handlers import RotatingFileHandler
+
+        logger = logging.getLogger('plugin.video.discoveryplus.responses')
+        if not logger.handlers:
+            handler = RotatingFileHandler(os.path.join(self.settings_folder, 'responses.log'),
+                                          maxBytes=5 * 1024 * 1024, backupCount=2, encoding='utf-8')
+            handler.setFormatter(logging.Formatter('%(asctime)s %(message)s'))
+            logger.addHandler(handler)
+            logger.setLevel(logging.DEBUG)
+            logger.propagate = False
+        return logger
+
+    def get_body_preview(self, content):
+        """Return start of response body for debug log."""
+        if len(content) <= self.body_preview:
+            return content.decode('utf-8', 'replace')
+        return '%s... [%s bytes]' % (content[:self.body_preview].decode('utf-8', 'replace'), len(content))
+
+    def make_request(self, url, method, params=None, payload=None, headers=None, text=False, authenticate=True):
         """Make an HTTP request. Return the response."""
-        self.log('Request URL: %s' % url)
-        self.log('Method: %s' % method)
-        self.log('Params: %s' % params)
-        self.log('Payload: %s' % payload)
-        self.log('Headers: %s' % headers)
+        if authenticate:
+            self.tokens.ensure()
+        sent_at = time.time()
+        req = self.send_request(url, method, params=params, payload=payload, headers=headers)
+        # Token was rejected, get new one and retry once
+        if req.status_code == 401 and authenticate:
+            self.tokens.refresh(sent_at)
+            req = self.send_request(url, method, params=params, payload=payload, headers=headers)
+        self.raise_dplay_error(req.content)
+        if text:
+            return req.text
+        return req.content
+
+    def make_cached_request(self, url, endpoint, params=None, headers=None):
+        """Make a GET request through the response cache. Return the response."""
+        ttl = CACHE_TTLS[endpoint]
+        key = self.cache.make_key(url, params, self.locale_suffix, self.realm, self.get_profile_key())
+        entry = self.cache.get(key)
+        if entry and entry.fresh:
+            self.cache.hits += 1
+            self.log('Cache hit: %s' % url)
+            return entry.body
+
+        request_headers = dict(headers) if headers else {}
+        if entry:
+            # Ask API if stale entry is still valid
+            if entry.etag:
+                request_headers['If-None-Match'] = entry.etag
+            if entry.last_modified:
+                request_headers['If-Modified-Since'] = entry.last_modified
+
+        self.tokens.ensure()
+        sent_at = time.time()
+        req = self.send_request(url, 'get', params=params, headers=request_headers)
+        if req.status_code == 401:
+            self.tokens.refresh(sent_at)
+            req = self.send_request(url, 'get', params=params, headers=request_headers)
+        if req.status_code == 304 and entry:
+            self.cache.revalidated += 1
+            self.cache.touch(key, ttl)
+            return entry.body
+
+        self.cache.misses += 1
+        self.raise_dplay_error(req.content)
+        if req.status_code == 200:
+            self.cache.set(key, req.content, ttl, etag=req.headers.get('ETag'),
+                           last_modified=req.headers.get('Last-Modified'), endpoint=endpoint)
+        return req.content
+
+    def get_profile_key(self):
+        """Return selected profile id used in cache keys."""
+        return self.cache.get_value('selected_profile')
+
+    def send_request(self, url, method, params=None, payload=None, headers=None):
+        """Send an HTTP request. Return the requests response object."""
+        if self.debug_logging:
+            self.log('Request URL: %s' % url)
+            self.log('Method: %s' % method)
+            self.log('Params: %s' % params)
+            self.log('Payload: %s' % payload)
+            self.log('Headers: %s' % headers)
+        if self.transport is None:
+            self.transport = SessionTransport(self.http_session, self.policy)
         try:
-            if method == 'get':
-                req = self.http_session.get(url, params=params, headers=headers)
-            elif method == 'put':
-                req = self.http_session.put(url, params=params, data=payload, headers=headers)
-            elif method == 'delete':
-                req = self.http_session.delete(url, params=params, data=payload, headers=headers)
-            elif method == 'patch':
-                req = self.http_session.patch(url, params=params, data=payload, headers=headers)
-            else:  # post
-                req = self.http_session.post(url, params=params, data=payload, headers=headers)
-            self.log('Response code: %s' % req.status_code)
-            self.log('Response: %s' % req.content)
             try:
-                self.cookie_jar.save(ignore_discard=True, ignore_expires=True)
-            except IOError:
-                pass
-            self.raise_dplay_error(req.content)
-            if text:
-                return req.text
-            return req.content
-
-        except requests.exceptions.ConnectionError as error:
+                req = self.transport.send(url, method, params=params, payload=payload, headers=headers)
+            except BackendError as error:
+                # Service is not running anymore and didn't send the request, send rest of the requests from this process
+                self.log('Backend Error: - %s' % error)
+                self.transport = SessionTransport(self.http_session, self.policy)
+                req = self.transport.send(url, method, params=params, payload=payload, headers=headers)
+            except UpstreamError as error:
+                # Request may have reached the API, raise it like requests would instead of sending it again
+                exceptions = get_requests().exceptions
+                exception = getattr(exceptions, error.kind or '', None)
+                if not (isinstance(exception, type) and issubclass(exception, exceptions.RequestException)):
+                    exception = exceptions.RequestException
+                raise exception(str(error))
+            if self.debug_logging:
+                self.log('Response code: %s' % req.status_code)
+                self.log('Response: %s' % self.get_body_preview(req.content))
+            if self.response_log:
+                self.response_log.debug('%s %s %s\n%s', method.upper(), req.url, req.status_code, req.text)
+            return req
+
+        except get_requests().exceptions.ConnectionError as error:
             self.log('Connection Error: - %s' % error)
             raise
-        except requests.exceptions.RequestException as error:
+        except get_requests().exceptions.RequestException as error:
             self.log('Error: - %s' % error)
             raise
 
@@ -162,7 +327,7 @@ class Dplay(object):
 
     # Return users country
     def get_country(self):
-        r = requests.get('https://www.discoveryplus.com')
+        r = get_requests().get('https://www.discoveryplus.com', timeout=DEFAULT_TIMEOUT)
         path = urlparse(r.url).path
         country = path.replace('/', '')
 
@@ -183,13 +348,17 @@ class Dplay(object):
             'shortlived': 'true'
         }
 
-        return self.make_request(url, 'get', params=params, headers=self.site_headers)
+        return self.make_request(url, 'get', params=params, headers=self.site_headers, authenticate=False)
 
     def get_user_data(self):
         url = '{api_url}/users/me'.format(api_url=self.api_url)
 
-        data = self.make_request(url, 'get')
-        return json.loads(data)['data']
+        data = json.loads(self.make_request(url, 'get'))['data']
+        # Cached responses are stored per profile
+        self.cache.set_value('selected_profile', data['attributes'].get('selectedProfileId'), 30 * 24 * 3600)
+        if 'packages' in data['attributes']:
+            self.entitlements.update(data['attributes']['packages'])
+        return data
 
     def get_avatars(self):
         url = '{api_url}/avatars'.format(api_url=self.api_url)
@@ -217,10 +386,14 @@ class Dplay(object):
         if pin:
             url = '{api_url}/users/me/profiles/switchProfile'.format(api_url=self.api_url)
             jsonPayload['data']['attributes']['profilePin'] = pin
-            return self.make_request(url, 'post', payload=json.dumps(jsonPayload), headers=self.site_headers)
+            data = self.make_request(url, 'post', payload=json.dumps(jsonPayload), headers=self.site_headers)
         else:
             url = '{api_url}/users/me'.format(api_url=self.api_url)
-            return self.make_request(url, 'patch', payload=json.dumps(jsonPayload), headers=self.site_headers)
+            data = self.make_request(url, 'patch', payload=json.dumps(jsonPayload), headers=self.site_headers)
+
+        self.cache.set_value('selected_profile', profileId, 30 * 24 * 3600)
+        self.entitlements.invalidate()
+        return data
 
     def get_menu(self, menu):
         url = '{api_url}/cms/collections{menu}'.format(api_url=self.api_url, menu=menu)
@@ -229,7 +402,7 @@ class Dplay(object):
             'include': 'default'
         }
 
-        data = json.loads(self.make_request(url, 'get', params=params, headers=self.site_headers))
+        data = json.loads(self.make_cached_request(url, 'menu', params=params, headers=self.site_headers))
         return data
 
     def get_config_in(self):
@@ -255,10 +428,10 @@ class Dplay(object):
         if search_query:
             params['contentFilter[query]'] = search_query
 
-        data = json.loads(self.make_request(url, 'get', params=params, headers=self.site_headers))
+        data = json.loads(self.make_cached_request(url, 'page', params=params, headers=self.site_headers))
         return data
 
-    def get_collections(self, collection_id, page, mandatoryParams=None, parameter=None):
+    def get_collections(self, collection_id, page, mandatoryParams=None, parameter=None, cached=True):
         mandatoryParams = None if mandatoryParams == 'None' else mandatoryParams
         parameter = None if parameter == 'None' else parameter
 
@@ -282,7 +455,11 @@ class Dplay(object):
         else:
             params['decorators'] = 'viewingHistory,isFavorite,playbackAllowed'
 
-        data = json.loads(self.make_request(url, 'get', params=params, headers=self.site_headers))
+        if cached:
+            data = json.loads(self.make_cached_request(url, 'collection', params=params, headers=self.site_headers))
+        else:
+            # Caller stores the response itself, e.g. EPG days in epg.db
+            data = json.loads(self.make_request(url, 'get', params=params, headers=self.site_headers))
         return data
 
     def get_search_shows_in(self, search_query):
@@ -308,7 +485,7 @@ class Dplay(object):
             'page[number]': 1
         }
 
-        data = json.loads(self.make_request(url, 'get', params=params, headers=self.site_headers))
+        data = json.loads(self.make_cached_request(url, 'favorites', params=params, headers=self.site_headers))
         return data
 
     def get_favorites_in(self):
@@ -321,7 +498,7 @@ class Dplay(object):
             'page[number]': 1
         }
 
-        data = json.loads(self.make_request(url, 'get', params=params, headers=self.site_headers))
+        data = json.loads(self.make_cached_request(url, 'favorites', params=params, headers=self.site_headers))
         return data
 
     def get_favorite_videos_in(self, videoType):
@@ -335,7 +512,7 @@ class Dplay(object):
             'filter[videoType]': videoType
         }
 
-        data = json.loads(self.make_request(url, 'get', params=params, headers=self.site_headers))
+        data = json.loads(self.make_cached_request(url, 'favorites', params=params, headers=self.site_headers))
         return data
 
     def update_playback_progress(self, method, video_id, position):
@@ -345,8 +522,14 @@ class Dplay(object):
             'position': position
         }
 
+        # Listings may have been cached again before the report was sent
+        self.invalidate_viewing_history()
         return self.make_request(url, method, params=params)
 
+    def invalidate_viewing_history(self):
+        """Remove cached pages and listings that contain viewing history. Menus are kept."""
+        self.cache.clear('page', 'collection', 'favorites')
+
     def get_current_episode_info(self, video_id):
         url = '{api_url}/content/videos/{video_id}'.format(api_url=self.api_url, video_id=video_id)
 
@@ -373,306 +556,206 @@ class Dplay(object):
         # POST for adding and DELETE for delete
         url = '{api_url}/users/me/favorites/show/{show_id}'.format(api_url=self.api_url, show_id=show_id)
 
-        return self.make_request(url, method, headers=self.site_headers)
-
-    def get_channels(self):
-        page_data = self.get_page('/epg')
+        data = self.make_request(url, method, headers=self.site_headers)
+        # Pages and collections have isFavorite decorator, refresh_list() after this must not get them from cache
+        self.cache.clear('page', 'collection', 'favorites')
+        return data
 
-        collections = list(filter(lambda x: x['type'] == 'collection', page_data['included']))
-        collectionItems = list(filter(lambda x: x['type'] == 'collectionItem', page_data['included']))
+    def get_channel_id(self, channel):
+        return channel['id'] + self.channel_id_suffix
 
+    def get_live_channels(self, included, channels):
+        """Return IPTV Manager channel dicts of channels that have livestream."""
         channels_list = []
+        for channel in channels:
+            if channel['attributes']['hasLiveStream']:
+                url = 'plugin://plugin.video.discoveryplus/?action=play&video_id={channel_id}&video_type=channel'.format(
+                    channel_id=channel['id'])
 
-        current_day = datetime.today().strftime('%Y-%m-%d')
-
-        for collection in collections:
-            if collection['attributes']['alias'] == 'epg-listing-wrapper':
-                for collection_relationships in collection['relationships']['items']['data']:
-                    for collectionItem in collectionItems:
-                        if collection_relationships['id'] == collectionItem['id']:
-
-                            epg_page_data = self.get_collections(
-                                collection_id=collectionItem['relationships']['collection']['data']['id'], page=1,
-                                parameter='pf[day]={current_day}'.format(current_day=current_day))
-                            channels = list(filter(lambda x: x['type'] == 'channel', epg_page_data['included']))
-                            images = list(filter(lambda x: x['type'] == 'image', epg_page_data['included']))
-
-                            for channel in channels:
-                                if channel['attributes']['hasLiveStream']:
-                                    url = 'plugin://plugin.video.discoveryplus/?action=play&video_id={channel_id}&video_type=channel'.format(
-                                        channel_id=channel['id'])
-
-                                    channel_logo = None
-                                    fanart_image = None
-                                    if channel['relationships'].get('images'):
-                                        for image in images:
-                                            for channel_images in channel['relationships']['images']['data']:
-                                                if image['id'] == channel_images['id']:
-                                                    if image['attributes']['kind'] == 'logo':
-                                                        channel_logo = image['attributes']['src']
-                                                    if image['attributes']['kind'] == 'default':
-                                                        fanart_image = image['attributes']['src']
-
-                                    channels_list.append(dict(
-                                        id='%s@%s' % (channel['id'], slugify(
-                                            xbmcaddon.Addon(id='plugin.video.discoveryplus').getAddonInfo(
-                                                'name'))),
-                                        name=channel['attributes']['name'],
-                                        logo=channel_logo if channel_logo else fanart_image,
-                                        stream=url
-                                    ))
+                images = included.images_by_kind(channel)
 
+                channels_list.append(dict(
+                    id=self.get_channel_id(channel),
+                    name=channel['attributes']['name'],
+                    logo=images.get('logo') or images.get('default'),
+                    stream=url
+                ))
 
         return channels_list
 
-    def get_channels_us(self):
-        page_data = self.get_page('/home')
+    def get_collection_channels(self, page_data, alias):
+        """Return live channels of collection alias in page."""
+        included = Resolver(page_data)
 
-        collections = list(filter(lambda x: x['type'] == 'collection', page_data['included']))
-        collectionItems = list(filter(lambda x: x['type'] == 'collectionItem', page_data['included']))
-        channels = list(filter(lambda x: x['type'] == 'channel', page_data['included']))
-        images = list(filter(lambda x: x['type'] == 'image', page_data['included']))
+        channels = []
+        for collection in included.of_type('collection'):
+            if collection['attributes']['alias'] == alias:
+                for collectionItem in included.related_many(collection, 'items'):
+                    channel = included.related(collectionItem, 'channel')
+                    if channel:
+                        channels.append(channel)
 
-        channels_list = []
+        return self.get_live_channels(included, channels)
 
-        for collection in collections:
-            # Introducing discovery+ Channels - Category
-            if collection['attributes']['alias'] == 'home-rail-jip-channels':
-                for c in collection['relationships']['items']['data']:
-                    for collectionItem in collectionItems:
-                        if c['id'] == collectionItem['id']:
-                            if collectionItem['relationships'].get('channel'):
-                                for channel in channels:
-                                    if \
-                                            collectionItem['relationships']['channel']['data'][
-                                                'id'] == channel['id']:
-
-                                        if channel['attributes']['hasLiveStream']:
-                                            url = 'plugin://plugin.video.discoveryplus/?action=play&video_id={channel_id}&video_type=channel'.format(
-                                                channel_id=channel['id'])
-
-                                            channel_logo = None
-                                            fanart_image = None
-                                            if channel['relationships'].get('images'):
-                                                for image in images:
-                                                    for channel_images in \
-                                                            channel['relationships']['images'][
-                                                                'data']:
-                                                        if image['id'] == channel_images[
-                                                            'id']:
-                                                            if image['attributes'][
-                                                                'kind'] == 'logo':
-                                                                channel_logo = \
-                                                                    image['attributes']['src']
-                                                            if image['attributes'][
-                                                                'kind'] == 'default':
-                                                                fanart_image = \
-                                                                    image['attributes']['src']
-
-                                            channels_list.append(dict(
-                                                id='%s@%s' % (channel['id'], slugify(
-                                                    xbmcaddon.Addon(id='plugin.video.discoveryplus').getAddonInfo(
-                                                        'name'))),
-                                                name=channel['attributes']['name'],
-                                                logo=channel_logo if channel_logo else fanart_image,
-                                                stream=url
-                                            ))
+    def get_channels(self):
+        page_data = self.get_page('/epg')
+        included = Resolver(page_data)
 
-        return channels_list
+        channels_list = []
 
-    def get_channels_in(self):
-        page_data = self.get_page('/explore-v2')
+        current_day = datetime.today().strftime('%Y-%m-%d')
 
-        collections = list(filter(lambda x: x['type'] == 'collection', page_data['included']))
-        collectionItems = list(filter(lambda x: x['type'] == 'collectionItem', page_data['included']))
-        channels = list(filter(lambda x: x['type'] == 'channel', page_data['included']))
-        images = list(filter(lambda x: x['type'] == 'image', page_data['included']))
+        for collection in included.of_type('collection'):
+            if collection['attributes']['alias'] == 'epg-listing-wrapper':
+                for collectionItem in included.related_many(collection, 'items'):
+                    epg_page_data = self.get_collections(
+                        collection_id=collectionItem['relationships']['collection']['data']['id'], page=1,
+                        parameter='pf[day]={current_day}'.format(current_day=current_day))
+                    epg_included = Resolver(epg_page_data)
+                    channels_list.extend(self.get_live_channels(epg_included, epg_included.of_type('channel')))
 
-        channels_list = []
+        return channels_list
 
-        for collection in collections:
-            if collection['attributes']['alias'] == 'explore-national-live-channels-list':
-                for c in collection['relationships']['items']['data']:
-                    for collectionItem in collectionItems:
-                        if c['id'] == collectionItem['id']:
-                            if collectionItem['relationships'].get('channel'):
-                                for channel in channels:
-                                    if \
-                                            collectionItem['relationships']['channel']['data'][
-                                                'id'] == channel['id']:
-
-                                        if channel['attributes']['hasLiveStream']:
-                                            url = 'plugin://plugin.video.discoveryplus/?action=play&video_id={channel_id}&video_type=channel'.format(
-                                                channel_id=channel['id'])
-
-                                            channel_logo = None
-                                            fanart_image = None
-                                            if channel['relationships'].get('images'):
-                                                for image in images:
-                                                    for channel_images in \
-                                                            channel['relationships']['images'][
-                                                                'data']:
-                                                        if image['id'] == channel_images[
-                                                            'id']:
-                                                            if image['attributes'][
-                                                                'kind'] == 'logo':
-                                                                channel_logo = \
-                                                                    image['attributes']['src']
-                                                            if image['attributes'][
-                                                                'kind'] == 'default':
-                                                                fanart_image = \
-                                                                    image['attributes']['src']
-
-                                            channels_list.append(dict(
-                                                id='%s@%s' % (channel['id'], slugify(
-                                                    xbmcaddon.Addon(id='plugin.video.discoveryplus').getAddonInfo(
-                                                        'name'))),
-                                                name=channel['attributes']['name'],
-                                                logo=channel_logo if channel_logo else fanart_image,
-                                                stream=url
-                                            ))
+    def get_channels_us(self):
+        # Introducing discovery+ Channels - Category
+        return self.get_collection_channels(self.get_page('/home'), 'home-rail-jip-channels')
 
-        return channels_list
+    def get_channels_in(self):
+        return self.get_collection_channels(self.get_page('/explore-v2'), 'explore-national-live-channels-list')
 
     def get_epg(self):
         from collections import defaultdict
         epg = defaultdict(list)
 
         page_data = self.get_page('/epg')
+        included = Resolver(page_data)
 
-        collections = list(filter(lambda x: x['type'] == 'collection', page_data['included']))
-        collectionItems = list(filter(lambda x: x['type'] == 'collectionItem', page_data['included']))
-
-        for collection in collections:
+        # Collect daily epg requests per channel
+        requests_list = []
+        today = None
+        for collection in included.of_type('collection'):
             if collection['attributes']['alias'] == 'epg-listing-wrapper':
-                for collection_relationships in collection['relationships']['items']['data']:
-                    for collectionItem in collectionItems:
-                        if collection_relationships['id'] == collectionItem['id']:
-                            if collectionItem['relationships'].get('collection'):
-
-                                # Get daily epg per channel
-                                for option in collection['attributes']['component']['filters'][0]['options']:
-
-                                    # Grab EPG only for current day and later
-                                    if option['id'] >= collection['attributes']['component']['filters'][0]['initiallySelectedOptionIds'][0]:
-
-                                        epg_page_data = self.get_collections(
-                                            collection_id=collectionItem['relationships']['collection']['data']['id'],
-                                            page=1,
-                                            parameter=option['parameter'])
-
-                                        # It is possible that channel doesn't have EPG for requested day
-                                        if epg_page_data.get('included'):
-
-                                            collectionItems2 = list(
-                                                filter(lambda x: x['type'] == 'collectionItem',
-                                                       epg_page_data['included']))
-                                            channels = list(
-                                                filter(lambda x: x['type'] == 'channel', epg_page_data['included']))
-                                            images = list(
-                                                filter(lambda x: x['type'] == 'image', epg_page_data['included']))
-                                            videos = list(
-                                                filter(lambda x: x['type'] == 'video', epg_page_data['included']))
-                                            taxonomyNodes = list(filter(lambda x: x['type'] == 'taxonomyNode',
-                                                                        epg_page_data['included']))
-
-                                            for channel in channels:
-                                                if channel['attributes']['hasLiveStream']:
-                                                    for collectionItem2 in collectionItems2:
-                                                        for video in videos:
-                                                            if video['id'] == \
-                                                                    collectionItem2['relationships']['video']['data'][
-                                                                        'id']:
-
-                                                                fanart_image = None
-                                                                if video['relationships'].get('images'):
-                                                                    for image in images:
-                                                                        for video_images in \
-                                                                                video['relationships']['images'][
-                                                                                    'data']:
-                                                                            if image['id'] == video_images['id']:
-                                                                                if image['attributes'][
-                                                                                    'kind'] == 'default':
-                                                                                    fanart_image = image['attributes'][
-                                                                                        'src']
-
-                                                                channel_id = '%s@%s' % (channel['id'], slugify(
-                                                                    xbmcaddon.Addon(
-                                                                        id='plugin.video.discoveryplus').getAddonInfo(
-                                                                        'name')))
-
-                                                                # Sport events
-                                                                if video['relationships'].get('txSports'):
-                                                                    subtitle = video['attributes'].get('secondaryTitle')
-                                                                    for taxonomyNode in taxonomyNodes:
-                                                                        if taxonomyNode['id'] == \
-                                                                                video['relationships']['txSports'][
-                                                                                    'data'][0]['id']:
-                                                                            if video['attributes'].get(
-                                                                                    'secondaryTitle'):
-                                                                                subtitle = taxonomyNode['attributes'][
-                                                                                               'name'] + ' - ' + \
-                                                                                           video['attributes'][
-                                                                                               'secondaryTitle']
-                                                                            else:
-                                                                                subtitle = taxonomyNode['attributes'][
-                                                                                    'name']
-
-                                                                    epg[channel_id].append(dict(
-                                                                        start=video['attributes'].get('scheduleStart'),
-                                                                        stop=video['attributes'].get('scheduleEnd'),
-                                                                        title=video['attributes'].get('name'),
-                                                                        description=video['attributes'].get(
-                                                                            'description'),
-                                                                        subtitle=subtitle,
-                                                                        image=fanart_image
-                                                                    ))
-                                                                # TV shows
-                                                                else:
-                                                                    if video['attributes']['customAttributes'].get(
-                                                                            'listingSeasonNumber') and \
-                                                                            video['attributes'][
-                                                                                'customAttributes'].get(
-                                                                                'listingEpisodeNumber'):
-                                                                        episode = 'S' + str(
-                                                                            video['attributes']['customAttributes'][
-                                                                                'listingSeasonNumber']) + 'E' + str(
-                                                                            video['attributes']['customAttributes'][
-                                                                                'listingEpisodeNumber'])
-                                                                    else:
-                                                                        episode = None
-
-                                                                    subtitle = video['attributes'].get('name')
-                                                                    # Don't add name to subtitle if it same as listingShowName
-                                                                    if video['attributes']['customAttributes'].get(
-                                                                            'listingShowName') and video[
-                                                                        'attributes'].get(
-                                                                        'name'):
-                                                                        if video['attributes']['customAttributes'][
-                                                                            'listingShowName'] == \
-                                                                                video['attributes']['name']:
-                                                                            subtitle = None
-
-                                                                    # At least discovery+ UK doesn't always have show name on data
-                                                                    if video['attributes']['customAttributes'].get('listingShowName') is None:
-                                                                        title = subtitle
-                                                                        subtitle = None
-                                                                    else:
-                                                                        title = video['attributes']['customAttributes']['listingShowName']
-
-                                                                    epg[channel_id].append(dict(
-                                                                        start=video['attributes'].get('scheduleStart'),
-                                                                        stop=video['attributes'].get('scheduleEnd'),
-                                                                        title=title,
-                                                                        description=video['attributes'].get(
-                                                                            'description'),
-                                                                        subtitle=subtitle,
-                                                                        episode=episode,
-                                                                        image=fanart_image
-                                                                    ))
+                epg_filter = collection['attributes']['component']['filters'][0]
+                today = epg_filter['initiallySelectedOptionIds'][0]
+                for collectionItem in included.related_many(collection, 'items'):
+                    if collectionItem['relationships'].get('collection'):
+
+                        for option in epg_filter['options']:
+
+                            # Grab EPG only for current day and later
+                            if option['id'] >= today:
+                                requests_list.append(
+                                    (collectionItem['relationships']['collection']['data']['id'],
+                                     option['parameter'], option['id']))
+
+        # Past days never change, other days are fetched only when missing from store or too old
+        if today:
+            self.epg_store.drop_before(self.locale_suffix, today)
+        stored = dict((key, dict((channel_id, [Programme.from_row(row) for row in rows])
+                                 for channel_id, rows in channels.items()))
+                      for key, channels in self.epg_store.get_days(self.locale_suffix, self.epg_max_age).items())
+        missing = [request for request in requests_list if (request[0], request[2]) not in stored]
+        self.log('EPG days stored: %d, fetching: %d' % (len(requests_list) - len(missing), len(missing)))
+
+        fetched = self.get_collections_parallel([(collection_id, parameter)
+                                                 for collection_id, parameter, day in missing])
+        for (collection_id, parameter, day), epg_page_data in zip(missing, fetched):
+            day_epg = defaultdict(list)
+            self.parse_epg_collection(epg_page_data, day_epg)
+            self.epg_store.set_day(self.locale_suffix, collection_id, day,
+                                   dict((channel_id, [programme.to_row() for programme in programmes])
+                                        for channel_id, programmes in day_epg.items()))
+            stored[(collection_id, day)] = day_epg
+
+        # Results are merged in request order so EPG is same regardless of which request finishes first
+        for collection_id, parameter, day in requests_list:
+            for channel_id, programmes in stored[(collection_id, day)].items():
+                epg[intern(channel_id)].extend(programmes)
 
         return epg
 
+    def get_collections_parallel(self, requests_list):
+        """Fetch (collection_id, parameter) collections concurrently. Return results in same order."""
+        from concurrent.futures import ThreadPoolExecutor
+
+        def fetch(request):
+            collection_id, parameter = request
+            # EPG days are stored in epg.db, they would only push menus and pages out of response cache
+            return self.get_collections(collection_id=collection_id, page=1, parameter=parameter, cached=False)
+
+        with ThreadPoolExecutor(max_workers=max(1, self.epg_workers)) as executor:
+            return list(executor.map(fetch, requests_list))
+
+    def parse_epg_collection(self, epg_page_data, epg):
+        """Add programmes of one channel and day to epg dict."""
+        # It is possible that channel doesn't have EPG for requested day
+        if not epg_page_data.get('included'):
+            return
+
+        included = Resolver(epg_page_data)
+
+        for channel in included.of_type('channel'):
+            if channel['attributes']['hasLiveStream']:
+                channel_id = intern(self.get_channel_id(channel))
+                for collectionItem2 in included.of_type('collectionItem'):
+                    video = included.related(collectionItem2, 'video')
+                    if not video:
+                        continue
+
+                    fanart_image = included.images_by_kind(video).get('default')
+
+                    # Sport events
+                    if video['relationships'].get('txSports'):
+                        subtitle = video['attributes'].get('secondaryTitle')
+                        taxonomyNode = included.related(video, 'txSports')
+                        if taxonomyNode:
+                            if video['attributes'].get('secondaryTitle'):
+                                subtitle = taxonomyNode['attributes']['name'] + ' - ' + \
+                                           video['attributes']['secondaryTitle']
+                            else:
+                                subtitle = taxonomyNode['attributes']['name']
+
+                        epg[channel_id].append(Programme(
+                            start=to_epoch(video['attributes'].get('scheduleStart')),
+                            stop=to_epoch(video['attributes'].get('scheduleEnd')),
+                            title=video['attributes'].get('name'),
+                            description=video['attributes'].get('description'),
+                            subtitle=subtitle,
+                            image=fanart_image
+                        ))
+                    # TV shows
+                    else:
+                        customAttributes = video['attributes']['customAttributes']
+                        if customAttributes.get('listingSeasonNumber') and \
+                                customAttributes.get('listingEpisodeNumber'):
+                            episode = 'S' + str(customAttributes['listingSeasonNumber']) + 'E' + str(
+                                customAttributes['listingEpisodeNumber'])
+                        else:
+                            episode = None
+
+                        subtitle = video['attributes'].get('name')
+                        # Don't add name to subtitle if it same as listingShowName
+                        if customAttributes.get('listingShowName') and video['attributes'].get('name'):
+                            if customAttributes['listingShowName'] == video['attributes']['name']:
+                                subtitle = None
+
+                        # At least discovery+ UK doesn't always have show name on data
+                        if customAttributes.get('listingShowName') is None:
+                            title = subtitle
+                            subtitle = None
+                        else:
+                            title = customAttributes['listingShowName']
+
+                        epg[channel_id].append(Programme(
+                            start=to_epoch(video['attributes'].get('scheduleStart')),
+                            stop=to_epoch(video['attributes'].get('scheduleEnd')),
+                            title=title,
+                            description=video['attributes'].get('description'),
+                            subtitle=subtitle,
+                            episode=episode,
+                            image=fanart_image
+                        ))
+
     # discoveryplus.com (US) doesn't have EPG so we use channel name as show name
     def get_epg_us(self):
         from collections import defaultdict
@@ -681,13 +764,10 @@ class Dplay(object):
         today = datetime.utcnow().date()
         start = datetime(today.year, today.month, today.day).astimezone()
         end = start + timedelta(1)
+        start, end = int(start.timestamp()), int(end.timestamp())
 
         for channel in self.get_channels_us():
-            epg[channel['id']].append(dict(
-                start=start.isoformat(),
-                stop=end.isoformat(),
-                title=channel['name']
-            ))
+            epg[channel['id']].append(Programme(start, end, channel['name']))
         return epg
 
     # discoveryplus.in doesn't have EPG so we use channel name as show name
@@ -698,13 +778,10 @@ class Dplay(object):
         today = datetime.utcnow().date()
         start = datetime(today.year, today.month, today.day).astimezone()
         end = start + timedelta(1)
+        start, end = int(start.timestamp()), int(end.timestamp())
 
         for channel in self.get_channels_in():
-            epg[channel['id']].append(dict(
-                start=start.isoformat(),
-                stop=end.isoformat(),
-                title=channel['name']
-            ))
+            epg[channel['id']].append(Programme(start, end, channel['name']))
         return epg
 
     def get_stream(self, video_id, video_type):
@@ -792,19 +869,5 @@ class Dplay(object):
         return stream
 
     def parse_datetime(self, date):
-        """Parse date string to datetime object."""
-        date_time_format = '%Y-%m-%dT%H:%M:%SZ'
-        datetime_obj = datetime(*(time.strptime(date, date_time_format)[0:6]))
-
-        return self.utc_to_local(datetime_obj)
-
-    def get_current_time(self):
-        """Return the current local time."""
-        return datetime.now()
-
-    def utc_to_local(self, utc_dt):
-        # get integer timestamp to avoid precision lost
-        timestamp = calendar.timegm(utc_dt.timetuple())
-        local_dt = datetime.fromtimestamp(timestamp)
-        assert utc_dt.resolution >= timedelta(microseconds=1)
-        return local_dt.replace(microsecond=utc_dt.microsecond)
\ No newline at end of file
+        """Parse date string to local time datetime object."""
+        return parse_local(date)
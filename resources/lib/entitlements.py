@@ -0,0 +1,38 @@
+# -*- coding: utf-8 -*-
+"""
+Subscription packages of the logged in user
+"""
+
+
+class UserEntitlements(object):
+    """Packages of the user, fetched from /users/me at most once per session"""
+
+    cache_key = 'user_packages'
+
+    def __init__(self, dplay, ttl=300):
+        self.dplay = dplay
+        self.ttl = ttl
+        self._packages = None
+
+    @property
+    def packages(self):
+        if self._packages is None:
+            cached = self.dplay.cache.get_value(self.cache_key)
+            if cached is not None:
+                self._packages = frozenset(cached)
+            else:
+                # get_user_data calls update()
+                self.dplay.get_user_data()
+        return self._packages
+
+    def update(self, packages):
+        self._packages = frozenset(packages)
+        self.dplay.cache.set_value(self.cache_key, sorted(self._packages), self.ttl)
+
+    def has_any(self, packages):
+        """Return True if user has any of the given packages."""
+        return not self.packages.isdisjoint(packages)
+
+    def invalidate(self):
+        self._packages = None
+        self.dplay.cache.delete_value(self.cache_key)
@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+"""
+Compact EPG programme model
+
+A full week EPG has tens of thousands of programmes. They are kept as slotted
+objects with epoch second start and stop times and interned strings, and turned
+into JSON-EPG dicts only when they are sent to IPTV Manager.
+"""
+import sys
+import time
+
+from .timestamps import parse_utc
+
+ISO_FORMAT = '%Y-%m-%dT%H:%M:%SZ'
+
+
+def intern(value):
+    """Intern strings that repeat across programmes (titles, image urls). Other values are returned as is."""
+    if isinstance(value, str):
+        return sys.intern(value)
+    return value
+
+
+def to_epoch(value):
+    """Return epoch seconds of API UTC timestamp like 2023-01-01T10:00:00Z or 2023-01-01T10:00:00.000Z."""
+    if not value:
+        return None
+    return parse_utc(value)
+
+
+def to_iso(epoch):
+    if epoch is None:
+        return None
+    return time.strftime(ISO_FORMAT, time.gmtime(epoch))
+
+
+class Programme(object):
+    __slots__ = ('start', 'stop', 'title', 'description', 'subtitle', 'episode', 'image')
+
+    def __init__(self, start, stop, title, description=None, subtitle=None, episode=None, image=None):
+        self.start = start
+        self.stop = stop
+        self.title = intern(title)
+        self.description = description
+        self.subtitle = intern(subtitle)
+        self.episode = intern(episode)
+        self.image = intern(image)
+
+    def to_dict(self):
+        """Return programme in IPTV Manager JSON-EPG format."""
+        programme = dict(start=to_iso(self.start), stop=to_iso(self.stop), title=self.title)
+        for key in ('description', 'subtitle', 'episode', 'image'):
+            value = getattr(self, key)
+            if value is not None:
+                programme[key] = value
+        return programme
+
+    def to_row(self):
+        """Return programme as list for EPG store."""
+        return [self.start, self.stop, self.title, self.description, self.subtitle, self.episode, self.image]
+
+    @classmethod
+    def from_row(cls, row):
+        return cls(*row)
+
+
+def to_json(obj):
+    """json.dumps default function that serializes programmes."""
+    if isinstance(obj, Programme):
+        return obj.to_dict()
+    raise TypeError('%r is not JSON serializable' % obj)
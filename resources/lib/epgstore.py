@@ -0,0 +1,51 @@
+# -*- coding: utf-8 -*-
+"""
+Local EPG store so IPTV Manager refreshes only fetch days that changed
+"""
+import os
+import json
+import time
+import sqlite3
+import threading
+
+
+class EpgStore(object):
+    """Parsed programmes per EPG collection and day, stored in SQLite in the add-on profile folder"""
+
+    def __init__(self, store_folder):
+        self.db_path = os.path.join(store_folder, 'epg.db')
+        self._lock = threading.Lock()
+        self._conn = None
+
+    def _connect(self):
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.db_path, timeout=5, isolation_level=None, check_same_thread=False)
+            self._conn.execute('CREATE TABLE IF NOT EXISTS days ('
+                               'locale TEXT, collection_id TEXT, day TEXT, programmes TEXT, fetched REAL, '
+                               'PRIMARY KEY (locale, collection_id, day))')
+        return self._conn
+
+    def _execute(self, sql, args=()):
+        with self._lock:
+            try:
+                return self._connect().execute(sql, args).fetchall()
+            except sqlite3.Error:
+                # Store is only an optimization, days missing from it are fetched from the API
+                return []
+
+    def get_days(self, locale, max_age):
+        """Return {(collection_id, day): {channel_id: [programme]}} of days fetched within max_age seconds."""
+        rows = self._execute('SELECT collection_id, day, programmes FROM days WHERE locale = ? AND fetched > ?',
+                             (locale, time.time() - max_age))
+        return dict(((collection_id, day), json.loads(programmes)) for collection_id, day, programmes in rows)
+
+    def set_day(self, locale, collection_id, day, programmes):
+        self._execute('INSERT OR REPLACE INTO days VALUES (?, ?, ?, ?, ?)',
+                      (locale, collection_id, day, json.dumps(programmes), time.time()))
+
+    def drop_before(self, locale, day):
+        """Remove days that have fully elapsed."""
+        self._execute('DELETE FROM days WHERE locale = ? AND day < ?', (locale, day))
+
+    def clear(self):
+        self._execute('DELETE FROM days')
@@ -6,11 +6,39 @@ import json
 import socket
 
 from resources.lib.kodihelper import KodiHelper
+from resources.lib.epg import to_json
 
 base_url = sys.argv[0]
 handle = int(sys.argv[1])
 helper = KodiHelper(base_url, handle)
 
+
+def iter_json(obj, depth=3):
+    """Yield JSON of obj in parts. Dicts and lists up to depth levels are written item by item,
+    so envelope, channels and programmes are encoded one at a time instead of as one string."""
+    if depth and isinstance(obj, dict):
+        yield '{'
+        separator = ''
+        for key, value in obj.items():
+            yield separator + json.dumps(str(key)) + ':'
+            for part in iter_json(value, depth - 1):
+                yield part
+            separator = ','
+        yield '}'
+    elif depth and isinstance(obj, (list, tuple)):
+        yield '['
+        separator = ''
+        for value in obj:
+            yield separator
+            for part in iter_json(value, depth - 1):
+                yield part
+            separator = ','
+        yield ']'
+    else:
+        # Programmes are turned into JSON-EPG dicts only here
+        yield json.dumps(obj, separators=(',', ':'), default=to_json)
+
+
 class IPTVManager:
     """Interface to IPTV Manager"""
 
@@ -23,10 +51,14 @@ class IPTVManager:
 
         def send(self):
             """Decorator to send over a socket"""
+            data = func(self)
             sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
             sock.connect(('127.0.0.1', self.port))
             try:
-                sock.sendall(json.dumps(func(self)).encode())
+                # Buffered writer sends parts in 64 KiB chunks while the rest is still being encoded
+                with sock.makefile('w', buffering=65536, encoding='utf-8') as stream:
+                    for part in iter_json(data):
+                        stream.write(part)
             finally:
                 sock.close()
 
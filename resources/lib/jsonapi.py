@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+"""
+Index for JSON:API responses used by discovery+ API
+"""
+from collections import defaultdict
+
+
+class Resolver(object):
+    """Resolves relationships to included resources with dict lookups instead of list scans"""
+
+    def __init__(self, page_data):
+        self.resources = {}
+        self.types = defaultdict(list)
+        for resource in page_data.get('included', []):
+            self.resources[(resource['type'], resource['id'])] = resource
+            self.types[resource['type']].append(resource)
+
+    def get(self, resource_type, resource_id):
+        return self.resources.get((resource_type, resource_id))
+
+    def of_type(self, resource_type):
+        """Return all included resources of type in response order."""
+        return self.types.get(resource_type, [])
+
+    def resolve(self, rel):
+        """Return resource of to-one relationship or resource identifier. None if not included."""
+        if not rel:
+            return None
+        data = rel['data'] if 'data' in rel else rel
+        if not data:
+            return None
+        if isinstance(data, list):
+            data = data[0]
+        return self.resources.get((data['type'], data['id']))
+
+    def resolve_many(self, rels):
+        """Return included resources of to-many relationship in relationship order."""
+        if not rels:
+            return []
+        data = rels.get('data', []) if isinstance(rels, dict) else rels
+        resources = []
+        for identifier in data:
+            resource = self.resources.get((identifier['type'], identifier['id']))
+            if resource is not None:
+                resources.append(resource)
+        return resources
+
+    def related(self, obj, name):
+        """Return resource of relationship name of obj."""
+        return self.resolve(obj.get('relationships', {}).get(name))
+
+    def related_many(self, obj, name):
+        """Return resources of to-many relationship name of obj."""
+        return self.resolve_many(obj.get('relationships', {}).get(name))
+
+    def images_by_kind(self, obj, relationship='images'):
+        """Return {kind: src} of images of obj."""
+        images = {}
+        for image in self.related_many(obj, relationship):
+            images[image['attributes']['kind']] = image['attributes']['src']
+        return images
+
+    def first_image(self, obj, relationship='images'):
+        """Return src of first image of obj."""
+        image = self.related(obj, relationship)
+        return image['attributes']['src'] if image else None
+
+    def route_url(self, obj, relationship='routes'):
+        """Return url of first route of obj."""
+        route = self.related(obj, relationship)
+        return route['attributes']['url'] if route else None
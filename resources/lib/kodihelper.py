@@ -4,15 +4,20 @@ import os
 import re
 import sys
 import json
+import time
+import threading
 
-from .dplay import Dplay
+from . import clients
+from .jsonapi import Resolver
+from .metadata import MetadataMapper
+from .progress import ProgressReporter
+from .settings import Settings
 
 import xbmc
 import xbmcvfs
 import xbmcgui
 import xbmcplugin
 from xbmcaddon import Addon
-import inputstreamhelper
 from base64 import b64encode
 
 try:  # Python 3
@@ -22,7 +27,7 @@ except ImportError:  # Python 2
 
 
 class KodiHelper(object):
-    def __init__(self, base_url=None, handle=None):
+    def __init__(self, base_url=None, handle=None, backend=True):
         addon = self.get_addon()
         self.base_url = base_url
         self.handle = handle
@@ -31,33 +36,62 @@ class KodiHelper(object):
         self.addon_name = addon.getAddonInfo('id')
         self.addon_version = addon.getAddonInfo('version')
         self.language = addon.getLocalizedString
+        self.settings = Settings(addon)
         self.logging_prefix = '[%s-%s]' % (self.addon_name, self.addon_version)
+        self.default_art = {
+            'icon': addon.getAddonInfo('icon'),
+            'fanart': addon.getAddonInfo('fanart')
+        }
+        # Directory items are sent to Kodi in one call in eod()
+        self.directory_items = []
+        self.directory_content = None
+        self.directory_category = None
+        self.directory_sort_methods = []
         if not xbmcvfs.exists(self.addon_profile):
             xbmcvfs.mkdir(self.addon_profile)
-        self.d = Dplay(self.addon_profile, self.get_setting('country'), self.logging_prefix,
-                       self.get_setting('numresults'), self.get_setting('cookiestxt'),
-                       self.get_setting('cookiestxt_file'), self.get_setting('cookie'), self.get_setting('us_uhd'))
+        self.backend = backend
+        self._d = None
+        self._d_lock = threading.Lock()
+
+    @property
+    def d(self):
+        """Dplay client. Created on first use so invocations that don't call the API don't import it."""
+        with self._d_lock:
+            if self._d is None:
+                from .dplay import Dplay
+                dplay_args = (self.addon_profile, self.get_setting('country'), self.logging_prefix,
+                              self.get_setting('numresults'), self.get_setting('cookiestxt'),
+                              self.get_setting('cookiestxt_file'), self.get_setting('cookie'),
+                              self.get_setting('us_uhd'), self.get_setting('epg_workers'),
+                              self.get_setting('log_body_preview'), self.get_setting('dump_responses'), self.backend,
+                              self.get_setting('epg_refresh_hours'), self.get_setting('hedge_requests'))
+                # Helpers with same settings share one client
+                self._d = clients.get_client(dplay_args, lambda: Dplay(*dplay_args))
+            return self._d
+
+    def close(self):
+        """Save changed cookies and log request latencies if the client has been created."""
+        if self._d is not None:
+            self._d.cookie_jar.flush()
+            self._d.log_latency()
 
     def get_addon(self):
         """Returns a fresh addon instance."""
         return Addon()
 
     def get_setting(self, setting_id):
-        addon = self.get_addon()
-        setting = addon.getSetting(setting_id)
-        if setting == 'true':
-            return True
-        elif setting == 'false':
-            return False
-        else:
-            return setting
+        return self.settings.get(setting_id)
 
     def get_kodi_version(self):
         version = xbmc.getInfoLabel('System.BuildVersion')
         return version.split('.')[0]
 
     def set_setting(self, key, value):
-        return self.get_addon().setSetting(key, value)
+        return self.settings.set(key, value)
+
+    def refresh_settings(self):
+        """Read settings again, e.g. after user has changed them."""
+        self.settings.refresh(self.get_addon())
 
     def log(self, string):
         msg = '%s: %s' % (self.logging_prefix, string)
@@ -97,9 +131,11 @@ class KodiHelper(object):
             return None
 
     def check_for_credentials(self):
-        self.d.get_token()  # Get new token before checking credentials
         if self.d.get_user_data()['attributes']['anonymous'] == True:
-            raise self.d.DplayError(self.language(30022))
+            # Stored token may belong to anonymous session, check again with new token
+            self.d.tokens.refresh()
+            if self.d.get_user_data()['attributes']['anonymous'] == True:
+                raise self.d.DplayError(self.language(30022))
         return True
 
     def set_country(self):
@@ -119,15 +155,32 @@ class KodiHelper(object):
         self.set_setting('seasonsonly', 'false')
         self.set_setting('flattentvshows', 'false')
         self.set_setting('iptv.enabled', 'false')
+        self.set_setting('epg_workers', '4')
+        self.set_setting('epg_refresh_hours', '12')
+        self.set_setting('log_body_preview', '500')
+        self.set_setting('dump_responses', 'false')
+        self.set_setting('cache_warming', 'true')
+        self.set_setting('hedge_requests', 'false')
+        self.refresh_settings()
+
+        # Token belongs to old cookies
+        self.d.tokens.invalidate()
 
         # Remove cookies file
         cookie_file = os.path.join(self.addon_profile, 'cookie_file')
-        if os.path.exists(cookie_file):
+        # Cookies in memory would be written back at exit
+        if self.d.cookie_jar.filename == cookie_file:
+            self.d.cookie_jar.discard()
+        elif os.path.exists(cookie_file):
             os.remove(cookie_file)
 
+        # Remove cached responses and stored EPG days of old account and country
+        self.d.cache.clear()
+        self.d.epg_store.clear()
+        self.d.entitlements.invalidate()
+
     def add_item(self, title, params, items=False, folder=True, playable=False, info=None, art=None, content=False,
                  menu=None, resume=None, total=None, folder_name=None, sort_method=None):
-        addon = self.get_addon()
         listitem = xbmcgui.ListItem(label=title, offscreen=True)
 
         if playable:
@@ -140,42 +193,62 @@ class KodiHelper(object):
         if art:
             listitem.setArt(art)
         else:
-            art = {
-                'icon': addon.getAddonInfo('icon'),
-                'fanart': addon.getAddonInfo('fanart')
-            }
-            listitem.setArt(art)
+            listitem.setArt(self.default_art)
         if info:
             listitem.setInfo('video', info)
         if content:
-            xbmcplugin.setContent(self.handle, content)
+            self.directory_content = content
         if menu:
             listitem.addContextMenuItems(menu)
         if folder_name:
-            xbmcplugin.setPluginCategory(self.handle, folder_name)
+            self.directory_category = folder_name
         if sort_method:
             if sort_method == 'unsorted':
-                xbmcplugin.addSortMethod(self.handle, xbmcplugin.SORT_METHOD_UNSORTED)
-                xbmcplugin.addSortMethod(self.handle, xbmcplugin.SORT_METHOD_LABEL)
+                self.add_sort_methods(xbmcplugin.SORT_METHOD_UNSORTED, xbmcplugin.SORT_METHOD_LABEL)
             if sort_method == 'sort_label':
-                xbmcplugin.addSortMethod(self.handle, xbmcplugin.SORT_METHOD_LABEL)
+                self.add_sort_methods(xbmcplugin.SORT_METHOD_LABEL)
             if sort_method == 'sort_episodes':
-                xbmcplugin.addSortMethod(self.handle, xbmcplugin.SORT_METHOD_EPISODE)
-                xbmcplugin.addSortMethod(self.handle, xbmcplugin.SORT_METHOD_VIDEO_TITLE)
+                self.add_sort_methods(xbmcplugin.SORT_METHOD_EPISODE, xbmcplugin.SORT_METHOD_VIDEO_TITLE)
             if sort_method == 'bottom':
                 listitem.setProperty("SpecialSort", "bottom")
 
         recursive_url = self.base_url + '?' + urlencode(params)
 
         if items is False:
-            xbmcplugin.addDirectoryItem(self.handle, recursive_url, listitem, folder)
+            self.directory_items.append((recursive_url, listitem, folder))
         else:
             items.append((recursive_url, listitem, folder))
             return items
 
+    def add_sort_methods(self, *sort_methods):
+        for sort_method in sort_methods:
+            if sort_method not in self.directory_sort_methods:
+                self.directory_sort_methods.append(sort_method)
+
+    def flush_directory(self):
+        """Send collected directory items, content type, category and sort methods to Kodi."""
+        if self.directory_content:
+            xbmcplugin.setContent(self.handle, self.directory_content)
+        if self.directory_category:
+            xbmcplugin.setPluginCategory(self.handle, self.directory_category)
+        for sort_method in self.directory_sort_methods:
+            xbmcplugin.addSortMethod(self.handle, sort_method)
+        if self.directory_items:
+            # totalItems lets skin lay out the list before all items are added
+            xbmcplugin.addDirectoryItems(self.handle, self.directory_items, len(self.directory_items))
+
+        self.directory_items = []
+        self.directory_content = None
+        self.directory_category = None
+        self.directory_sort_methods = []
+
     def eod(self):
         """Tell Kodi that the end of the directory listing is reached."""
+        self.flush_directory()
         xbmcplugin.endOfDirectory(self.handle)
+        # Static menus don't create the client just for this, Dplay.log() writes only with debug logging on
+        if self._d is not None:
+            self._d.log('Response cache: %s' % self._d.cache.stats())
 
     def refresh_list(self):
         """Refresh listing after adding or deleting favorites"""
@@ -219,10 +292,28 @@ class KodiHelper(object):
 
     # End of Up next integration
 
-    def play_item(self, video_id, video_type):
+    def play_item(self, video_id, video_type, metadata_deadline=0.3):
+        from concurrent.futures import ThreadPoolExecutor
+
         useIsa = self.get_setting('use_isa')
+        start = time.time()
+        is_episode = video_type == 'EPISODE' or video_type == 'CLIP'
+        # Up next prefetches playback info and metadata of next episode near the end of previous one
+        stream = self.pop_prefetched('stream', video_id)
+        episode = self.pop_prefetched('episode', video_id) if is_episode else None
+        executor = None
+        episode_future = None
+        # Metadata is used for Up next only in episodes and clips (can also be aired sport events).
+        # It is fetched while stream is requested so it doesn't add a round trip to startup.
+        if is_episode and not episode:
+            executor = ThreadPoolExecutor(max_workers=1)
+            episode_future = executor.submit(self.get_episode_metadata, video_id)
         try:
-            stream = self.d.get_stream(video_id, video_type)
+            if stream:
+                self.log('Playback startup: using prefetched stream info')
+            else:
+                stream = self.d.get_stream(video_id, video_type)
+                self.log('Playback startup: stream info in %d ms' % ((time.time() - start) * 1000))
             playitem = xbmcgui.ListItem(path=stream['url'], offscreen=True)
 
             # at least d+ India has dash streams that are not drm protected
@@ -240,6 +331,7 @@ class KodiHelper(object):
 
                 # DRM enabled = use Widevine
                 if stream['drm_enabled']:
+                    import inputstreamhelper
                     is_helper = inputstreamhelper.Helper('mpd', drm='com.widevine.alpha')
                     if is_helper.check_inputstream():
                         playitem.setProperty('inputstream.adaptive.license_type', 'com.widevine.alpha')
@@ -261,105 +353,197 @@ class KodiHelper(object):
 
                     playitem.setProperty('inputstream.adaptive.manifest_type', 'hls')
 
-            # Get metadata to use for Up next only in episodes and clips (can also be aired sport events)
-            if video_type == 'EPISODE' or video_type == 'CLIP':
-                # Get current episode info
-                current_episode = self.d.get_current_episode_info(video_id=video_id)
-
-                images = list(filter(lambda x: x['type'] == 'image', current_episode['included']))
-                shows = list(filter(lambda x: x['type'] == 'show', current_episode['included']))
-
-                show_fanart_image = None
-                show_logo_image = None
-                show_poster_image = None
-                for show in shows:
-                    if show['id'] == current_episode['data']['relationships']['show']['data']['id']:
-                        show_title = show['attributes']['name']
-
-                        if show['relationships'].get('images'):
-                            for image in images:
-                                for show_images in show['relationships']['images']['data']:
-                                    if image['id'] == show_images['id']:
-                                        if image['attributes']['kind'] == 'default':
-                                            show_fanart_image = image['attributes']['src']
-                                        if image['attributes']['kind'] == 'logo':
-                                            show_logo_image = image['attributes']['src']
-                                        if image['attributes']['kind'] == 'poster_with_logo':
-                                            show_poster_image = image['attributes']['src']
-
-                if current_episode['data']['relationships'].get('images'):
-                    for i in images:
-                        if i['id'] == current_episode['data']['relationships']['images']['data'][0]['id']:
-                            video_thumb_image = i['attributes']['src']
-                else:
-                    video_thumb_image = None
-
-                duration = current_episode['data']['attributes']['videoDuration'] / 1000.0 if current_episode['data'][
-                    'attributes'].get('videoDuration') else None
-
-                info = {
-                    'mediatype': 'episode',
-                    'title': current_episode['data']['attributes'].get('name').lstrip(),
-                    'tvshowtitle': show_title,
-                    'season': current_episode['data']['attributes'].get('seasonNumber'),
-                    'episode': current_episode['data']['attributes'].get('episodeNumber'),
-                    'plot': current_episode['data']['attributes'].get('description'),
-                    'duration': duration,
-                    'aired': current_episode['data']['attributes'].get('airDate')
-                }
-
-                playitem.setInfo('video', info)
-
-                art = {
-                    'fanart': show_fanart_image,
-                    'thumb': video_thumb_image,
-                    'clearlogo': show_logo_image,
-                    'poster': show_poster_image
-                }
-
-                playitem.setArt(art)
-
-                player = DplusPlayer()
-                player.resolve(playitem)
+            if is_episode:
+                if episode_future:
+                    # Wait metadata only for a short time, playback can start without it
+                    episode = self.wait_episode_metadata(episode_future, timeout=metadata_deadline)
+                if episode:
+                    playitem.setInfo('video', episode['info'])
+                    playitem.setArt(episode['art'])
 
+                player = DplusPlayer(self)
                 player.video_id = video_id
-                player.current_show_id = current_episode['data']['relationships']['show']['data']['id']
-                player.current_episode_info = info
-                player.current_episode_art = art
-
+                if episode:
+                    player.set_episode(episode)
+                player.resolve(playitem)
+                self.log('Playback startup: resolved in %d ms, metadata %s' % (
+                    (time.time() - start) * 1000, 'ready' if episode else 'pending'))
+
+                if not episode and episode_future:
+                    episode = self.wait_episode_metadata(episode_future)
+                    if episode:
+                        self.log('Playback startup: metadata in %d ms' % ((time.time() - start) * 1000))
+                        playitem.setInfo('video', episode['info'])
+                        playitem.setArt(episode['art'])
+                        player.set_episode(episode)
+                        if player.isPlayingVideo():
+                            player.updateInfoTag(playitem)
+                # Up next worker waits for this, also when there is no metadata
+                player.metadata_done.set()
+
+                # Position is sampled rarely during steady playback, callbacks update it on pause and seek
+                # Stop, end and error callbacks wake the loop right away
                 monitor = xbmc.Monitor()
-                while not monitor.abortRequested() and player.playing:
-                    if player.isPlayingVideo():
-                        player.video_totaltime = player.getTotalTime()
-                        player.video_lastpos = player.getTime()
-
-                    xbmc.sleep(1000)
+                tracking_start = time.time()
+                while player.playing and not monitor.abortRequested():
+                    if player.stopped.wait(player.sample_position()):
+                        break
+                    player.count_wakeup()
+                self.log('Position tracking: %d wakeups in %d s (Up next %d, progress reports %d)' % (
+                    player.wakeups + player.progress.wakeups, time.time() - tracking_start, player.upnext_wakeups,
+                    player.progress.wakeups))
+
+                # Plugin process ends after this, unsent reports are sent by add-on service or next playback
+                player.progress.flush()
 
             # Live TV
             else:
                 xbmcplugin.setResolvedUrl(self.handle, True, listitem=playitem)
+                self.log('Playback startup: resolved in %d ms' % ((time.time() - start) * 1000))
 
         except self.d.DplayError as error:
             self.dialog('ok', self.language(30006), error.value)
+        finally:
+            if executor:
+                executor.shutdown(wait=False)
+
+    def get_episode_metadata(self, video_id):
+        """Return info, art and show id of episode for list item and Up next."""
+        current_episode = self.d.get_current_episode_info(video_id=video_id)
+
+        included = Resolver(current_episode)
+        metadata = MetadataMapper(included, self.d.locale_suffix, self.d.contentRatingSystem)
+        show = included.related(current_episode['data'], 'show')
+        show_title = show['attributes']['name'] if show else None
+
+        duration = current_episode['data']['attributes']['videoDuration'] / 1000.0 if current_episode['data'][
+            'attributes'].get('videoDuration') else None
+
+        info = {
+            'mediatype': 'episode',
+            'title': current_episode['data']['attributes'].get('name').lstrip(),
+            'tvshowtitle': show_title,
+            'season': current_episode['data']['attributes'].get('seasonNumber'),
+            'episode': current_episode['data']['attributes'].get('episodeNumber'),
+            'plot': current_episode['data']['attributes'].get('description'),
+            'duration': duration,
+            'aired': current_episode['data']['attributes'].get('airDate')
+        }
+
+        # Same art as in listings. On discoveryplus.in the poster is 'poster', shows there have no 'poster_with_logo'.
+        return dict(info=info, art=metadata.episode_art(current_episode['data'], show),
+                    show_id=show['id'] if show else None)
+
+    def wait_episode_metadata(self, future, timeout=None):
+        """Return result of get_episode_metadata or None if it is not ready in timeout or failed."""
+        from concurrent.futures import TimeoutError as FutureTimeoutError
+        try:
+            return future.result(timeout=timeout)
+        except FutureTimeoutError:
+            return None
+        except Exception as error:  # Video plays without metadata
+            self.log('Getting episode metadata failed: %s' % error)
+            return None
+
+    def get_progress_file(self):
+        return os.path.join(self.addon_profile, 'progress.json')
+
+    def has_saved_progress(self):
+        """Return True if some invocation has left playback progress reports unsent."""
+        return os.path.exists(self.get_progress_file())
+
+    def send_saved_progress(self):
+        """Send unsent playback progress reports of all invocations. Return True if all were sent."""
+        return ProgressReporter(self.d, self.get_progress_file()).send_saved()
+
+    def prefetch_playback(self, video_id, video_type, ttl=600):
+        """Store playback info and metadata of video so play_item can start it without API requests."""
+        self.d.cache.set_value('prefetch_stream_%s' % video_id, self.d.get_stream(video_id, video_type), ttl)
+        if video_type == 'EPISODE' or video_type == 'CLIP':
+            self.d.cache.set_value('prefetch_episode_%s' % video_id, self.get_episode_metadata(video_id), ttl)
+
+    def pop_prefetched(self, name, video_id):
+        """Return value stored by prefetch_playback or None. Values are used only once."""
+        key = 'prefetch_%s_%s' % (name, video_id)
+        value = self.d.cache.get_value(key)
+        if value is not None:
+            self.d.cache.delete_value(key)
+        return value
 
 class DplusPlayer(xbmc.Player):
-    def __init__(self):
-        base_url = sys.argv[0]
-        handle = int(sys.argv[1])
-        self.helper = KodiHelper(base_url, handle)
+    def __init__(self, helper=None):
+        # Player uses helper of play_item so it doesn't set up another client
+        self.helper = helper or KodiHelper(sys.argv[0], int(sys.argv[1]))
         self.video_id = None
         self.current_show_id = None
         self.current_episode_info = ''
         self.current_episode_art = ''
         self.video_lastpos = 0
         self.video_totaltime = 0
+        # Time when video_lastpos was read, position between samples is estimated from it
+        self.sampled_at = 0
+        self.seeked_at = 0
+        # Timer wakeups of play_item loop and Up next worker, progress reporter counts its own
+        self.wakeups = 0
+        self.upnext_wakeups = 0
+        self._wakeups_lock = threading.Lock()
         self.playing = False
+        # Set when playback stops, ends or fails
+        self.stopped = threading.Event()
         self.paused = False
+        self.upnext_worker = None
+        # Set by play_item when metadata of video is set or getting it has failed
+        self.metadata_done = threading.Event()
+        # Reports also progress that previous invocations couldn't send
+        self.progress = ProgressReporter(self.helper.d, self.helper.get_progress_file())
+        self.progress.start()
 
     def resolve(self, li):
         xbmcplugin.setResolvedUrl(self.helper.handle, True, listitem=li)
         self.playing = True
 
+    def set_episode(self, episode):
+        """Set metadata from KodiHelper.get_episode_metadata used for Up next."""
+        self.current_show_id = episode['show_id']
+        self.current_episode_info = episode['info']
+        self.current_episode_art = episode['art']
+
+    def update_position(self):
+        if self.isPlayingVideo():
+            self.video_totaltime = self.getTotalTime()
+            self.video_lastpos = self.getTime()
+            self.sampled_at = time.time()
+
+    def count_wakeup(self, upnext=False):
+        with self._wakeups_lock:
+            self.wakeups += 1
+            if upnext:
+                self.upnext_wakeups += 1
+
+    def sample_position(self):
+        """Read position from player. Return seconds until next sample."""
+        self.update_position()
+        return self.get_sample_interval()
+
+    def get_sample_interval(self):
+        # Player is starting or user is seeking
+        if not self.video_totaltime or time.time() - self.seeked_at < 10:
+            return 1
+        if self.paused:
+            return 30
+        remaining = self.video_totaltime - self.video_lastpos
+        if remaining < 60:
+            return 1
+        # Steady playback, but wake up in time for the end of video
+        return max(1, min(15, remaining - 60))
+
+    def get_position(self):
+        """Return playback position in seconds estimated from last sample."""
+        if self.paused or not self.sampled_at:
+            return self.video_lastpos
+        position = self.video_lastpos + time.time() - self.sampled_at
+        return min(position, self.video_totaltime) if self.video_totaltime else position
+
     def onPlayBackStarted(self):  # pylint: disable=invalid-name
         """Called when user starts playing a file"""
         self.helper.log('[DplusPlayer] Event onPlayBackStarted')
@@ -369,12 +553,17 @@ class DplusPlayer(xbmc.Player):
     def onAVStarted(self):  # pylint: disable=invalid-name
         """Called when Kodi has a video or audiostream"""
         self.helper.log('[DplusPlayer] Event onAVStarted')
-        self.push_upnext()
+        # Kodi calls this also after onPlayBackStarted, start only one worker per video
+        if self.video_id and not (self.upnext_worker and self.upnext_worker.is_alive() and
+                                  self.upnext_worker.video_id == self.video_id):
+            self.upnext_worker = UpNextWorker(self, self.video_id)
+            self.upnext_worker.start()
 
-    def onPlayBackSeek(self, time, seekOffset):  # pylint: disable=invalid-name
+    def onPlayBackSeek(self, seek_time, seekOffset):  # pylint: disable=invalid-name
         """Called when user seeks to a time"""
-        self.helper.log('[DplusPlayer] Event onPlayBackSeek time=' + str(time) + ' offset=' + str(seekOffset))
-        self.video_lastpos = time // 1000
+        self.helper.log('[DplusPlayer] Event onPlayBackSeek time=' + str(seek_time) + ' offset=' + str(seekOffset))
+        self.video_lastpos = seek_time // 1000
+        self.sampled_at = self.seeked_at = time.time()
 
         # If we seek beyond the end, exit Player
         if self.video_lastpos >= self.video_totaltime:
@@ -383,6 +572,7 @@ class DplusPlayer(xbmc.Player):
     def onPlayBackPaused(self):  # pylint: disable=invalid-name
         """Called when user pauses a playing file"""
         self.helper.log('[DplusPlayer] Event onPlayBackPaused')
+        self.update_position()
         self.update_playback_progress()
         self.paused = True
 
@@ -391,6 +581,7 @@ class DplusPlayer(xbmc.Player):
         self.helper.log('[DplusPlayer] Event onPlayBackEnded')
         self.update_playback_progress()
         self.playing = False
+        self.stopped.set()
         # Up Next calls onPlayBackEnded before onPlayBackStarted if user doesn't select Watch Now
         # Reset current video id
         self.video_id = None
@@ -400,20 +591,31 @@ class DplusPlayer(xbmc.Player):
         self.helper.log('[DplusPlayer] Event onPlayBackStopped')
         self.update_playback_progress()
         self.playing = False
+        self.stopped.set()
         # Reset current video id
         self.video_id = None
 
+    def onPlayBackError(self):  # pylint: disable=invalid-name
+        """Called when playback fails"""
+        self.helper.log('[DplusPlayer] Event onPlayBackError')
+        self.playing = False
+        self.stopped.set()
+        self.video_id = None
+
     def onPlayerExit(self):  # pylint: disable=invalid-name
         """Called when player exits"""
         self.helper.log('[DplusPlayer] Event onPlayerExit')
         self.update_playback_progress()
         self.playing = False
+        self.stopped.set()
 
     def onPlayBackResumed(self):  # pylint: disable=invalid-name
         """Called when user resumes a paused file or a next playlist item is started"""
         if self.paused:
             suffix = 'after pausing'
             self.paused = False
+            # Position didn't change while paused
+            self.sampled_at = time.time()
         # playlist change
         # Up Next uses this when user clicks Watch Now, only happens if user is watching first episode in row after
         # that onPlayBackEnded is used even if user clicks Watch Now
@@ -427,8 +629,9 @@ class DplusPlayer(xbmc.Player):
         self.helper.log(log)
 
     def push_upnext(self):
-        if not self.video_id:
-            return
+        """Send next episode to Up next. Return (video_id, video_type) of next episode or None."""
+        if not self.video_id or not self.current_episode_info:
+            return None
         self.helper.log('Getting next episode info')
         next_episode = self.helper.d.get_next_episode_info(current_video_id=self.video_id)
 
@@ -529,18 +732,21 @@ class DplusPlayer(xbmc.Player):
             )
 
             self.helper.upnext_signal(sender=self.helper.addon_name, next_info=next_info)
+            return next_episode['data'][0]['id'], next_episode['data'][0]['attributes']['videoType']
 
         else:
             self.helper.log('No next episode available')
+            return None
 
     def update_playback_progress(self):
         if not self.video_id:
             return
         if not self.helper.get_setting('sync_playback'):
             return
-        video_lastpos = format(self.video_lastpos, '.0f')
+        video_position = self.get_position()
+        video_lastpos = format(video_position, '.0f')
         video_totaltime = format(self.video_totaltime, '.0f')
-        video_percentage = self.video_lastpos * 100 / self.video_totaltime
+        video_percentage = video_position * 100 / self.video_totaltime
         # Convert to milliseconds
         video_lastpos_msec = int(video_lastpos) * 1000
         video_totaltime_msec = int(video_totaltime) * 1000
@@ -549,17 +755,69 @@ class DplusPlayer(xbmc.Player):
         self.helper.log('Video lastpos msec: %s' % str(video_lastpos_msec))
         self.helper.log('Video percentage watched: %s' % str(video_percentage))
 
-        # Get new token before updating playback progress
-        self.helper.d.get_token()
-
         # Over 92 percent watched = use totaltime
         if video_percentage > 92:
             self.helper.log('Marking episode completely watched')
-            # discovery+ wants POST before PUT
-            self.helper.d.update_playback_progress('post', self.video_id, video_totaltime_msec)
-            self.helper.d.update_playback_progress('put', self.video_id, video_totaltime_msec)
+            self.progress.report(self.video_id, video_totaltime_msec)
         else:
             self.helper.log('Marking episode partly watched')
-            # discovery+ wants POST before PUT
-            self.helper.d.update_playback_progress('post', self.video_id, video_lastpos_msec)
-            self.helper.d.update_playback_progress('put', self.video_id, video_lastpos_msec)
+            self.progress.report(self.video_id, video_lastpos_msec)
+
+
+class UpNextWorker(threading.Thread):
+    """Sends Up next data after playback has started and prefetches next episode near the end"""
+
+    def __init__(self, player, video_id, start_delay=5, prefetch_before=120):
+        threading.Thread.__init__(self)
+        self.daemon = True
+        self.player = player
+        self.video_id = video_id
+        self.start_delay = start_delay
+        # Seconds before end of video when next episode is prefetched
+        self.prefetch_before = prefetch_before
+        self.monitor = xbmc.Monitor()
+
+    def current(self):
+        """Return True while the video of this worker is playing."""
+        return self.player.playing and self.player.video_id == self.video_id
+
+    def run(self):
+        # Let player finish starting before API requests
+        if self.wait(self.start_delay):
+            return
+        # Metadata of current episode may still be loading in play_item
+        self.player.metadata_done.wait()
+        if self.monitor.abortRequested() or not self.current():
+            return
+        if not self.player.current_episode_info:
+            self.player.helper.log('Up next: no metadata of current episode')
+            return
+
+        try:
+            next_video = self.player.push_upnext()
+        except Exception as error:  # Playback continues without Up next
+            self.player.helper.log('Up next failed: %s' % error)
+            return
+        if not next_video:
+            return
+
+        while self.current():
+            remaining = self.player.video_totaltime - self.player.get_position()
+            if self.player.video_totaltime and remaining <= self.prefetch_before:
+                try:
+                    self.player.helper.prefetch_playback(*next_video)
+                    self.player.helper.log('Prefetched next episode %s' % next_video[0])
+                except Exception as error:  # Next episode is fetched when it is played
+                    self.player.helper.log('Prefetching next episode failed: %s' % error)
+                return
+            # Sleep until prefetch time, but wake up now and then because user may seek
+            wait = max(1, min(30, remaining - self.prefetch_before)) if self.player.video_totaltime else 2
+            if self.wait(wait):
+                return
+
+    def wait(self, timeout):
+        """Wait timeout seconds. Return True if playback has stopped or Kodi is exiting."""
+        if self.player.stopped.wait(timeout) or self.monitor.abortRequested():
+            return True
+        self.player.count_wakeup(upnext=True)
+        return False
@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+"""
+Kodi info and art of discovery+ API resources
+"""
+
+
+class MetadataMapper(object):
+    """Maps resources of one response to Kodi info and art values
+
+    Season pages list dozens of episodes of one show, so values are computed
+    once per resource and reused for the rest of the response.
+    """
+
+    def __init__(self, included, locale_suffix, content_rating_system):
+        self.included = included
+        self.locale_suffix = locale_suffix
+        self.content_rating_system = content_rating_system
+        self._memo = {}
+
+    def _memoized(self, name, obj, func):
+        key = (name, obj['type'], obj['id'])
+        try:
+            return self._memo[key]
+        except KeyError:
+            value = self._memo[key] = func(obj)
+            return value
+
+    def genres(self, obj):
+        """Return genre names in order of included resources, not in order of txGenres relationship."""
+        def get_genres(obj):
+            rel = obj.get('relationships', {}).get('txGenres')
+            genre_ids = set(genre['id'] for genre in rel['data']) if rel and rel.get('data') else set()
+            return [taxonomyNode['attributes']['name'] for taxonomyNode in self.included.of_type('taxonomyNode')
+                    if taxonomyNode['id'] in genre_ids]
+        return self._memoized('genres', obj, get_genres)
+
+    def studio(self, obj):
+        """Return name of primary channel."""
+        def get_studio(obj):
+            channel = self.included.related(obj, 'primaryChannel')
+            return channel['attributes']['name'] if channel else None
+        return self._memoized('studio', obj, get_studio)
+
+    def mpaa(self, obj):
+        def get_mpaa(obj):
+            mpaa = None
+            for contentRating in obj['attributes'].get('contentRatings') or []:
+                if contentRating['system'] == self.content_rating_system:
+                    mpaa = contentRating['code']
+            return mpaa
+        return self._memoized('mpaa', obj, get_mpaa)
+
+    def show_art(self, show):
+        """Return new art dict of show. Callers can change it."""
+        if not show:
+            return dict(fanart=None, thumb=None, clearlogo=None, poster=None)
+
+        def get_art(show):
+            images = self.included.images_by_kind(show)
+            return {
+                'fanart': images.get('default'),
+                'thumb': images.get('default'),
+                'clearlogo': images.get('logo'),
+                # discoveryplus.in has logos in poster
+                'poster': images.get('poster') if self.locale_suffix == 'in' else images.get('poster_with_logo')
+            }
+        return dict(self._memoized('art', show, get_art))
+
+    def episode_art(self, video, show):
+        """Return art of show with video image as thumb."""
+        art = self.show_art(show)
+        art['thumb'] = self.included.first_image(video)
+        return art
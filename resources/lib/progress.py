@@ -0,0 +1,222 @@
+# -*- coding: utf-8 -*-
+"""
+Playback progress reporting off the player callback thread
+"""
+import os
+import json
+import time
+import threading
+
+
+class StateFileLock(object):
+    """Lock file that keeps invocations from writing the state file at the same time
+
+    Lock left by a crashed process is removed after stale_after seconds. If the
+    lock can't be taken in timeout seconds the state file is written anyway.
+    """
+
+    def __init__(self, path, timeout=2, stale_after=10):
+        self.path = path
+        self.timeout = timeout
+        self.stale_after = stale_after
+        self.locked = False
+
+    def __enter__(self):
+        deadline = time.time() + self.timeout
+        while True:
+            try:
+                os.close(os.open(self.path, os.O_CREAT | os.O_EXCL | os.O_WRONLY))
+                self.locked = True
+                return self
+            except OSError:
+                pass
+            try:
+                if time.time() - os.path.getmtime(self.path) > self.stale_after:
+                    os.remove(self.path)
+                    continue
+            except OSError:
+                continue
+            if time.time() > deadline:
+                return self
+            time.sleep(0.05)
+
+    def __exit__(self, *args):
+        if self.locked:
+            self.locked = False
+            try:
+                os.remove(self.path)
+            except OSError:
+                pass
+
+
+class ProgressReporter(threading.Thread):
+    """Sends playback progress to discovery+ in the background
+
+    Reports of the same video that come within coalesce seconds (pause, seek
+    and stop) are sent as one. Unsent reports are kept in a file in the add-on
+    profile that all invocations share. They are sent by the next reporter that
+    starts and by the add-on service with send_saved(). report() only queues,
+    the state file and response cache are updated in the reporter thread.
+    """
+
+    def __init__(self, dplay, state_file, coalesce=3):
+        threading.Thread.__init__(self)
+        self.daemon = True
+        self.dplay = dplay
+        self.state_file = state_file
+        self.coalesce = coalesce
+        self._condition = threading.Condition()
+        self._flushing = False
+        # Reporter thread is sending a report or saving state
+        self._busy = False
+        # Queues have changed since state file was saved
+        self._unsaved = False
+        # Reports have been queued since cached listings were removed
+        self._queued = False
+        # video_id: [position in milliseconds, time of report]
+        self.pending = self.load_state()
+        # video_id: position of reports that failed, sent by next invocation
+        self.failed = {}
+        # video_id: position of reports sent since state file was saved, removed from file if nobody has changed them
+        self.sent = {}
+        # Timed waits that ended, written to the log by play_item
+        self.wakeups = 0
+
+    def read_state(self):
+        try:
+            with open(self.state_file, 'r') as f:
+                return json.load(f)
+        except (IOError, ValueError):
+            return {}
+
+    def load_state(self):
+        # Reports from earlier invocations are sent right away
+        return dict((video_id, [position, 0]) for video_id, position in self.read_state().items())
+
+    def save_state(self):
+        """Merge reports of this reporter with the reports other invocations have saved."""
+        with self._condition:
+            sent, self.sent = self.sent, {}
+            pending = dict((video_id, report[0]) for video_id, report in self.pending.items())
+            self._unsaved = False
+        with StateFileLock(self.state_file + '.lock'):
+            state = self.read_state()
+            for video_id, position in sent.items():
+                # Another invocation may have saved a newer position meanwhile
+                if state.get(video_id) == position:
+                    del state[video_id]
+            # Failed reports are in the file already, they were saved when they were queued
+            state.update(pending)
+            self.write_state(state)
+
+    def write_state(self, state):
+        tmp_file = '%s.%s.tmp' % (self.state_file, os.getpid())
+        try:
+            if not state:
+                if os.path.exists(self.state_file):
+                    os.remove(self.state_file)
+                return
+            with open(tmp_file, 'w') as f:
+                json.dump(state, f)
+            os.replace(tmp_file, self.state_file)
+        except (IOError, OSError):
+            pass
+
+    def report(self, video_id, position):
+        """Queue progress of video. Returns right away, called from player callbacks."""
+        with self._condition:
+            self.pending[video_id] = [position, time.time()]
+            self.failed.pop(video_id, None)
+            self._unsaved = self._queued = True
+            self._condition.notify()
+
+    def flush(self, timeout=10):
+        """Send queued reports without waiting for more and wait until they are sent or timeout expires."""
+        deadline = time.time() + timeout
+        with self._condition:
+            self._flushing = True
+            self._condition.notify()
+            while (self.pending or self._busy or self._unsaved) and time.time() < deadline:
+                self._condition.wait(deadline - time.time())
+            return not self.pending
+
+    def run(self):
+        while True:
+            with self._condition:
+                while not self.pending and not self._unsaved:
+                    self._condition.wait()
+                save = self._busy = self._unsaved
+                queued, self._queued = self._queued, False
+            if save:
+                if queued:
+                    # Listing opened right after stopping must not show old progress while report waits to be sent
+                    self.dplay.invalidate_viewing_history()
+                self.save_state()
+                with self._condition:
+                    self._busy = False
+                    self._condition.notify_all()
+                continue
+
+            with self._condition:
+                if not self.pending:
+                    continue
+                # Wait until reports of the burst have arrived
+                wait = max(report[1] for report in self.pending.values()) + self.coalesce - time.time()
+                if wait > 0 and not self._flushing:
+                    self._condition.wait(wait)
+                    self.wakeups += 1
+                    continue
+                video_id, report = next(iter(self.pending.items()))
+                position = report[0]
+                self._busy = True
+
+            sent = self.send(video_id, position)
+
+            with self._condition:
+                self._busy = False
+                self.sent_or_failed(video_id, position, sent)
+                self._condition.notify_all()
+
+    def sent_or_failed(self, video_id, position, sent):
+        """Update queues after sending a report. State file is saved later."""
+        # Newer report of the video may have come while sending
+        if self.pending.get(video_id, [None])[0] == position:
+            del self.pending[video_id]
+            if sent:
+                self.sent[video_id] = position
+            else:
+                # Kept in state file for the next invocation
+                self.failed[video_id] = position
+            self._unsaved = True
+
+    def send_saved(self):
+        """Send reports saved by other invocations in this thread, without starting the reporter thread.
+
+        Return True if there is nothing left to send.
+        """
+        for video_id, report in list(self.pending.items()):
+            sent = self.send(video_id, report[0])
+            with self._condition:
+                self.sent_or_failed(video_id, report[0], sent)
+            self.save_state()
+        return not self.failed
+
+    def send(self, video_id, position):
+        """Send report once. Return False if it should be tried again later.
+
+        TransportPolicy of make_request retries network errors, retrying here too would multiply its attempts.
+        Failed reports stay in the state file and are sent by the add-on service or the next reporter.
+        """
+        try:
+            # discovery+ wants POST before PUT
+            self.dplay.update_playback_progress('post', video_id, position)
+            self.dplay.update_playback_progress('put', video_id, position)
+            self.dplay.log('Reported progress of video %s: %s ms' % (video_id, position))
+            return True
+        except self.dplay.DplayError as error:
+            # API rejected the report, sending it again doesn't help
+            self.dplay.log('Progress report of video %s rejected: %s' % (video_id, error.value))
+            return True
+        except Exception as error:  # Network errors
+            self.dplay.log('Progress report of video %s failed: %s' % (video_id, error))
+            return False
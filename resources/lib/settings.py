@@ -0,0 +1,74 @@
+# -*- coding: utf-8 -*-
+"""
+Add-on settings of one plugin invocation
+"""
+
+# Settings that aren't plain text. Value is used when setting is empty or invalid.
+BOOLEANS = {
+    'cookiestxt': True,
+    'sync_playback': True,
+    'us_uhd': False,
+    'use_isa': True,
+    'seasonsonly': False,
+    'flattentvshows': False,
+    'iptv.enabled': False,
+    'dump_responses': False,
+    'cache_warming': True,
+    'hedge_requests': False
+}
+INTEGERS = {
+    'numresults': 100,
+    'epg_workers': 4,
+    'epg_refresh_hours': 12,
+    'log_body_preview': 500
+}
+
+
+def coerce(setting_id, value):
+    if setting_id in BOOLEANS:
+        if value in ('true', 'false'):
+            return value == 'true'
+        return BOOLEANS[setting_id]
+    if setting_id in INTEGERS:
+        try:
+            # Sliders may give floats like 100.0
+            return int(float(value))
+        except ValueError:
+            return INTEGERS[setting_id]
+    # Unknown settings keep the old 'true' and 'false' handling
+    if value == 'true':
+        return True
+    elif value == 'false':
+        return False
+    return value
+
+
+class Settings(object):
+    """Typed snapshot of add-on settings
+
+    Every getSetting() goes through the Kodi Python bridge, so each setting is
+    read once and listing loops get the stored value. Settings changed with
+    set() are written to Kodi and to the snapshot.
+    """
+
+    def __init__(self, addon):
+        self.addon = addon
+        self.values = {}
+
+    def get(self, setting_id):
+        try:
+            return self.values[setting_id]
+        except KeyError:
+            value = self.values[setting_id] = coerce(setting_id, self.addon.getSetting(setting_id))
+            return value
+
+    def set(self, setting_id, value):
+        result = self.addon.setSetting(setting_id, value)
+        self.values[setting_id] = coerce(setting_id, value)
+        return result
+
+    def refresh(self, addon=None):
+        """Read settings from Kodi again. Settings changed outside this invocation become visible."""
+        if addon is not None:
+            self.addon = addon
+        self.values.clear()
@@ -0,0 +1,49 @@
+# -*- coding: utf-8 -*-
+"""
+Fast parsing of discovery+ API timestamps
+
+API uses fixed format UTC timestamps like 2023-01-01T10:00:00Z. The same
+timestamps repeat across a season (availability windows, air dates), so
+parsed values are memoized.
+"""
+import time
+from datetime import date, datetime
+
+try:  # Python 3
+    from functools import lru_cache
+except ImportError:  # Python 2
+    lru_cache = None
+
+EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+
+
+def memoize(func):
+    if lru_cache is None:
+        return func
+    return lru_cache(maxsize=4096)(func)
+
+
+@memoize
+def parse_utc(value):
+    """Return epoch seconds of API timestamp. Fractional seconds are ignored."""
+    # Fixed positions: YYYY-MM-DDTHH:MM:SS
+    if len(value) < 19 or value[4] != '-' or value[7] != '-' or value[10] != 'T' or value[13] != ':':
+        raise ValueError('Unsupported timestamp: %s' % value)
+    days = date(int(value[0:4]), int(value[5:7]), int(value[8:10])).toordinal() - EPOCH_ORDINAL
+    return days * 86400 + int(value[11:13]) * 3600 + int(value[14:16]) * 60 + int(value[17:19])
+
+
+@memoize
+def parse_local(value):
+    """Return API timestamp as naive local time datetime."""
+    return datetime.fromtimestamp(parse_utc(value))
+
+
+class Now(object):
+    """Current time taken once per listing so every video is compared to the same moment"""
+
+    def __init__(self, epoch=None):
+        self.epoch = int(time.time()) if epoch is None else epoch
+
+    def is_future(self, value):
+        return parse_utc(value) > self.epoch
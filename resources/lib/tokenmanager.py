@@ -0,0 +1,102 @@
+# -*- coding: utf-8 -*-
+"""
+Lifecycle of the discovery+ API token
+"""
+import os
+import json
+import time
+import uuid
+import threading
+
+
+class TokenManager(object):
+    """Refreshes the token only when it is close to expiry or rejected by the API"""
+
+    def __init__(self, dplay, state_file, lifetime=3600, margin=300):
+        self.dplay = dplay
+        self.state_file = state_file
+        self.lifetime = lifetime
+        self.margin = margin
+        self._lock = threading.Lock()
+        self.state = self.load_state()
+        # Token is bound to device id so it has to stay same between invocations
+        if not self.state.get('device_id'):
+            self.state['device_id'] = uuid.uuid1().hex
+            self.save_state()
+
+    @property
+    def device_id(self):
+        return self.state['device_id']
+
+    def load_state(self):
+        try:
+            with open(self.state_file, 'r') as f:
+                return json.load(f)
+        except (IOError, ValueError):
+            return {}
+
+    def save_state(self):
+        tmp_file = '%s.%s.tmp' % (self.state_file, os.getpid())
+        try:
+            with open(tmp_file, 'w') as f:
+                json.dump(self.state, f)
+            os.replace(tmp_file, self.state_file)
+        except (IOError, OSError):
+            pass
+
+    def is_valid(self):
+        return self.state.get('expires', 0) - self.margin > time.time()
+
+    def sync(self):
+        """Follow cookies and token state another process has saved.
+
+        The service keeps its client for a long time. When a plugin invocation
+        gets a new token or resets settings (cookie file is removed), the
+        cookie file changes and the token of this client is not valid anymore.
+        """
+        if not self.dplay.cookie_jar.sync_file():
+            return
+        self.dplay.log('Cookie file changed, reading token state again')
+        with self._lock:
+            state = self.load_state()
+            state.setdefault('device_id', self.state['device_id'])
+            self.state = state
+
+    def ensure(self):
+        """Get new token if current one is missing or about to expire."""
+        self.sync()
+        if not self.is_valid():
+            with self._lock:
+                # Another thread may have refreshed while we waited
+                if not self.is_valid():
+                    self._refresh()
+
+    def refresh(self, sent_at=None):
+        """Get new token. sent_at is the time a request rejected with 401 was sent.
+
+        Threads whose requests were rejected together refresh once: refresh is
+        skipped if the token was issued after the rejected request was sent.
+        """
+        with self._lock:
+            if sent_at is not None and self.state.get('issued', 0) > sent_at:
+                return
+            self._refresh()
+
+    def _refresh(self):
+        self.dplay.log('Refreshing token')
+        self.dplay.get_token()
+        now = time.time()
+        expires = now + self.lifetime
+        # Use cookie expiry if API sets one. Through the backend the cookie is in its jar and the cookie file.
+        self.dplay.reload_cookies()
+        for cookie in self.dplay.cookie_jar:
+            if cookie.name == 'st' and cookie.expires and cookie.expires > now:
+                expires = min(expires, cookie.expires)
+        self.state['issued'] = now
+        self.state['expires'] = expires
+        self.save_state()
+
+    def invalidate(self):
+        self.state.pop('issued', None)
+        self.state.pop('expires', None)
+        self.save_state()
@@ -0,0 +1,186 @@
+# -*- coding: utf-8 -*-
+"""
+Timeouts, retries and hedged requests of API requests sent from this process
+"""
+import time
+import random
+import threading
+from collections import deque
+
+try:  # Python 3
+    import queue
+except ImportError:  # Python 2
+    import Queue as queue
+
+# (connect, read) timeout in seconds. Connect is a bit over a multiple of 3 s TCP retransmission window.
+DEFAULT_TIMEOUT = (6.05, 20)
+# Longest matching endpoint prefix is used
+TIMEOUTS = {
+    '/token': (6.05, 10),
+    # EPG days and large grids
+    '/cms/collections': (6.05, 30),
+    # Playback startup should fail rather than wait
+    '/playback/v3': (6.05, 15)
+}
+
+# Sending these again has the same effect as sending them once
+IDEMPOTENT_METHODS = ('get', 'put', 'delete', 'head', 'options')
+RETRY_STATUSES = (500, 502, 503, 504)
+
+
+def get_requests():
+    """Import requests on first use. Invocations that send requests through the service backend don't need it."""
+    import requests
+    return requests
+
+
+def get_endpoint(url):
+    """Return path of url with ids replaced by *, e.g. /content/videos/*. Used as key of timeouts and latency stats."""
+    path = url.split('://', 1)[-1].split('?', 1)[0]
+    segments = path.split('/')[1:4]
+    return '/' + '/'.join('*' if any(c.isdigit() for c in segment) and not segment.startswith('v') else segment
+                          for segment in segments)
+
+
+class LatencyStats(object):
+    """Response times of the latest requests per endpoint"""
+
+    def __init__(self, size=200):
+        self.size = size
+        self.samples = {}
+        self.counts = {}
+        self.lock = threading.Lock()
+
+    def record(self, endpoint, seconds):
+        with self.lock:
+            if endpoint not in self.samples:
+                self.samples[endpoint] = deque(maxlen=self.size)
+                self.counts[endpoint] = 0
+            self.samples[endpoint].append(seconds)
+            self.counts[endpoint] += 1
+
+    def percentile(self, endpoint, percent, min_samples=1):
+        """Return percentile of endpoint in seconds or None if it has less than min_samples."""
+        with self.lock:
+            samples = sorted(self.samples.get(endpoint, ()))
+        if not samples or len(samples) < min_samples:
+            return None
+        # Nearest rank
+        return samples[max(0, int(round(percent / 100.0 * len(samples))) - 1)]
+
+    def summary(self):
+        """Return {endpoint: dict(count, p50, p95, p99)} with percentiles in milliseconds."""
+        return dict((endpoint, dict(
+            count=self.counts[endpoint],
+            p50=self.percentile(endpoint, 50) * 1000,
+            p95=self.percentile(endpoint, 95) * 1000,
+            p99=self.percentile(endpoint, 99) * 1000
+        )) for endpoint in list(self.samples))
+
+
+class TransportPolicy(object):
+    """Sends a request with timeouts, retries and optional hedging
+
+    Idempotent requests that fail with connection error, timeout or 5xx status
+    are sent again after a random delay that grows with every attempt, so
+    invocations that failed together don't retry together. With hedging, a
+    GET that hasn't been answered in hedge_after seconds (or the endpoint's
+    p95 latency if that is longer) is sent a second time and the first
+    response is used.
+    """
+
+    def __init__(self, retries=2, backoff=0.3, max_backoff=2.0, hedge_after=0, timeouts=None):
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.hedge_after = hedge_after
+        self.timeouts = TIMEOUTS if timeouts is None else timeouts
+        self.latency = LatencyStats()
+        self.retried = 0
+        self.hedged = 0
+        self.lock = threading.Lock()
+
+    def get_timeout(self, endpoint):
+        prefixes = [prefix for prefix in self.timeouts if endpoint.startswith(prefix)]
+        if not prefixes:
+            return DEFAULT_TIMEOUT
+        return self.timeouts[max(prefixes, key=len)]
+
+    def get_backoff(self, attempt):
+        """Return delay before retry attempt (1, 2, ...). Full jitter."""
+        return random.uniform(0, min(self.max_backoff, self.backoff * 2 ** (attempt - 1)))
+
+    def get_max_time(self, url, method):
+        """Return longest time send() can take with timeouts and retries, in seconds."""
+        connect, read = self.get_timeout(get_endpoint(url))
+        attempts = self.retries + 1 if method in IDEMPOTENT_METHODS else 1
+        backoffs = sum(min(self.max_backoff, self.backoff * 2 ** (attempt - 1)) for attempt in range(1, attempts))
+        return attempts * (connect + read) + backoffs
+
+    def count(self, name):
+        with self.lock:
+            setattr(self, name, getattr(self, name) + 1)
+
+    def get_hedge_delay(self, endpoint):
+        p95 = self.latency.percentile(endpoint, 95, min_samples=20)
+        return max(self.hedge_after, p95 or 0)
+
+    def send(self, url, method, send_once, retry_exceptions=()):
+        """Call send_once(timeout) until it returns a response that isn't retried. Return the response.
+
+        retry_exceptions are the connection and timeout errors of the HTTP library.
+        """
+        endpoint = get_endpoint(url)
+        timeout = self.get_timeout(endpoint)
+        attempts = self.retries + 1 if method in IDEMPOTENT_METHODS else 1
+        for attempt in range(attempts):
+            if attempt:
+                self.count('retried')
+                time.sleep(self.get_backoff(attempt))
+            start = time.time()
+            try:
+                if method == 'get' and self.hedge_after:
+                    response = self.send_hedged(endpoint, send_once, timeout)
+                else:
+                    response = send_once(timeout)
+            except retry_exceptions:
+                if attempt == attempts - 1:
+                    raise
+                continue
+            self.latency.record(endpoint, time.time() - start)
+            if response.status_code not in RETRY_STATUSES or attempt == attempts - 1:
+                return response
+
+    def send_hedged(self, endpoint, send_once, timeout):
+        results = queue.Queue()
+
+        def run():
+            try:
+                results.put((True, send_once(timeout)))
+            except Exception as error:  # Raised in calling thread
+                results.put((False, error))
+
+        def start():
+            thread = threading.Thread(target=run)
+            # Slower request doesn't keep the invocation running
+            thread.daemon = True
+            thread.start()
+
+        start()
+        pending = 1
+        try:
+            result = results.get(timeout=self.get_hedge_delay(endpoint))
+            pending -= 1
+        except queue.Empty:
+            self.count('hedged')
+            start()
+            pending += 1
+            result = results.get()
+            pending -= 1
+        # Use the other request if first one to finish failed
+        if (not result[0] or result[1].status_code in RETRY_STATUSES) and pending:
+            result = results.get()
+        ok, value = result
+        if not ok:
+            raise value
+        return value
@@ -0,0 +1,115 @@
+# -*- coding: utf-8 -*-
+"""
+Background cache warming and sending of saved playback progress in the add-on service
+"""
+import time
+import threading
+
+import xbmc
+
+from .cache import CACHE_TTLS
+
+
+class CacheWarmer(threading.Thread):
+    """Fetches data the user most likely opens next into the response cache
+
+    Pages are fetched once after Kodi has started and again when the user
+    comes back after being away for idle_time seconds. Nothing is fetched
+    while nobody uses Kodi. Checking idle time is a local call, the API is
+    only called when the cache is warmed.
+
+    Playback progress reports that plugin invocations couldn't send are sent
+    when there is no playback, tried again after progress_retry seconds.
+    """
+
+    def __init__(self, backend, monitor, startup_delay=10, check_interval=30, idle_time=900, progress_retry=300):
+        threading.Thread.__init__(self)
+        self.daemon = True
+        self.backend = backend
+        self.monitor = monitor
+        self.startup_delay = startup_delay
+        self.check_interval = check_interval
+        self.idle_time = idle_time
+        # Pages fetched less than this ago are still in cache
+        self.min_age = min(CACHE_TTLS.values())
+        self.warmed_at = 0
+        self.progress_retry = progress_retry
+        self.progress_sent_at = 0
+        self.player = xbmc.Player()
+
+    def run(self):
+        # Let Kodi finish starting, first open after boot is then served warm
+        if self.monitor.waitForAbort(self.startup_delay):
+            return
+        self.warm_if_needed()
+        self.send_progress_if_needed()
+        was_idle = False
+        while not self.monitor.waitForAbort(self.check_interval):
+            self.send_progress_if_needed()
+            idle = xbmc.getGlobalIdleTime()
+            if was_idle and idle < self.check_interval:
+                # User is back
+                self.warm_if_needed()
+            was_idle = idle >= self.idle_time
+
+    def warm_if_needed(self):
+        # Don't compete with playback for bandwidth
+        if self.player.isPlaying() or time.time() - self.warmed_at < self.min_age:
+            return
+        self.warmed_at = time.time()
+        self.warm()
+
+    def send_progress_if_needed(self):
+        # Playing invocation sends its own reports
+        if self.player.isPlaying() or time.time() - self.progress_sent_at < self.progress_retry:
+            return
+        helper = self.backend.get_helper()
+        if not helper.has_saved_progress():
+            return
+        self.progress_sent_at = time.time()
+        try:
+            helper.send_saved_progress()
+        except Exception as error:  # Reports stay in file, tried again later
+            helper.log('Sending saved progress failed: %s' % error)
+
+    def get_pages(self, locale):
+        """Return routes user opens from root menu."""
+        if locale == 'in':
+            return ['/home', '/liked-videos', '/watch-later']
+        return ['/home', '/my-list']
+
+    def warm(self):
+        helper = self.backend.get_helper()
+        if not helper.get_setting('cache_warming'):
+            return
+        d = helper.d
+        # Country is set and credentials checked on first plugin start
+        if not d.locale_suffix:
+            return
+
+        tasks = [('menu', lambda: d.get_menu('/bottom-menu-v3' if d.locale_suffix == 'in' else '/web-menubar-v2'))]
+        for page_path in self.get_pages(d.locale_suffix):
+            tasks.append((page_path, lambda page_path=page_path: d.get_page(page_path)))
+        if d.locale_suffix == 'in':
+            tasks.append(('favorites', d.get_favorites_in))
+            tasks.append(('watchlist', lambda: d.get_watchlist_in('dplus-watchlist-videos')))
+            tasks.append(('channels', d.get_channels_in))
+        elif d.locale_suffix == 'us':
+            tasks.append(('channels', d.get_channels_us))
+        else:
+            tasks.append(('channels', d.get_channels))
+
+        for name, task in tasks:
+            # Stop right away if user starts playback or Kodi is closing
+            if self.monitor.abortRequested() or self.player.isPlaying():
+                return
+            try:
+                task()
+            except d.DplayError as error:
+                d.log('Cache warming %s failed: %s' % (name, error.value))
+                # Login error, nothing else will work either
+                if error.value == 'unauthorized':
+                    return
+            except Exception as error:  # Network errors, missing pages. Try again next round.
+                d.log('Cache warming %s failed: %s' % (name, error))
+        d.log('Cache warming done: %s' % d.cache.stats())
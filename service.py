@@ -0,0 +1,31 @@
+# -*- coding: utf-8 -*-
+"""Add-on service: API backend for plugin invocations, cache warming and PseudoTV Live registration"""
+import xbmc
+
+from resources.lib.kodihelper import KodiHelper
+from resources.lib.backend import Backend
+from resources.lib.warmer import CacheWarmer
+from pseudotv_recommended import regPseudoTV
+
+
+class ServiceMonitor(xbmc.Monitor):
+    def __init__(self, backend):
+        xbmc.Monitor.__init__(self)
+        self.backend = backend
+
+    def onSettingsChanged(self):  # pylint: disable=invalid-name
+        """Country, cookies and other settings are read when Dplay is created"""
+        self.backend.reload()
+
+
+if __name__ == '__main__':
+    backend = Backend(lambda: KodiHelper(backend=False))
+    backend.start()
+    monitor = ServiceMonitor(backend)
+    CacheWarmer(backend, monitor).start()
+    try:
+        regPseudoTV()
+        # regPseudoTV returns early if IPTV Manager info is not available
+        monitor.waitForAbort()
+    finally:
+        backend.stop()